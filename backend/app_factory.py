@@ -2,6 +2,11 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 from flask_migrate import Migrate
 from models import db
+from utils.cache import response_cache
+from utils.json_provider import FastJSONProvider
+from utils.cart_sweeper import init_cart_sweeper
+from utils.cart_store import init_cart_store
+from utils.related_products import init_related_refresher
 from config import config
 import os
 from dotenv import load_dotenv
@@ -18,8 +23,14 @@ def create_app(config_name='default'):
     # Load configuration
     app.config.from_object(config[config_name])
     
+    # Faster response encoding (orjson when installed, stdlib otherwise)
+    if app.config.get('FAST_JSON'):
+        app.json = FastJSONProvider(app)
+    
     # Initialize extensions
     db.init_app(app)
+    response_cache.init_app(app)
+    init_cart_store(app)
     # migrate = Migrate(app, db)  # Removed, now handled in run.py
     
     # Configure CORS with better handling for preflight requests
@@ -78,6 +89,12 @@ def create_app(config_name='default'):
     from routes.main import main_bp
     app.register_blueprint(main_bp)
     
+    # Background sweeping of abandoned carts (off unless CART_SWEEP_INTERVAL is set)
+    init_cart_sweeper(app)
+    
+    # Background refresh of related-product lists queued by product writes
+    init_related_refresher(app)
+    
     # Add request logging
     @app.before_request
     def log_request_info():
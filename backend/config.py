@@ -49,6 +49,41 @@ class Config:
     # Pagination Configuration
     DEFAULT_PAGE_SIZE = 10
     MAX_PAGE_SIZE = 100
+    # Most products a single /api/products/batch request may ask for
+    MAX_BATCH_IDS = 100
+    # Most entries a single PATCH /api/products/bulk request may carry
+    MAX_BULK_PATCH_ITEMS = 1000
+    # Most operations a single POST /api/cart/batch request may carry
+    MAX_CART_BATCH_OPERATIONS = 100
+    
+    # Bulk Import/Export Configuration
+    IMPORT_BATCH_SIZE = 1000
+    IMPORT_MAX_ERRORS = 1000  # Per-row errors reported before the list is truncated
+    EXPORT_BATCH_SIZE = 1000  # Rows fetched per round trip while streaming an export
+    
+    # Related Products Configuration
+    RELATED_PRODUCTS_LIMIT = 12  # Related products stored (and served at most) per product
+    # Seconds between in-process refreshes of lists queued by product writes;
+    # 0 leaves them to scripts/rebuild_related_products.py --stale (e.g. from cron)
+    RELATED_REFRESH_INTERVAL = int(os.environ.get('RELATED_REFRESH_INTERVAL', 60))
+    
+    # Review Configuration
+    REVIEWS_PREVIEW_SIZE = 5  # Newest reviews embedded in a product's detail
+    
+    # Abandoned Cart Sweeper Configuration
+    CART_TTL_DAYS = int(os.environ.get('CART_TTL_DAYS', 30))  # Carts idle this long are deleted
+    CART_SWEEP_BATCH_SIZE = 500  # Carts deleted per transaction
+    # Seconds between in-process sweeps; 0 leaves sweeping to scripts/sweep_abandoned_carts.py (e.g. from cron)
+    CART_SWEEP_INTERVAL = int(os.environ.get('CART_SWEEP_INTERVAL', 0))
+    
+    # Cart Store Configuration
+    # 'sql' (carts tables), or 'redis' to keep hot carts in a key-value store ('fakeredis', in-process, for tests only)
+    # and write them behind to the carts tables (periodically and at checkout)
+    CART_STORE_TYPE = os.environ.get('CART_STORE_TYPE', 'sql')
+    CART_STORE_REDIS_URL = os.environ.get('CART_STORE_REDIS_URL') or os.environ.get('REDIS_URL')
+    CART_STORE_TTL = 7 * 24 * 3600  # Seconds a cart stays hot in the key-value store after its last change
+    # Seconds between write-behind flushes of changed carts to SQL; 0 persists only at checkout
+    CART_STORE_FLUSH_INTERVAL = int(os.environ.get('CART_STORE_FLUSH_INTERVAL', 30))
     
     # Order Configuration
     DEFAULT_CURRENCY = 'KES'
@@ -60,9 +95,34 @@ class Config:
     # Logging Configuration
     LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
     
-    # Cache Configuration (for future use)
-    CACHE_TYPE = 'simple'
+    # JSON Configuration
+    # Encode responses with orjson when installed (output is identical to the default encoder)
+    FAST_JSON = os.environ.get('FAST_JSON', 'true').lower() == 'true'
+    
+    # Cache Configuration
+    # 'simple' (in-process LRU), 'redis', 'fakeredis' (in-process Redis stand-in) or 'null'
+    CACHE_TYPE = os.environ.get('CACHE_TYPE', 'simple')
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL') or os.environ.get('REDIS_URL')
     CACHE_DEFAULT_TIMEOUT = 300
+    CACHE_MAX_ENTRIES = 1024
+    # Per-endpoint TTLs in seconds (falls back to CACHE_DEFAULT_TIMEOUT)
+    CACHE_ROUTE_TIMEOUTS = {
+        'products.get_products': 120,
+        'products.get_product': 300,
+        'products.get_products_batch': 300,
+        'products.get_price_stats': 600,
+        'categories.get_categories': 3600,
+        'brands.get_brands': 3600,
+    }
+    
+    # Search Configuration
+    # Seconds before a worker reloads its in-memory suggestion index
+    SEARCH_SUGGESTIONS_TTL = int(os.environ.get('SEARCH_SUGGESTIONS_TTL', 300))
+    
+    # Price Statistics Configuration
+    # Lower edges (KES) of the price distribution buckets; the last bucket is open-ended
+    PRICE_BUCKET_EDGES = (0, 1000, 5000, 15000, 30000)
+    PRICE_STATS_TTL = int(os.environ.get('PRICE_STATS_TTL', 600))
     
     # Rate Limiting (for future use)
     RATELIMIT_ENABLED = True
@@ -156,6 +216,10 @@ class TestingConfig(Config):
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
     
+    # Tests write straight to the database, so don't serve cached responses
+    CACHE_TYPE = 'null'
+    CART_STORE_TYPE = 'sql'
+    
     # SQLite doesn't support PostgreSQL-specific options
     SQLALCHEMY_ENGINE_OPTIONS = {
         'pool_pre_ping': True,
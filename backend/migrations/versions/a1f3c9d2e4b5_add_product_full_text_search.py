@@ -0,0 +1,71 @@
+"""Add product full-text search index
+
+Revision ID: a1f3c9d2e4b5
+Revises: 313825406484
+Create Date: 2026-10-16 09:12:41.503211
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1f3c9d2e4b5'
+down_revision = '313825406484'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.execute("""
+            ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+                setweight(to_tsvector('simple', coalesce(sku, '')), 'B') ||
+                setweight(to_tsvector('simple', coalesce(description, '')), 'C')
+            ) STORED
+        """)
+        op.execute("CREATE INDEX IF NOT EXISTS ix_products_search_vector ON products USING GIN (search_vector)")
+
+    elif dialect == 'sqlite':
+        op.execute("CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(name, sku, description)")
+        op.execute("""
+            CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+                INSERT INTO products_fts (rowid, name, sku, description)
+                VALUES (new.id, new.name, coalesce(new.sku, ''), coalesce(new.description, ''));
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE OF name, sku, description ON products BEGIN
+                DELETE FROM products_fts WHERE rowid = old.id;
+                INSERT INTO products_fts (rowid, name, sku, description)
+                VALUES (new.id, new.name, coalesce(new.sku, ''), coalesce(new.description, ''));
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+                DELETE FROM products_fts WHERE rowid = old.id;
+            END
+        """)
+        # Backfill existing products
+        op.execute("DELETE FROM products_fts")
+        op.execute("""
+            INSERT INTO products_fts (rowid, name, sku, description)
+            SELECT id, name, coalesce(sku, ''), coalesce(description, '') FROM products
+        """)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_products_search_vector")
+        op.execute("ALTER TABLE products DROP COLUMN IF EXISTS search_vector")
+
+    elif dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS products_fts_insert")
+        op.execute("DROP TRIGGER IF EXISTS products_fts_update")
+        op.execute("DROP TRIGGER IF EXISTS products_fts_delete")
+        op.execute("DROP TABLE IF EXISTS products_fts")
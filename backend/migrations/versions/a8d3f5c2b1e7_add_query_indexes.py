@@ -0,0 +1,53 @@
+"""Add secondary indexes for catalog, review, cart and order queries
+
+Revision ID: a8d3f5c2b1e7
+Revises: f1c7a2e9d4b6
+Create Date: 2026-10-16 22:40:13.672058
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a8d3f5c2b1e7'
+down_revision = 'f1c7a2e9d4b6'
+branch_labels = None
+depends_on = None
+
+
+# (index name, table, columns)
+INDEXES = [
+    ('ix_products_category_id_price', 'products', ['category_id', 'price']),
+    ('ix_products_brand_id', 'products', ['brand_id']),
+    ('ix_products_created_at', 'products', ['created_at']),
+    ('ix_products_name', 'products', ['name']),
+    ('ix_product_images_product_id_is_primary', 'product_images', ['product_id', 'is_primary']),
+    ('ix_product_specifications_product_id', 'product_specifications', ['product_id']),
+    ('ix_product_features_product_id', 'product_features', ['product_id']),
+    ('ix_reviews_product_id_date', 'reviews', ['product_id', 'date']),
+    ('ix_cart_items_cart_id_product_id', 'cart_items', ['cart_id', 'product_id']),
+    ('ix_order_items_order_id', 'order_items', ['order_id']),
+    ('ix_orders_email_created_at', 'orders', ['email', 'created_at']),
+    ('ix_orders_created_at', 'orders', ['created_at']),
+]
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        # CREATE INDEX CONCURRENTLY doesn't lock out writes but can't run in a transaction
+        with op.get_context().autocommit_block():
+            for name, table, columns in INDEXES:
+                op.create_index(name, table, columns, unique=False, postgresql_concurrently=True)
+    else:
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for name, table, _ in reversed(INDEXES):
+                op.drop_index(name, table_name=table, postgresql_concurrently=True)
+    else:
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table)
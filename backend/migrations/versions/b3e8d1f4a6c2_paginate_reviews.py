@@ -0,0 +1,37 @@
+"""Add review helpful counts and keyset pagination indexes
+
+Revision ID: b3e8d1f4a6c2
+Revises: a8d3f5c2b1e7
+Create Date: 2026-10-16 23:05:41.208316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3e8d1f4a6c2'
+down_revision = 'a8d3f5c2b1e7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keyset cursors need a non-null date; older rows fall back to when they were created
+    op.execute('UPDATE reviews SET date = COALESCE(created_at, CURRENT_TIMESTAMP) WHERE date IS NULL')
+
+    with op.batch_alter_table('reviews', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('helpful_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.alter_column('date', existing_type=sa.DateTime(), nullable=False)
+        batch_op.drop_index('ix_reviews_product_id_date')
+        batch_op.create_index('ix_reviews_product_id_date_id', ['product_id', 'date', 'id'], unique=False)
+        batch_op.create_index('ix_reviews_product_id_helpful_count_id', ['product_id', 'helpful_count', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('reviews', schema=None) as batch_op:
+        batch_op.drop_index('ix_reviews_product_id_helpful_count_id')
+        batch_op.drop_index('ix_reviews_product_id_date_id')
+        batch_op.create_index('ix_reviews_product_id_date', ['product_id', 'date'], unique=False)
+        batch_op.alter_column('date', existing_type=sa.DateTime(), nullable=True)
+        batch_op.drop_column('helpful_count')
@@ -0,0 +1,30 @@
+"""Add stale_related_products queue
+
+Revision ID: b5e1d7c3a9f4
+Revises: d9b4e6a2c5f1
+Create Date: 2026-10-17 09:41:26.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5e1d7c3a9f4'
+down_revision = 'd9b4e6a2c5f1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('stale_related_products',
+    sa.Column('product_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('marked_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('product_id')
+    )
+    op.create_index(op.f('ix_stale_related_products_marked_at'), 'stale_related_products', ['marked_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_stale_related_products_marked_at'), table_name='stale_related_products')
+    op.drop_table('stale_related_products')
@@ -0,0 +1,35 @@
+"""Add catalog_versions table
+
+Revision ID: b7e2d4f6a8c1
+Revises: a1f3c9d2e4b5
+Create Date: 2026-10-16 11:03:27.118904
+
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e2d4f6a8c1'
+down_revision = 'a1f3c9d2e4b5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    catalog_versions = op.create_table('catalog_versions',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    now = datetime.utcnow()
+    op.bulk_insert(catalog_versions, [
+        {'name': name, 'version': 0, 'updated_at': now}
+        for name in ('products', 'categories', 'brands')
+    ])
+
+
+def downgrade():
+    op.drop_table('catalog_versions')
@@ -0,0 +1,43 @@
+"""Add product rating aggregates
+
+Revision ID: c4d8e1a7f392
+Revises: b7e2d4f6a8c1
+Create Date: 2026-10-16 14:21:09.530417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4d8e1a7f392'
+down_revision = 'b7e2d4f6a8c1'
+branch_labels = None
+depends_on = None
+
+AGGREGATE_COLUMNS = ('rating_sum', 'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5')
+
+
+def upgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        for name in AGGREGATE_COLUMNS:
+            batch_op.add_column(sa.Column(name, sa.Integer(), nullable=False, server_default='0'))
+
+    # Backfill from existing reviews so incremental updates start from true values
+    histogram = ',\n'.join(
+        f"rating_{level} = (SELECT COUNT(*) FROM reviews r WHERE r.product_id = products.id AND r.rating = {level})"
+        for level in range(1, 6)
+    )
+    op.execute(f"""
+        UPDATE products SET
+            rating_sum = (SELECT COALESCE(SUM(r.rating), 0) FROM reviews r WHERE r.product_id = products.id),
+            review_count = (SELECT COUNT(*) FROM reviews r WHERE r.product_id = products.id),
+            rating = (SELECT ROUND(AVG(r.rating * 1.0), 2) FROM reviews r WHERE r.product_id = products.id),
+            {histogram}
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        for name in reversed(AGGREGATE_COLUMNS):
+            batch_op.drop_column(name)
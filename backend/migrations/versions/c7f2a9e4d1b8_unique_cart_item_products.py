@@ -0,0 +1,38 @@
+"""Make cart items unique per cart and product
+
+Revision ID: c7f2a9e4d1b8
+Revises: b3e8d1f4a6c2
+Create Date: 2026-10-17 00:12:36.904417
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7f2a9e4d1b8'
+down_revision = 'b3e8d1f4a6c2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Fold duplicate rows into the oldest one before the constraint goes on
+    op.execute("""
+        UPDATE cart_items SET quantity = (
+            SELECT SUM(COALESCE(other.quantity, 0)) FROM cart_items other
+            WHERE other.cart_id = cart_items.cart_id AND other.product_id = cart_items.product_id
+        )
+        WHERE id IN (SELECT MIN(id) FROM cart_items GROUP BY cart_id, product_id HAVING COUNT(*) > 1)
+    """)
+    op.execute('DELETE FROM cart_items WHERE id NOT IN (SELECT MIN(id) FROM cart_items GROUP BY cart_id, product_id)')
+
+    # The unique constraint's index replaces the plain (cart_id, product_id) one
+    with op.batch_alter_table('cart_items', schema=None) as batch_op:
+        batch_op.drop_index('ix_cart_items_cart_id_product_id')
+        batch_op.create_unique_constraint('uq_cart_items_cart_id_product_id', ['cart_id', 'product_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('cart_items', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_cart_items_cart_id_product_id', type_='unique')
+        batch_op.create_index('ix_cart_items_cart_id_product_id', ['cart_id', 'product_id'], unique=False)
@@ -0,0 +1,31 @@
+"""Add product_cards table
+
+Revision ID: d2b6f0c9e813
+Revises: c4d8e1a7f392
+Create Date: 2026-10-16 17:45:52.207761
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2b6f0c9e813'
+down_revision = 'c4d8e1a7f392'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Cards are rendered on demand until scripts/rebuild_product_cards.py backfills them
+    op.create_table('product_cards',
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('document', sa.Text(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('product_id')
+    )
+
+
+def downgrade():
+    op.drop_table('product_cards')
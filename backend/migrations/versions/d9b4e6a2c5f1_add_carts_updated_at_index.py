@@ -0,0 +1,28 @@
+"""Index carts by last update for the abandoned cart sweeper
+
+Revision ID: d9b4e6a2c5f1
+Revises: c7f2a9e4d1b8
+Create Date: 2026-10-17 01:03:52.417730
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd9b4e6a2c5f1'
+down_revision = 'c7f2a9e4d1b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        # CREATE INDEX CONCURRENTLY doesn't lock out cart writes but can't run in a transaction
+        with op.get_context().autocommit_block():
+            op.create_index('ix_carts_updated_at', 'carts', ['updated_at'], unique=False, postgresql_concurrently=True)
+    else:
+        op.create_index('ix_carts_updated_at', 'carts', ['updated_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_carts_updated_at', table_name='carts')
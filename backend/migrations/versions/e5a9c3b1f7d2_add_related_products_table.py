@@ -0,0 +1,35 @@
+"""Add related_products table
+
+Revision ID: e5a9c3b1f7d2
+Revises: d2b6f0c9e813
+Create Date: 2026-10-16 19:12:08.531904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a9c3b1f7d2'
+down_revision = 'd2b6f0c9e813'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Lists stay empty until scripts/rebuild_related_products.py backfills them
+    op.create_table('related_products',
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('rank', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('related_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['related_id'], ['products.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('product_id', 'rank')
+    )
+    op.create_index(op.f('ix_related_products_related_id'), 'related_products', ['related_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_related_products_related_id'), table_name='related_products')
+    op.drop_table('related_products')
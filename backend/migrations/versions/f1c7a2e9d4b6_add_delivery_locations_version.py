@@ -0,0 +1,34 @@
+"""Add delivery_locations catalog version
+
+Revision ID: f1c7a2e9d4b6
+Revises: e5a9c3b1f7d2
+Create Date: 2026-10-16 21:26:41.094417
+
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1c7a2e9d4b6'
+down_revision = 'e5a9c3b1f7d2'
+branch_labels = None
+depends_on = None
+
+
+catalog_versions = sa.table('catalog_versions',
+    sa.column('name', sa.String),
+    sa.column('version', sa.Integer),
+    sa.column('updated_at', sa.DateTime)
+)
+
+
+def upgrade():
+    op.bulk_insert(catalog_versions, [
+        {'name': 'delivery_locations', 'version': 0, 'updated_at': datetime.utcnow()}
+    ])
+
+
+def downgrade():
+    op.execute(catalog_versions.delete().where(catalog_versions.c.name == 'delivery_locations'))
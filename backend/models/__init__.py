@@ -19,6 +19,12 @@ from .order import Order
 from .order_item import OrderItem
 from .admin_user import AdminUser
 from .customer_user import CustomerUser
+from .catalog_version import CatalogVersion
+from .product_card import ProductCard
+from .related_product import RelatedProduct, StaleRelatedProduct
+
+# Imported for its side effect: attaches the full-text search DDL to the products table
+from . import search_index  # noqa: F401
 
 # Re-export all models
 __all__ = [
@@ -37,5 +43,9 @@ __all__ = [
     'Order',
     'OrderItem',
     'AdminUser',
-    'CustomerUser'
+    'CustomerUser',
+    'CatalogVersion',
+    'ProductCard',
+    'RelatedProduct',
+    'StaleRelatedProduct'
 ] 
\ No newline at end of file
@@ -3,6 +3,10 @@ from . import db
 
 class CartItem(db.Model):
     __tablename__ = 'cart_items'
+    __table_args__ = (
+        # One row per product per cart; add-to-cart upserts against it
+        db.UniqueConstraint('cart_id', 'product_id', name='uq_cart_items_cart_id_product_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     cart_id = db.Column(db.Integer, db.ForeignKey('carts.id'), nullable=False)
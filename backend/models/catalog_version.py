@@ -0,0 +1,104 @@
+from datetime import datetime
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from . import db
+
+# Version scopes and the models whose writes bump them
+CATALOG_SCOPES = ('products', 'categories', 'brands')
+# Every versioned scope, including reference data outside the product catalog
+VERSION_SCOPES = CATALOG_SCOPES + ('delivery_locations',)
+
+
+class CatalogVersion(db.Model):
+    """Write counter per catalog scope, bumped in the same transaction as every
+    catalog write. Used to derive ETags without touching the catalog tables."""
+    __tablename__ = 'catalog_versions'
+
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<CatalogVersion {self.name} {self.version}>'
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'version': self.version,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+
+@event.listens_for(CatalogVersion.__table__, 'after_create')
+def _seed_catalog_versions(target, connection, **kw):
+    now = datetime.utcnow()
+    connection.execute(target.insert(), [
+        {'name': name, 'version': 0, 'updated_at': now} for name in VERSION_SCOPES
+    ])
+
+
+# Databases known to have the catalog_versions table, keyed by URL
+_versions_table_present = set()
+
+
+def has_catalog_versions(connection):
+    """Whether the catalog_versions table exists (positive answers are cached)"""
+    key = str(connection.engine.url)
+    if key not in _versions_table_present:
+        if not inspect(connection).has_table(CatalogVersion.__tablename__):
+            return False
+        _versions_table_present.add(key)
+    return True
+
+
+def bump_catalog_versions(connection, *names):
+    """Increment the given scopes (creating missing rows) on a connection"""
+    table = CatalogVersion.__table__
+    now = datetime.utcnow()
+    for name in names:
+        result = connection.execute(
+            table.update()
+            .where(table.c.name == name)
+            .values(version=table.c.version + 1, updated_at=now)
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(name=name, version=1, updated_at=now))
+
+
+def touch_catalog(session, *names):
+    """Bump scopes for writes that bypass the ORM (bulk and Core statements)"""
+    connection = session.connection()
+    if has_catalog_versions(connection):
+        bump_catalog_versions(connection, *names)
+
+
+def _scope_for(obj):
+    from . import Product, ProductImage, ProductSpecification, ProductFeature, Review, Category, Brand, DeliveryLocation
+
+    if isinstance(obj, (Product, ProductImage, ProductSpecification, ProductFeature, Review)):
+        return 'products'
+    if isinstance(obj, Category):
+        return 'categories'
+    if isinstance(obj, Brand):
+        return 'brands'
+    if isinstance(obj, DeliveryLocation):
+        return 'delivery_locations'
+    return None
+
+
+@event.listens_for(Session, 'after_flush')
+def _bump_on_flush(session, flush_context):
+    scopes = set()
+    for obj in session.new:
+        scopes.add(_scope_for(obj))
+    for obj in session.deleted:
+        scopes.add(_scope_for(obj))
+    for obj in session.dirty:
+        if session.is_modified(obj, include_collections=False):
+            scopes.add(_scope_for(obj))
+    scopes.discard(None)
+    if scopes:
+        connection = session.connection()
+        # Writes must keep working on databases that haven't been migrated yet
+        if has_catalog_versions(connection):
+            bump_catalog_versions(connection, *sorted(scopes))
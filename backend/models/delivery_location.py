@@ -17,11 +17,12 @@ class DeliveryLocation(db.Model):
         return f'<DeliveryLocation {self.id}>'
 
     def to_dict(self):
+        from utils.helpers import finite_float
         return {
             'id': self.id,
             'name': self.name,
             'slug': self.slug,
             'city': self.city,
-            'shippingPrice': float(self.shipping_price),
+            'shippingPrice': finite_float(self.shipping_price),
             'isActive': self.is_active
         } 
\ No newline at end of file
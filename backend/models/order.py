@@ -3,6 +3,10 @@ from . import db
 
 class Order(db.Model):
     __tablename__ = 'orders'
+    __table_args__ = (
+        # Order lookups by email, newest first
+        db.Index('ix_orders_email_created_at', 'email', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     order_number = db.Column(db.String(50), unique=True, nullable=False)
@@ -20,7 +24,7 @@ class Order(db.Model):
     payment_status = db.Column(db.String(50), default='pending', nullable=True)
     payment_method = db.Column(db.String(50), nullable=True)
     notes = db.Column(db.Text, nullable=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=True, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=True)
     
     # Customer relationship (optional for guest orders)
@@ -34,6 +38,7 @@ class Order(db.Model):
         return f'<Order {self.id}>'
 
     def to_dict(self):
+        from utils.helpers import finite_float
         return {
             'id': self.id,
             'order_number': self.order_number,
@@ -45,8 +50,8 @@ class Order(db.Model):
             'city': self.city,
             'state': self.state,
             'postal_code': self.postal_code,
-            'total_amount': float(self.total_amount) if self.total_amount else 0,
-            'shipping_cost': float(self.shipping_cost) if self.shipping_cost else 0,
+            'total_amount': finite_float(self.total_amount) if self.total_amount else 0,
+            'shipping_cost': finite_float(self.shipping_cost) if self.shipping_cost else 0,
             'status': self.status,
             'payment_status': self.payment_status,
             'payment_method': self.payment_method,
@@ -5,7 +5,7 @@ class OrderItem(db.Model):
     __tablename__ = 'order_items'
     
     id = db.Column(db.Integer, primary_key=True)
-    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False, index=True)
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
     quantity = db.Column(db.Integer, nullable=False)
     price = db.Column(db.Numeric(10, 2), nullable=False)
@@ -34,17 +34,18 @@ class OrderItem(db.Model):
                 # Fallback to raw image URL if formatting fails
                 formatted_image_url = primary_image
         
+        from utils.helpers import finite_float
         return {
             'id': self.id,
             'order_id': self.order_id,
             'product_id': self.product_id,
             'quantity': self.quantity,
-            'price': float(self.price) if self.price else 0,
+            'price': finite_float(self.price) if self.price else 0,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'product': {
                 'id': self.product.id if self.product else None,
                 'name': self.product.name if self.product else 'Unknown Product',
                 'image_url': formatted_image_url,
-                'price': float(self.product.price) if self.product and self.product.price else 0
+                'price': finite_float(self.product.price) if self.product and self.product.price else 0
             }
         } 
\ No newline at end of file
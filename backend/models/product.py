@@ -3,9 +3,13 @@ from . import db
 
 class Product(db.Model):
     __tablename__ = 'products'
+    __table_args__ = (
+        # Category listings filtered and sorted by price
+        db.Index('ix_products_category_id_price', 'category_id', 'price'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(255), nullable=False)
+    name = db.Column(db.String(255), nullable=False, index=True)
     description = db.Column(db.Text, nullable=True)
     price = db.Column(db.Numeric(10, 2), nullable=False)
     original_price = db.Column(db.Numeric(10, 2), nullable=True)
@@ -13,12 +17,19 @@ class Product(db.Model):
     stock = db.Column(db.Integer, nullable=True)
     rating = db.Column(db.Numeric(3, 2), nullable=True)
     review_count = db.Column(db.Integer, nullable=True)
+    # Rating aggregates, maintained alongside every review write (see utils.ratings)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_1 = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_2 = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_3 = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_4 = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_5 = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     is_new = db.Column(db.Boolean, nullable=True)
     is_sale = db.Column(db.Boolean, nullable=True)
     is_featured = db.Column(db.Boolean, nullable=True)
     category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=True)
-    brand_id = db.Column(db.Integer, db.ForeignKey('brands.id'), nullable=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=True)
+    brand_id = db.Column(db.Integer, db.ForeignKey('brands.id'), nullable=True, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=True, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=True)
     
     # Relationships
@@ -30,7 +41,12 @@ class Product(db.Model):
     def __repr__(self):
         return f'<Product {self.id} {self.name}>'
 
-    def to_dict(self):
+    def rating_histogram(self):
+        """Review counts by star rating"""
+        return {str(level): getattr(self, f'rating_{level}') or 0 for level in range(1, 6)}
+
+    def to_dict(self, reviews=()):
+        """Full product representation; reviews are the ones to embed (see utils.reviews)"""
         # Get the primary image URL
         primary_image = None
         if self.images:
@@ -38,7 +54,7 @@ class Product(db.Model):
                                self.images[0].image_url if self.images else None)
         
         # Format image URL using helper function
-        from utils.helpers import format_image_url
+        from utils.helpers import finite_float, format_image_url
         if primary_image:
             primary_image = format_image_url(primary_image)
         
@@ -46,8 +62,8 @@ class Product(db.Model):
             'id': self.id,
             'name': self.name,
             'description': self.description,
-            'price': float(self.price) if self.price else None,
-            'original_price': float(self.original_price) if self.original_price else None,
+            'price': finite_float(self.price) if self.price else None,
+            'original_price': finite_float(self.original_price) if self.original_price else None,
             'image_url': primary_image,
             'images': [img.to_dict() for img in self.images] if self.images else [],
             'is_new': self.is_new,
@@ -55,11 +71,12 @@ class Product(db.Model):
             'is_featured': self.is_featured,
             'category': self.category.name if self.category else None,
             'brand': self.brand.name if self.brand else None,
-            'rating': float(self.rating) if self.rating else None,
+            'rating': finite_float(self.rating) if self.rating else None,
             'review_count': self.review_count,
+            'rating_histogram': self.rating_histogram(),
             'stock': self.stock,
             'sku': self.sku,
             'features': [feature.to_dict() for feature in self.features] if self.features else [],
             'specifications': [spec.to_dict() for spec in self.specifications] if self.specifications else [],
-            'reviews': [review.to_dict() for review in self.reviews] if self.reviews else []
+            'reviews': [review.to_dict() for review in reviews]
         } 
\ No newline at end of file
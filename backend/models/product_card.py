@@ -0,0 +1,13 @@
+from datetime import datetime
+from . import db
+
+class ProductCard(db.Model):
+    """Pre-serialized product list entry (see utils.product_cards)"""
+    __tablename__ = 'product_cards'
+    
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id', ondelete='CASCADE'), primary_key=True)
+    document = db.Column(db.Text, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<ProductCard {self.product_id}>'
@@ -5,7 +5,7 @@ class ProductFeature(db.Model):
     __tablename__ = 'product_features'
     
     id = db.Column(db.Integer, primary_key=True)
-    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=True, index=True)
     feature = db.Column(db.Text, nullable=False)
     display_order = db.Column(db.Integer, nullable=True)
 
@@ -17,6 +17,9 @@ class ProductImage(db.Model):
     #     db.Index('idx_product_primary_image', 'product_id', 'is_primary', unique=True, 
     #             postgresql_where=db.Column('is_primary') == True),
     # )
+    __table_args__ = (
+        db.Index('ix_product_images_product_id_is_primary', 'product_id', 'is_primary'),
+    )
 
     def __repr__(self):
         return f'<ProductImage {self.id}>'
@@ -5,7 +5,7 @@ class ProductSpecification(db.Model):
     __tablename__ = 'product_specifications'
     
     id = db.Column(db.Integer, primary_key=True)
-    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=True, index=True)
     name = db.Column(db.String(100), nullable=False)
     value = db.Column(db.Text, nullable=False)
     display_order = db.Column(db.Integer, nullable=True)
@@ -0,0 +1,25 @@
+from datetime import datetime
+from . import db
+
+class RelatedProduct(db.Model):
+    """Precomputed similar product, ranked per product (see utils.related_products)"""
+    __tablename__ = 'related_products'
+    
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id', ondelete='CASCADE'), primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    related_id = db.Column(db.Integer, db.ForeignKey('products.id', ondelete='CASCADE'), nullable=False, index=True)
+    score = db.Column(db.Float, nullable=False)
+
+    def __repr__(self):
+        return f'<RelatedProduct {self.product_id} #{self.rank} {self.related_id}>'
+
+class StaleRelatedProduct(db.Model):
+    """Product whose related lists are waiting to be refreshed (see utils.related_products)"""
+    __tablename__ = 'stale_related_products'
+    
+    # No foreign key: deleted products are queued too, so they drop out of other lists
+    product_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    marked_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+    def __repr__(self):
+        return f'<StaleRelatedProduct {self.product_id}>'
@@ -3,6 +3,11 @@ from . import db
 
 class Review(db.Model):
     __tablename__ = 'reviews'
+    __table_args__ = (
+        # Review pages, newest or most helpful first (id breaks ties for keyset cursors)
+        db.Index('ix_reviews_product_id_date_id', 'product_id', 'date', 'id'),
+        db.Index('ix_reviews_product_id_helpful_count_id', 'product_id', 'helpful_count', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=True)
@@ -11,7 +16,8 @@ class Review(db.Model):
     title = db.Column(db.String(255), nullable=False)
     comment = db.Column(db.Text, nullable=False)
     rating = db.Column(db.Integer, nullable=False)
-    date = db.Column(db.DateTime, nullable=True)
+    date = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    helpful_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=True)
 
     def __repr__(self):
@@ -26,6 +32,7 @@ class Review(db.Model):
             'title': self.title,
             'comment': self.comment,
             'rating': self.rating,
+            'helpful_count': self.helpful_count or 0,
             'date': self.date.isoformat() if self.date else None,
             'created_at': self.created_at.isoformat() if self.created_at else None
         } 
\ No newline at end of file
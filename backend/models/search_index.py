@@ -0,0 +1,77 @@
+from sqlalchemy import DDL, event
+from .product import Product
+
+# Full-text search structures for the products table.
+#
+# PostgreSQL keeps a generated, weighted tsvector column with a GIN index.
+# SQLite keeps an FTS5 shadow table fed by triggers. Both are maintained by
+# the database itself, so every write path (API, scripts, bulk loads) stays
+# in sync without application code having to remember it.
+
+POSTGRES_SEARCH_DDL = [
+    """
+    ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(sku, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_products_search_vector ON products USING GIN (search_vector)",
+]
+
+SQLITE_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(name, sku, description)",
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts (rowid, name, sku, description)
+        VALUES (new.id, new.name, coalesce(new.sku, ''), coalesce(new.description, ''));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE OF name, sku, description ON products BEGIN
+        DELETE FROM products_fts WHERE rowid = old.id;
+        INSERT INTO products_fts (rowid, name, sku, description)
+        VALUES (new.id, new.name, coalesce(new.sku, ''), coalesce(new.description, ''));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+        DELETE FROM products_fts WHERE rowid = old.id;
+    END
+    """,
+]
+
+SQLITE_SEARCH_REBUILD = [
+    "DELETE FROM products_fts",
+    """
+    INSERT INTO products_fts (rowid, name, sku, description)
+    SELECT id, name, coalesce(sku, ''), coalesce(description, '') FROM products
+    """,
+]
+
+for statement in POSTGRES_SEARCH_DDL:
+    event.listen(Product.__table__, 'after_create', DDL(statement).execute_if(dialect='postgresql'))
+
+for statement in SQLITE_SEARCH_DDL:
+    event.listen(Product.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+
+# The FTS5 table is not part of the metadata, so drop it alongside products
+# to avoid stale rows being matched against reused product ids.
+event.listen(
+    Product.__table__,
+    'before_drop',
+    DDL('DROP TABLE IF EXISTS products_fts').execute_if(dialect='sqlite')
+)
+
+
+def rebuild_search_index(connection):
+    """Create (if missing) and repopulate the full-text index for existing rows"""
+    dialect = connection.dialect.name
+    if dialect == 'postgresql':
+        # The generated column is recomputed by PostgreSQL itself
+        for statement in POSTGRES_SEARCH_DDL:
+            connection.execute(DDL(statement))
+    elif dialect == 'sqlite':
+        for statement in SQLITE_SEARCH_DDL + SQLITE_SEARCH_REBUILD:
+            connection.execute(DDL(statement))
@@ -1,5 +1,7 @@
 from flask import Blueprint, jsonify, request
 from models import db, Category, Brand, Product, ProductImage, ProductFeature, ProductSpecification
+from utils.cache import response_cache
+from utils.suggestions import suggestion_index
 import random
 import sys
 import os
@@ -253,6 +255,10 @@ def seed_database():
         db.session.commit()
         print(f"✅ Created {len(products_created)} products successfully!")
 
+        # The catalog was replaced wholesale with bulk deletes
+        response_cache.invalidate_all()
+        suggestion_index.invalidate()
+
         return jsonify({
             'success': True,
             'message': 'Database seeded successfully!',
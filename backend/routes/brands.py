@@ -1,15 +1,20 @@
 from flask import Blueprint, jsonify, request
 from models import db, Brand, Product
+from utils.cache import response_cache
+from utils.conditional import conditional_get
 
 brands_bp = Blueprint('brands', __name__)
 
 @brands_bp.route('/api/brands', methods=['GET'])
+@conditional_get(('brands',))
+@response_cache.cached(tags=('brands',))
 def get_brands():
     """Get all brands"""
     brands = Brand.query.all()
     return jsonify([brand.to_dict() for brand in brands])
 
 @brands_bp.route('/api/brands/<int:id>', methods=['GET'])
+@conditional_get(('brands',))
 def get_brand(id):
     """Get a specific brand by ID"""
     brand = Brand.query.get_or_404(id)
@@ -41,6 +46,7 @@ def create_brand():
         
         db.session.add(brand)
         db.session.commit()
+        response_cache.invalidate('brands')
         
         return jsonify(brand.to_dict()), 201
         
@@ -72,6 +78,7 @@ def update_brand(id):
         brand.logo_url = data.get('logo_url')
         
         db.session.commit()
+        response_cache.invalidate('brands')
         
         return jsonify(brand.to_dict())
         
@@ -91,6 +98,7 @@ def delete_brand(id):
     try:
         db.session.delete(brand)
         db.session.commit()
+        response_cache.invalidate('brands')
         return jsonify({'message': 'Brand deleted successfully'})
     except Exception as e:
         db.session.rollback()
@@ -1,9 +1,14 @@
-from flask import Blueprint, jsonify, request
-from models import db, Cart, CartItem, Product
-from decimal import Decimal
+from flask import Blueprint, jsonify, request, current_app
+from models import db
+from utils.cart import CartOperationError, parse_cart_operation
+from utils.cart_store import CartStoreError, cart_store
 
 cart_bp = Blueprint('cart', __name__)
 
+def wants_verbose():
+    """Whether the client asked for full product documents (?verbose=true)"""
+    return request.args.get('verbose', 'false').lower() == 'true'
+
 @cart_bp.route('/api/cart', methods=['GET'])
 def get_cart():
     """Get cart contents"""
@@ -11,11 +16,11 @@ def get_cart():
     if not session_id:
         return jsonify({'error': 'Session ID is required'}), 400
     
-    cart = Cart.query.filter_by(session_id=session_id).first()
+    cart = cart_store().get(db.session, session_id, verbose=wants_verbose())
     if not cart:
-        return jsonify({'cart': None, 'items': [], 'total': 0})
+        return jsonify({'cart': None, 'items': [], 'total': 0, 'item_count': 0, 'subtotal': 0})
     
-    return jsonify(cart.to_dict())
+    return jsonify(cart)
 
 @cart_bp.route('/api/cart/items', methods=['POST'])
 def add_to_cart():
@@ -31,45 +36,50 @@ def add_to_cart():
     if not product_id:
         return jsonify({'error': 'Product ID is required'}), 400
     
-    # Validate product exists
-    product = Product.query.get(product_id)
-    if not product:
-        return jsonify({'error': 'Product not found'}), 404
-    
     # Validate quantity
     if quantity <= 0:
         return jsonify({'error': 'Quantity must be greater than 0'}), 400
     
     try:
-        # Get or create cart
-        cart = Cart.query.filter_by(session_id=session_id).first()
-        if not cart:
-            cart = Cart(session_id=session_id)
-            db.session.add(cart)
-            db.session.flush()
-        
-        # Check if item already exists in cart
-        existing_item = CartItem.query.filter_by(
-            cart_id=cart.id, 
-            product_id=product_id
-        ).first()
-        
-        if existing_item:
-            # Update quantity
-            existing_item.quantity += quantity
-        else:
-            # Create new cart item
-            cart_item = CartItem(
-                cart_id=cart.id,
-                product_id=product_id,
-                quantity=quantity
-            )
-            db.session.add(cart_item)
+        return jsonify(cart_store().add_item(db.session, session_id, product_id, quantity, verbose=wants_verbose()))
         
-        db.session.commit()
-        
-        return jsonify(cart.to_dict())
+    except CartStoreError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), e.status
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@cart_bp.route('/api/cart/batch', methods=['POST'])
+def batch_update_cart():
+    """Apply a list of add/set/remove/merge operations to a cart in one transaction"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not data.get('session_id'):
+        return jsonify({'error': 'Session ID is required'}), 400
+    operations = data.get('operations')
+    if not isinstance(operations, list) or not operations:
+        return jsonify({'error': 'operations must be a non-empty list'}), 400
+    max_operations = current_app.config['MAX_CART_BATCH_OPERATIONS']
+    if len(operations) > max_operations:
+        return jsonify({'error': f'At most {max_operations} operations may be applied at once'}), 400
+    
+    parsed = []
+    for index, operation in enumerate(operations):
+        try:
+            parsed.append(parse_cart_operation(operation))
+        except ValueError as e:
+            return jsonify({'error': str(e), 'index': index}), 400
+    
+    try:
+        # All or nothing: any operation that can't be applied leaves the cart untouched
+        return jsonify(cart_store().apply_operations(db.session, data['session_id'], parsed, verbose=wants_verbose()))
         
+    except CartOperationError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e), 'index': e.index}), 400
+    except CartStoreError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), e.status
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -86,14 +96,12 @@ def update_cart_item(item_id):
     if quantity <= 0:
         return jsonify({'error': 'Quantity must be greater than 0'}), 400
     
-    cart_item = CartItem.query.get_or_404(item_id)
-    
     try:
-        cart_item.quantity = quantity
-        db.session.commit()
-        
-        return jsonify(cart_item.cart.to_dict())
+        return jsonify(cart_store().update_item(db.session, item_id, quantity, verbose=wants_verbose()))
         
+    except CartStoreError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), e.status
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -101,20 +109,17 @@ def update_cart_item(item_id):
 @cart_bp.route('/api/cart/items/<int:item_id>', methods=['DELETE'])
 def remove_from_cart(item_id):
     """Remove item from cart"""
-    cart_item = CartItem.query.get(item_id)
-    
-    if not cart_item:
-        # Item doesn't exist, return success since the goal is achieved
-        return jsonify({'message': 'Item not found in cart', 'items': [], 'total': 0}), 200
-    
-    cart = cart_item.cart
-    
     try:
-        db.session.delete(cart_item)
-        db.session.commit()
+        cart = cart_store().remove_item(db.session, item_id, verbose=wants_verbose())
+        if cart is None:
+            # Item doesn't exist, return success since the goal is achieved
+            return jsonify({'message': 'Item not found in cart', 'items': [], 'total': 0}), 200
         
-        return jsonify(cart.to_dict())
+        return jsonify(cart)
         
+    except CartStoreError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), e.status
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -126,16 +131,15 @@ def clear_cart():
     if not session_id:
         return jsonify({'error': 'Session ID is required'}), 400
     
-    cart = Cart.query.filter_by(session_id=session_id).first()
-    if not cart:
-        return jsonify({'message': 'Cart is already empty'})
-    
     try:
-        db.session.delete(cart)
-        db.session.commit()
+        if not cart_store().clear(db.session, session_id):
+            return jsonify({'message': 'Cart is already empty'})
         
         return jsonify({'message': 'Cart cleared successfully'})
         
+    except CartStoreError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), e.status
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500 
\ No newline at end of file
@@ -1,15 +1,20 @@
 from flask import Blueprint, jsonify, request
 from models import db, Category, Product
+from utils.cache import response_cache
+from utils.conditional import conditional_get
 
 categories_bp = Blueprint('categories', __name__)
 
 @categories_bp.route('/api/categories', methods=['GET'])
+@conditional_get(('categories',))
+@response_cache.cached(tags=('categories',))
 def get_categories():
     """Get all categories"""
     categories = Category.query.all()
     return jsonify([category.to_dict() for category in categories])
 
 @categories_bp.route('/api/categories/<int:id>', methods=['GET'])
+@conditional_get(('categories',))
 def get_category(id):
     """Get a specific category by ID"""
     category = Category.query.get_or_404(id)
@@ -41,6 +46,7 @@ def create_category():
         
         db.session.add(category)
         db.session.commit()
+        response_cache.invalidate('categories')
         
         return jsonify(category.to_dict()), 201
         
@@ -72,6 +78,7 @@ def update_category(id):
         category.image_url = data.get('image_url')
         
         db.session.commit()
+        response_cache.invalidate('categories')
         
         return jsonify(category.to_dict())
         
@@ -91,6 +98,7 @@ def delete_category(id):
     try:
         db.session.delete(category)
         db.session.commit()
+        response_cache.invalidate('categories')
         return jsonify({'message': 'Category deleted successfully'})
     except Exception as e:
         db.session.rollback()
@@ -1,6 +1,11 @@
 from flask import Blueprint, jsonify, send_from_directory, current_app
 import os
 from models import db, Category, Brand, Product, ProductImage, ProductFeature, ProductSpecification
+from utils.cache import response_cache
+from utils.suggestions import suggestion_index
+from utils.conditional import catalog_validators, not_modified
+from utils.bootstrap import BOOTSTRAP_SCOPES, bootstrap_snapshot
+from utils.cart_sweeper import sweep_metrics
 import random
 
 main_bp = Blueprint('main', __name__)
@@ -275,6 +280,10 @@ def seed_database():
         db.session.commit()
         print(f"✅ Created {len(products_created)} products successfully!")
 
+        # The catalog was replaced wholesale with bulk deletes
+        response_cache.invalidate_all()
+        suggestion_index.invalidate()
+
         return jsonify({
             'success': True,
             'message': 'Database seeded successfully!',
@@ -308,6 +317,36 @@ def health_check():
         'debug': current_app.config.get('DEBUG', False)
     }), 200
 
+@main_bp.route('/api/bootstrap')
+def bootstrap():
+    """Categories and brands with product counts, active delivery locations and price bounds"""
+    try:
+        etag, last_modified = catalog_validators(db.session, BOOTSTRAP_SCOPES)
+        if not_modified(etag, last_modified):
+            response = current_app.response_class(status=304)
+        else:
+            response = current_app.response_class(bootstrap_snapshot.get(db.session, etag), mimetype='application/json')
+    except Exception as e:
+        current_app.logger.error(f"Error building bootstrap data: {str(e)}")
+        return jsonify({'error': 'Failed to load bootstrap data'}), 500
+    
+    # The body is fixed for a given set of versions, so the ETag is strong
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@main_bp.route('/api/cache/stats')
+def cache_stats():
+    """Response cache hit/miss counters for this worker"""
+    return jsonify(response_cache.stats())
+
+@main_bp.route('/api/cart/sweeper/stats')
+def cart_sweeper_stats():
+    """Abandoned cart sweeps run by this worker: rows purged and runtime"""
+    return jsonify(sweep_metrics.snapshot())
+
 @main_bp.route('/static/<path:filename>')
 def serve_static(filename):
     """Serve static files"""
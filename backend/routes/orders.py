@@ -1,5 +1,6 @@
 from flask import Blueprint, jsonify, request
 from models import db, Order, OrderItem, Cart, CartItem, DeliveryLocation, Product
+from utils.cart_store import cart_store
 from decimal import Decimal
 import uuid
 from datetime import datetime
@@ -35,7 +36,12 @@ def create_order():
         if not cart_items:
             return jsonify({'error': 'Cart is empty'}), 400
     else:
-        # Try to get cart from database
+        # Try to get cart from database, once the cart store has written it through
+        try:
+            cart_store().persist(db.session, data['session_id'])
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 500
         cart = Cart.query.filter_by(session_id=data['session_id']).first()
         if not cart or not cart.items:
             return jsonify({'error': 'Cart is empty'}), 400
@@ -124,6 +130,8 @@ def create_order():
             db.session.delete(cart)
         
         db.session.commit()
+        if not data.get('cart_items'):
+            cart_store().discard(data['session_id'])
         
         return jsonify(order.to_dict()), 201
         
@@ -1,25 +1,78 @@
-from flask import Blueprint, jsonify, request, current_app
+from flask import Blueprint, jsonify, request, current_app, stream_with_context
 from sqlalchemy import or_, and_, case, func, literal
 from decimal import Decimal
-from models import db, Product, Category, Brand, ProductImage, ProductSpecification, ProductFeature, Review
-from utils.helpers import validate_product_data, validate_review_data, validate_image_data, validate_specification_data, validate_feature_data, paginate, format_image_url
-from sqlalchemy.orm import joinedload
+from models import db, Product, Category, Brand, ProductImage, ProductSpecification, ProductFeature, ProductCard, RelatedProduct
+from models.catalog_version import CATALOG_SCOPES, touch_catalog
+from utils.helpers import validate_product_data, validate_image_data, validate_specification_data, validate_feature_data, paginate
+from utils.filters import PRODUCT_FLAGS, parse_product_filters, apply_product_filters, price_range_condition
+from utils.pagination import InvalidCursor, encode_cursor, decode_cursor, cursor_value, parse_cursor_value, keyset_order, keyset_filter
+from utils.suggestions import suggestion_index
+from utils.cache import response_cache
+from utils.conditional import conditional_get, request_catalog_versions
+from utils.product_import import IMPORT_FORMATS, ProductImporter, import_format_for, iter_import_rows
+from utils.related_products import DEFAULT_RELATED_LIMIT
+from utils.reviews import review_preview, rating_summary
+from utils.product_export import EXPORT_FORMATS, EXPORT_MIMETYPES, iter_export_rows, export_chunks, export_coding, gzip_chunks
+from utils.product_updates import parse_product_patch, apply_product_patches, parse_product_children, sync_children
+from utils.auth import require_auth
+from utils.price_stats import DEFAULT_PRICE_EDGES, parse_price_edges, price_bucket, bucket_distribution, compute_price_stats, price_stats_cache
+from utils.product_cards import PRODUCT_LIST_FIELDS, parse_product_fields, is_full_card, product_list_options, product_list_dict, product_card_documents, card_list_response
+from sqlalchemy.orm import joinedload, load_only
 
 products_bp = Blueprint('products', __name__)
 
+# Sortable columns for product listings and how their cursor values are typed
+SORT_COLUMNS = {
+    'name': (Product.name, 'str'),
+    'price': (Product.price, 'decimal'),
+    'rating': (Product.rating, 'decimal'),
+    'created_at': (Product.created_at, 'datetime'),
+}
+
+def list_query_options(fields, extra_columns=()):
+    """Loader options for a product list query: ids only when stored cards will be used"""
+    if is_full_card(fields):
+        return [load_only(*[getattr(Product, column) for column in ('id', *extra_columns)])]
+    return product_list_options(fields, extra_columns)
+
+def product_detail(product):
+    """A product's full representation with its rating summary and first page of reviews"""
+    reviews, next_cursor = review_preview(db.session, product.id)
+    data = product.to_dict(reviews=reviews)
+    data['rating_summary'] = rating_summary(product)
+    data['reviews_next_cursor'] = next_cursor
+    return data
+
+def product_list_response(envelope, products, fields):
+    """Respond with a list of products, spliced from stored cards for full entries"""
+    if is_full_card(fields):
+        return card_list_response(envelope, product_card_documents(db.session, [product.id for product in products]))
+    return jsonify({**envelope, 'products': [product_list_dict(product, fields) for product in products]})
+
 @products_bp.route('/api/products/price-stats', methods=['GET'])
+@conditional_get(CATALOG_SCOPES)
+@response_cache.cached(tags=('products',))
 def get_price_stats():
-    """Get price statistics for filtering"""
+    """Get price statistics and distribution for filtering"""
+    edges = parse_price_edges(request.args.get('edges'), current_app.config.get('PRICE_BUCKET_EDGES', DEFAULT_PRICE_EDGES))
+    if edges is None:
+        return jsonify({'error': 'edges must be a comma separated list of increasing integers'}), 400
+    
+    # Optional scope, using the same parameters as the product listing
+    categories = tuple(sorted(request.args.getlist('categories[]') or request.args.getlist('category')))
+    brands = tuple(sorted(request.args.getlist('brands[]') or request.args.getlist('brand')))
+    
     try:
-        # Get price statistics
-        stats = db.session.query(
-            func.min(Product.price).label('min_price'),
-            func.max(Product.price).label('max_price'),
-            func.avg(Product.price).label('avg_price'),
-            func.count(Product.id).label('total_products')
-        ).filter(Product.price.isnot(None)).first()
+        # Same catalog versions as the ETag, so a write from any process misses the memo
+        versions = request_catalog_versions(db.session, CATALOG_SCOPES)
+        version = tuple(versions[scope][0] for scope in CATALOG_SCOPES)
+        key = (edges, categories, brands)
+        stats = price_stats_cache.get(key, current_app.config.get('PRICE_STATS_TTL'), version)
+        if stats is None:
+            stats = compute_price_stats(db.session, edges, categories, brands)
+            price_stats_cache.set(key, stats, version)
         
-        if not stats or not stats.min_price:
+        if not stats:
             return jsonify({
                 'min_price': 0,
                 'max_price': 50000,
@@ -27,35 +80,7 @@ def get_price_stats():
                 'total_products': 0
             })
         
-        # Get price distribution
-        price_ranges = [
-            (0, 1000, 'Under KES 1,000'),
-            (1000, 5000, 'KES 1,000 - 5,000'),
-            (5000, 15000, 'KES 5,000 - 15,000'),
-            (15000, 30000, 'KES 15,000 - 30,000'),
-            (30000, 50000, 'Over KES 30,000')
-        ]
-        
-        distribution = []
-        for min_price, max_price, label in price_ranges:
-            count = db.session.query(Product).filter(
-                Product.price >= min_price,
-                Product.price < max_price if max_price < 50000 else Product.price >= max_price
-            ).count()
-            distribution.append({
-                'range': label,
-                'count': count,
-                'min_price': min_price,
-                'max_price': max_price
-            })
-        
-        return jsonify({
-            'min_price': float(stats.min_price),
-            'max_price': float(stats.max_price),
-            'avg_price': float(stats.avg_price) if stats.avg_price else 0,
-            'total_products': stats.total_products,
-            'distribution': distribution
-        })
+        return jsonify(stats)
     except Exception as e:
         current_app.logger.error(f"Error getting price stats: {str(e)}")
         return jsonify({'error': 'Failed to get price statistics'}), 500
@@ -77,26 +102,13 @@ def get_search_suggestions():
                 'message': 'Query must be at least 2 characters'
             })
         
-        # Search in product names only for now (simplified)
+        # Answer from the in-memory suggestion index (products, categories, brands)
         suggestions = []
-        
-        # Product name suggestions
-        current_app.logger.info("Querying product names...")
         try:
-            product_suggestions = db.session.query(Product.name).filter(
-                Product.name.ilike(f'%{query}%')
-            ).limit(limit).all()
-            current_app.logger.info(f"Found {len(product_suggestions)} product suggestions")
-            
-            for suggestion in product_suggestions:
-                suggestions.append({
-                    'text': suggestion.name,
-                    'type': 'product',
-                    'count': 1,
-                    'priority': 1
-                })
+            suggestion_index.ensure_loaded(db.session, current_app.config.get('SEARCH_SUGGESTIONS_TTL'))
+            suggestions = suggestion_index.lookup(query, limit)
         except Exception as e:
-            current_app.logger.error(f"Error in product suggestions: {str(e)}")
+            current_app.logger.error(f"Error in search suggestions index: {str(e)}")
             # Don't raise, just continue with empty suggestions
         
         current_app.logger.info(f"Total suggestions found: {len(suggestions)}")
@@ -121,187 +133,212 @@ def get_search_suggestions():
             'message': 'Failed to get search suggestions'
         }), 500
 
+@products_bp.route('/api/products/facets', methods=['GET'])
+@conditional_get(CATALOG_SCOPES)
+@response_cache.cached(tags=('products', 'categories', 'brands'))
+def get_product_facets():
+    """Get per-facet product counts for the current filter state"""
+    filters = parse_product_filters(request.args)
+    edges = parse_price_edges(request.args.get('edges'), current_app.config.get('PRICE_BUCKET_EDGES', DEFAULT_PRICE_EDGES))
+    if edges is None:
+        return jsonify({'error': 'edges must be a comma separated list of increasing integers'}), 400
+    
+    bucket = price_bucket(Product.price, edges)
+    price_condition = price_range_condition(Product, filters)
+    in_range = case((price_condition, 1), else_=0) if price_condition is not None else literal(1)
+    group_columns = [Category.name, Brand.name, *[getattr(Product, flag) for flag in PRODUCT_FLAGS], bucket, in_range]
+    
+    # One grouped query over every facet combination; only search narrows it in SQL so
+    # each facet can be counted with the other filters applied but not its own
+    query = db.session.query(*group_columns, func.count(Product.id)).select_from(Product) \
+        .outerjoin(Category, Product.category_id == Category.id) \
+        .outerjoin(Brand, Product.brand_id == Brand.id)
+    query = apply_product_filters(query, db.session, filters, exclude=('categories', 'brands', 'price', 'flags'), rank=False)
+    rows = query.group_by(*group_columns).all()
+    
+    selected_categories = set(filters['categories'])
+    selected_brands = set(filters['brands'])
+    
+    def matches(row, skip):
+        category, brand, featured, new, sale, _, row_in_range, _ = row
+        flag_values = dict(zip(PRODUCT_FLAGS, (featured, new, sale)))
+        if selected_categories and skip != 'categories' and category not in selected_categories:
+            return False
+        if selected_brands and skip != 'brands' and brand not in selected_brands:
+            return False
+        if skip != 'price' and not row_in_range:
+            return False
+        return all(flag_values[flag] for flag in filters['flags'] if flag != skip)
+    
+    total = 0
+    category_counts, brand_counts, bucket_counts = {}, {}, {}
+    flag_counts = dict.fromkeys(PRODUCT_FLAGS, 0)
+    for row in rows:
+        category, brand, row_bucket, count = row[0], row[1], row[5], row[7]
+        if matches(row, None):
+            total += count
+        if category is not None and matches(row, 'categories'):
+            category_counts[category] = category_counts.get(category, 0) + count
+        if brand is not None and matches(row, 'brands'):
+            brand_counts[brand] = brand_counts.get(brand, 0) + count
+        if matches(row, 'price'):
+            bucket_counts[row_bucket] = bucket_counts.get(row_bucket, 0) + count
+        for index, flag in enumerate(PRODUCT_FLAGS):
+            if row[2 + index] and matches(row, flag):
+                flag_counts[flag] += count
+    
+    def facet_list(counts):
+        return [{'name': name, 'count': count}
+                for name, count in sorted(counts.items(), key=lambda item: (-item[1], item[0]))]
+    
+    return jsonify({
+        'total': total,
+        'categories': facet_list(category_counts),
+        'brands': facet_list(brand_counts),
+        'flags': flag_counts,
+        'price_buckets': bucket_distribution(edges, bucket_counts)
+    })
+
 @products_bp.route('/api/products', methods=['GET'])
+@conditional_get(CATALOG_SCOPES)
+@response_cache.cached(tags=('products', 'categories', 'brands'))
 def get_products():
     """Get all products with optional filtering and pagination"""
     # Get query parameters
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 10, type=int)
     limit = request.args.get('limit', type=int)
-    search = request.args.get('search', '')
-    
-    # Handle both single and multiple category/brand parameters
-    categories = request.args.getlist('categories[]') or request.args.getlist('category')
-    brands = request.args.getlist('brands[]') or request.args.getlist('brand')
-    
-    min_price = request.args.get('min_price', type=float)
-    max_price = request.args.get('max_price', type=float)
+    filters = parse_product_filters(request.args)
     sort_by = request.args.get('sort_by', 'name')
     sort_order = request.args.get('sort_order', 'asc')
+    cursor = request.args.get('cursor')
+    include_total = request.args.get('include_total', 'true').lower() != 'false'
     
-    # Get boolean filter parameters
-    is_featured = request.args.get('is_featured', '').lower() == 'true'
-    is_new = request.args.get('is_new', '').lower() == 'true'
-    is_sale = request.args.get('is_sale', '').lower() == 'true'
+    # Sparse fieldsets: only load and emit what the client asked for
+    fields = parse_product_fields(request.args.get('fields'))
+    if fields is None:
+        return jsonify({'error': f"Invalid fields. Allowed fields: {', '.join(PRODUCT_LIST_FIELDS)}"}), 400
     
-    # Build query
-    query = Product.query.options(
-        joinedload(Product.category),
-        joinedload(Product.brand),
-        joinedload(Product.images),
-        joinedload(Product.specifications),
-        joinedload(Product.features),
-        joinedload(Product.reviews)
-    )
+    # Apply sorting (product id breaks ties so pages are stable)
+    sort_column, sort_kind = SORT_COLUMNS.get(sort_by, SORT_COLUMNS['name'])
+    descending = sort_order == 'desc'
     
-    # Apply filters with enhanced search ranking
-    if search:
-        search_term = f"%{search}%"
-        search_lower = search.lower()
-        
-        # Create a more sophisticated search with proper word boundary matching
-        query = query.filter(
-            or_(
-                # Product name contains the search term (case insensitive)
-                Product.name.ilike(search_term),
-                # Product name starts with search term
-                Product.name.ilike(f"{search}%"),
-                # Product name ends with search term
-                Product.name.ilike(f"%{search}"),
-                # Product name contains search term as a word (with word boundaries)
-                func.lower(Product.name).contains(search_lower),
-                # SKU exact match
-                Product.sku.ilike(search_lower),
-                # SKU contains search term
-                Product.sku.ilike(search_term),
-                # Description contains search term (lowest priority)
-                Product.description.ilike(search_term)
+    # Build query with search (relevance ranked), category, brand, price and flag filters
+    query = Product.query.options(*list_query_options(fields, extra_columns=(sort_column.key,)))
+    query = apply_product_filters(query, db.session, filters)
+    
+    # Keyset pagination when a cursor is given (an empty cursor starts at the first page)
+    if cursor is not None:
+        page_size = min(limit or per_page, current_app.config['MAX_PAGE_SIZE'])
+        try:
+            products, next_cursor = paginate_by_cursor(
+                query, cursor, page_size, sort_column, sort_kind, descending,
+                ranked=bool(filters['search']), signature=f"{sort_by}:{sort_order}:{filters['search']}"
             )
-        )
+        except InvalidCursor as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Enhanced relevance scoring with proper word boundary matching
-        query = query.order_by(
-            case(
-                # Exact name match (highest priority)
-                (func.lower(Product.name) == search_lower, 1),
-                # Name starts with search term
-                (func.lower(Product.name).startswith(search_lower), 2),
-                # Name ends with search term
-                (func.lower(Product.name).endswith(search_lower), 3),
-                # Name contains search term as a complete word
-                (func.lower(Product.name).contains(f" {search_lower} "), 4),
-                (func.lower(Product.name).contains(f"{search_lower} "), 5),
-                (func.lower(Product.name).contains(f" {search_lower}"), 6),
-                # Name contains search term anywhere
-                (func.lower(Product.name).contains(search_lower), 7),
-                # SKU exact match
-                (func.lower(Product.sku) == search_lower, 8),
-                # SKU contains search term
-                (func.lower(Product.sku).contains(search_lower), 9),
-                # Description contains search term (lowest priority)
-                (func.lower(Product.description).contains(search_lower), 10),
-                else_=11
-            )
-        )
-    
-    # Apply category filters
-    if categories:
-        query = query.join(Category).filter(Category.name.in_(categories))
-    
-    # Apply brand filters
-    if brands:
-        query = query.join(Brand).filter(Brand.name.in_(brands))
-    
-    if min_price is not None:
-        query = query.filter(Product.price >= min_price)
-    
-    if max_price is not None:
-        query = query.filter(Product.price <= max_price)
-    
-    # Apply boolean filters
-    if is_featured:
-        query = query.filter(Product.is_featured == True)
-    
-    if is_new:
-        query = query.filter(Product.is_new == True)
-    
-    if is_sale:
-        query = query.filter(Product.is_sale == True)
-    
-    # Apply sorting
-    if sort_by == 'price':
-        if sort_order == 'desc':
-            query = query.order_by(Product.price.desc())
-        else:
-            query = query.order_by(Product.price.asc())
-    elif sort_by == 'rating':
-        if sort_order == 'desc':
-            query = query.order_by(Product.rating.desc())
-        else:
-            query = query.order_by(Product.rating.asc())
-    elif sort_by == 'created_at':
-        if sort_order == 'desc':
-            query = query.order_by(Product.created_at.desc())
-        else:
-            query = query.order_by(Product.created_at.asc())
-    else:  # default to name
-        if sort_order == 'desc':
-            query = query.order_by(Product.name.desc())
-        else:
-            query = query.order_by(Product.name.asc())
-    
-    def product_list_dict(product):
-        return {
-            'id': product.id,
-            'name': product.name,
-            'description': product.description,
-            'price': float(product.price) if product.price else None,
-            'original_price': float(product.original_price) if product.original_price else None,
-            'image_url': format_image_url(next((img.image_url for img in product.images if img.is_primary), 
-                           product.images[0].image_url if product.images else None)),
-            'images': [{
-                'id': img.id,
-                'product_id': img.product_id,
-                'image_url': format_image_url(img.image_url),
-                'is_primary': img.is_primary,
-                'display_order': img.display_order
-            } for img in product.images],
-            'is_new': product.is_new,
-            'is_sale': product.is_sale,
-            'is_featured': product.is_featured,
-            'category': product.category.name if product.category else None,
-            'brand': product.brand.name if product.brand else None,
-            'rating': float(product.rating) if product.rating else None,
-            'review_count': product.review_count,
-            'stock': product.stock,
-            'sku': product.sku
+        response = {
+            'next_cursor': next_cursor,
+            'per_page': page_size
         }
+        if include_total:
+            response['total'] = query.order_by(None).count()
+        return product_list_response(response, products, fields)
+    
+    if descending:
+        query = query.order_by(sort_column.desc(), Product.id.desc())
+    else:
+        query = query.order_by(sort_column.asc(), Product.id.asc())
     
     # Use limit if provided, otherwise use pagination
     if limit:
         # Calculate offset based on page
         offset = (page - 1) * limit
         products = query.offset(offset).limit(limit).all()
-        total = query.count()
-        return jsonify({
-            'products': [product_list_dict(product) for product in products],
+        total = query.order_by(None).count() if include_total else None
+        return product_list_response({
             'total': total,
-            'pages': (total + limit - 1) // limit,
+            'pages': (total + limit - 1) // limit if include_total else None,
             'current_page': page
-        })
+        }, products, fields)
     else:
         # Paginate results
-        pagination = paginate(query, page, per_page)
+        pagination = paginate(query, page, per_page, count=include_total)
         
-        return jsonify({
-            'products': [product_list_dict(product) for product in pagination.items],
+        return product_list_response({
             'total': pagination.total,
-            'pages': pagination.pages,
+            'pages': pagination.pages if include_total else None,
             'current_page': page,
             'per_page': per_page
-        })
+        }, pagination.items, fields)
+
+def paginate_by_cursor(query, cursor, page_size, sort_column, sort_kind, descending, ranked, signature):
+    """Fetch one page of products after a cursor, returning (products, next_cursor)"""
+    state = decode_cursor(cursor) if cursor else {}
+    if state and state.get('s') != signature:
+        raise InvalidCursor('Cursor does not match the current sort or search')
+    
+    # Relevance-ranked search results have no stable seek key, so their
+    # cursors carry an offset into the (already narrowed) match set
+    if ranked:
+        offset = state.get('o', 0)
+        if not isinstance(offset, int) or offset < 0:
+            raise InvalidCursor('Invalid cursor')
+        query = query.order_by(*keyset_order(sort_column, Product.id, descending))
+        rows = query.offset(offset).limit(page_size + 1).all()
+        next_state = {'s': signature, 'o': offset + page_size}
+    else:
+        if state:
+            last_value, last_id = state.get('k', [None, None])
+            if not isinstance(last_id, int):
+                raise InvalidCursor('Invalid cursor')
+            last_value = parse_cursor_value(last_value, sort_kind)
+            query = query.filter(keyset_filter(sort_column, Product.id, last_value, last_id, descending))
+        query = query.order_by(*keyset_order(sort_column, Product.id, descending))
+        rows = query.limit(page_size + 1).all()
+        next_state = None
+        if len(rows) > page_size:
+            last = rows[page_size - 1]
+            next_state = {'s': signature, 'k': [cursor_value(getattr(last, sort_column.key)), last.id]}
+    
+    if len(rows) <= page_size:
+        return rows, None
+    return rows[:page_size], encode_cursor(next_state)
+
+@products_bp.route('/api/products/batch', methods=['GET'])
+@conditional_get(CATALOG_SCOPES)
+@response_cache.cached(tags=('products', 'categories', 'brands'))
+def get_products_batch():
+    """Get several products by ID in one query"""
+    raw_ids = [value.strip() for value in request.args.get('ids', '').split(',') if value.strip()]
+    if not raw_ids:
+        return jsonify({'error': 'ids parameter is required'}), 400
+    try:
+        ids = [int(value) for value in raw_ids]
+    except ValueError:
+        return jsonify({'error': 'ids must be a comma separated list of integers'}), 400
+    
+    # Drop duplicates but keep the order the client asked for
+    ids = list(dict.fromkeys(ids))
+    max_ids = current_app.config.get('MAX_BATCH_IDS', 100)
+    if len(ids) > max_ids:
+        return jsonify({'error': f'At most {max_ids} ids may be requested at once'}), 400
+    
+    fields = parse_product_fields(request.args.get('fields'))
+    if fields is None:
+        return jsonify({'error': f"Invalid fields. Allowed fields: {', '.join(PRODUCT_LIST_FIELDS)}"}), 400
+    
+    products = Product.query.options(*list_query_options(fields)).filter(Product.id.in_(ids)).all()
+    by_id = {product.id: product for product in products}
+    
+    return product_list_response({
+        'missing': [id for id in ids if id not in by_id]
+    }, [by_id[id] for id in ids if id in by_id], fields)
 
 @products_bp.route('/api/products/<int:id>', methods=['GET'])
+@conditional_get(CATALOG_SCOPES)
+@response_cache.cached(tags=lambda id: (f'product:{id}', 'categories', 'brands'))
 def get_product(id):
     """Get a specific product by ID"""
     product = Product.query.options(
@@ -309,11 +346,35 @@ def get_product(id):
         joinedload(Product.brand),
         joinedload(Product.images),
         joinedload(Product.specifications),
-        joinedload(Product.features),
-        joinedload(Product.reviews)
+        joinedload(Product.features)
     ).get_or_404(id)
     
-    return jsonify(product.to_dict())
+    return jsonify(product_detail(product))
+
+@products_bp.route('/api/products/<int:id>/related', methods=['GET'])
+@conditional_get(CATALOG_SCOPES)
+@response_cache.cached(tags=('products', 'categories', 'brands'))
+def get_related_products(id):
+    """Get similar products from the precomputed related-products index"""
+    max_limit = current_app.config.get('RELATED_PRODUCTS_LIMIT', DEFAULT_RELATED_LIMIT)
+    limit = min(max(request.args.get('limit', max_limit, type=int), 1), max_limit)
+    
+    try:
+        # One primary-key range scan, joined to the stored cards
+        rows = db.session.query(RelatedProduct.related_id, ProductCard.document) \
+            .outerjoin(ProductCard, ProductCard.product_id == RelatedProduct.related_id) \
+            .filter(RelatedProduct.product_id == id) \
+            .order_by(RelatedProduct.rank).limit(limit).all()
+        if not rows and db.session.get(Product, id) is None:
+            return jsonify({'error': 'Product not found'}), 404
+        
+        documents = [document for _, document in rows]
+        if None in documents:
+            documents = product_card_documents(db.session, [related_id for related_id, _ in rows])
+        return card_list_response({'product_id': id}, documents)
+    except Exception as e:
+        current_app.logger.error(f"Error fetching related products: {str(e)}")
+        return jsonify({'error': 'Failed to fetch related products'}), 500
 
 @products_bp.route('/api/products/check-sku', methods=['GET'])
 def check_sku():
@@ -420,109 +481,219 @@ def create_product():
                 db.session.add(product_feature)
         
         db.session.commit()
+        response_cache.invalidate('products')
         
-        return jsonify(product.to_dict()), 201
+        return jsonify(product_detail(product)), 201
         
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
-@products_bp.route('/api/products/<int:id>', methods=['PUT'])
-def update_product(id):
-    """Update an existing product"""
-    product = Product.query.get_or_404(id)
-    data = request.get_json()
+@products_bp.route('/api/products/import', methods=['POST'])
+@require_auth
+def import_products():
+    """Bulk import products from a CSV or JSONL upload, upserting by SKU"""
+    upload = request.files.get('file')
+    stream = upload.stream if upload else request.stream
+    fmt = request.args.get('format') or import_format_for(upload.filename if upload else None, request.mimetype)
+    if fmt not in IMPORT_FORMATS:
+        return jsonify({'error': f"format must be one of: {', '.join(IMPORT_FORMATS)}"}), 400
     
-    # Validate product data
-    is_valid, error_message = validate_product_data(data)
-    if not is_valid:
-        return jsonify({'error': error_message}), 400
+    upsert = request.args.get('upsert', 'true').lower() != 'false'
+    batch_size = request.args.get('batch_size', current_app.config['IMPORT_BATCH_SIZE'], type=int)
+    importer = ProductImporter(
+        db.session,
+        upsert=upsert,
+        batch_size=min(max(batch_size, 1), current_app.config['IMPORT_BATCH_SIZE']),
+        max_errors=current_app.config['IMPORT_MAX_ERRORS']
+    )
     
     try:
-        # Update product fields
-        product.name = data['name']
-        product.description = data.get('description')
-        product.price = Decimal(str(data['price']))
-        product.original_price = Decimal(str(data['original_price'])) if data.get('original_price') else None
-        # Handle SKU - set to None if empty string to avoid UNIQUE constraint issues
-        sku_value = data.get('sku')
-        product.sku = sku_value if sku_value and sku_value.strip() else None
-        product.stock = data.get('stock')
-        product.is_new = data.get('is_new', False)
-        product.is_sale = data.get('is_sale', False)
-        product.is_featured = data.get('is_featured', False)
-        product.category_id = data.get('category_id')
-        product.brand_id = data.get('brand_id')
-        
-        # Handle images
-        if 'images' in data and isinstance(data['images'], list):
-            # Remove existing images
-            ProductImage.query.filter_by(product_id=product.id).delete()
-            
-            # Add new images
-            for i, image_data in enumerate(data['images']):
-                is_valid, error_message = validate_image_data(image_data)
-                if not is_valid:
-                    return jsonify({'error': error_message}), 400
-                
-                image_url = image_data['image_url']
-                # Enforce Cloudinary URL
-                if not image_url.startswith('https://res.cloudinary.com/'):
-                    return jsonify({'error': 'All product images must be uploaded to Cloudinary.'}), 400
+        summary = importer.run(iter_import_rows(stream, fmt))
+    except UnicodeDecodeError:
+        db.session.rollback()
+        return jsonify({'error': 'Import file must be UTF-8 encoded', **importer.summary()}), 400
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error importing products: {str(e)}")
+        return jsonify({'error': 'Failed to import products', **importer.summary()}), 500
+    
+    return jsonify(summary)
 
-                product_image = ProductImage(
-                    product_id=product.id,
-                    image_url=image_url,
-                    is_primary=image_data.get('is_primary', i == 0),
-                    display_order=image_data.get('display_order', i)
-                )
-                db.session.add(product_image)
+@products_bp.route('/api/products/export', methods=['GET'])
+@conditional_get(CATALOG_SCOPES, content_coding=export_coding)
+def export_products():
+    """Stream the catalog (optionally filtered) as NDJSON or CSV"""
+    fmt = request.args.get('format', 'ndjson').lower()
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    
+    filters = parse_product_filters(request.args)
+    rows = iter_export_rows(db.session, filters, batch_size=current_app.config['EXPORT_BATCH_SIZE'])
+    chunks = export_chunks(rows, fmt)
+    headers = {'Content-Disposition': f'attachment; filename=products.{fmt}', 'Vary': 'Accept-Encoding'}
+    if export_coding() == 'gzip':
+        chunks = gzip_chunks(chunks)
+        headers['Content-Encoding'] = 'gzip'
+
+    def generate():
+        try:
+            yield from chunks
+        except Exception as e:
+            # Headers are already sent; log and abort the transfer so the client sees it fail
+            current_app.logger.error(f"Error exporting products: {str(e)}")
+            raise
+
+    return current_app.response_class(stream_with_context(generate()), mimetype=EXPORT_MIMETYPES[fmt], headers=headers)
+
+@products_bp.route('/api/products/bulk', methods=['PATCH'])
+def bulk_update_products():
+    """Update price, stock and sale flag for many products in one transaction"""
+    data = request.get_json(silent=True)
+    items = data.get('products') if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'products must be a non-empty list'}), 400
+    max_items = current_app.config['MAX_BULK_PATCH_ITEMS']
+    if len(items) > max_items:
+        return jsonify({'error': f'At most {max_items} products may be updated at once'}), 400
+    
+    results = []
+    changes_by_index = {}
+    for index, item in enumerate(items):
+        result = {'index': index, 'id': None, 'sku': None}
+        if isinstance(item, dict):
+            result.update(id=item.get('id'), sku=item.get('sku'))
+        try:
+            changes_by_index[index] = parse_product_patch(item)
+        except ValueError as e:
+            result.update(status='error', error=str(e))
+        results.append(result)
+    
+    # Resolve every id and SKU in one query
+    ids = {results[index]['id'] for index in changes_by_index if results[index]['id'] is not None}
+    skus = {results[index]['sku'] for index in changes_by_index if results[index]['id'] is None}
+    conditions = [Product.id.in_(ids)] if ids else []
+    if skus:
+        conditions.append(Product.sku.in_(skus))
+    found = db.session.query(Product.id, Product.sku).filter(or_(*conditions)).all() if conditions else []
+    known_ids = {product_id for product_id, _ in found}
+    id_by_sku = {sku: product_id for product_id, sku in found if sku}
+    
+    # Later entries for the same product win
+    patches = {}
+    for index, changes in changes_by_index.items():
+        result = results[index]
+        product_id = result['id'] if result['id'] is not None else id_by_sku.get(result['sku'])
+        if product_id not in known_ids:
+            result.update(status='error', error='Product not found')
+            continue
+        result.update(id=product_id, status='updated')
+        patches.setdefault(product_id, {}).update(changes)
+    
+    if patches:
+        try:
+            apply_product_patches(db.session, patches)
+            touch_catalog(db.session, 'products')
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Error bulk updating products: {str(e)}")
+            return jsonify({'error': 'Failed to update products'}), 500
         
-        # Handle specifications
-        if 'specifications' in data and isinstance(data['specifications'], list):
-            # Remove existing specifications
-            ProductSpecification.query.filter_by(product_id=product.id).delete()
-            
-            # Add new specifications
-            for i, spec_data in enumerate(data['specifications']):
-                is_valid, error_message = validate_specification_data(spec_data)
-                if not is_valid:
-                    return jsonify({'error': error_message}), 400
-                
-                product_spec = ProductSpecification(
-                    product_id=product.id,
-                    name=spec_data['name'],
-                    value=spec_data['value'],
-                    display_order=spec_data.get('display_order', i)
-                )
-                db.session.add(product_spec)
+        # Set-based updates bypass the session events, so invalidate once here
+        response_cache.invalidate('products', *[f'product:{product_id}' for product_id in patches])
+        if any('price' in changes for changes in patches.values()):
+            price_stats_cache.clear()
+    
+    updated = sum(1 for result in results if result.get('status') == 'updated')
+    return jsonify({
+        'updated': updated,
+        'failed': len(results) - updated,
+        'results': results
+    })
+
+# Editable product columns: (value a full update uses when the field is omitted, parser)
+PRODUCT_UPDATE_FIELDS = {
+    'name': (None, lambda value: value),
+    'description': (None, lambda value: value),
+    'price': (None, lambda value: Decimal(str(value))),
+    'original_price': (None, lambda value: Decimal(str(value)) if value else None),
+    # Handle SKU - set to None if empty string to avoid UNIQUE constraint issues
+    'sku': (None, lambda value: value if value and value.strip() else None),
+    'stock': (None, lambda value: value),
+    'is_new': (False, lambda value: value),
+    'is_sale': (False, lambda value: value),
+    'is_featured': (False, lambda value: value),
+    'category_id': (None, lambda value: value),
+    'brand_id': (None, lambda value: value),
+}
+
+# Child collections edited with a product: (model, natural key used to match rows)
+PRODUCT_CHILD_COLLECTIONS = {
+    'images': (ProductImage, 'image_url'),
+    'specifications': (ProductSpecification, 'name'),
+    'features': (ProductFeature, 'feature'),
+}
+
+def save_product_changes(product, data, partial=False):
+    """Apply a PUT (full) or PATCH (partial) payload to a product and commit.
+
+    Child lists are diffed against the existing rows, so unchanged images,
+    specifications and features are never rewritten.
+    """
+    if partial:
+        # Validate the product as it will be after the patch
+        merged = {'name': product.name, 'price': product.price, **data}
+        is_valid, error_message = validate_product_data(merged)
+    else:
+        is_valid, error_message = validate_product_data(data)
+    if not is_valid:
+        return jsonify({'error': error_message}), 400
+    
+    try:
+        children = parse_product_children(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        for field, (default, parse) in PRODUCT_UPDATE_FIELDS.items():
+            if field in data or not partial:
+                setattr(product, field, parse(data.get(field, default)))
         
-        # Handle features
-        if 'features' in data and isinstance(data['features'], list):
-            # Remove existing features
-            ProductFeature.query.filter_by(product_id=product.id).delete()
-            
-            # Add new features
-            for i, feature_data in enumerate(data['features']):
-                is_valid, error_message = validate_feature_data(feature_data)
-                if not is_valid:
-                    return jsonify({'error': error_message}), 400
-                
-                product_feature = ProductFeature(
-                    product_id=product.id,
-                    feature=feature_data['feature'],
-                    display_order=feature_data.get('display_order', i)
-                )
-                db.session.add(product_feature)
+        for key, incoming in children.items():
+            model, natural_key = PRODUCT_CHILD_COLLECTIONS[key]
+            sync_children(db.session, model, getattr(product, key), incoming, natural_key, product.id)
         
         db.session.commit()
+        response_cache.invalidate('products', f'product:{product.id}')
         
-        return jsonify(product.to_dict())
+        return jsonify(product_detail(product))
         
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@products_bp.route('/api/products/<int:id>', methods=['PUT'])
+def update_product(id):
+    """Update an existing product"""
+    product = Product.query.get_or_404(id)
+    data = request.get_json()
+    return save_product_changes(product, data)
+
+@products_bp.route('/api/products/<int:id>', methods=['PATCH'])
+def patch_product(id):
+    """Update only the fields sent for an existing product"""
+    product = Product.query.get_or_404(id)
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not data:
+        return jsonify({'error': 'No fields to update'}), 400
+    
+    unknown = set(data) - set(PRODUCT_UPDATE_FIELDS) - set(PRODUCT_CHILD_COLLECTIONS)
+    if unknown:
+        return jsonify({'error': f"Unknown fields: {', '.join(sorted(unknown))}"}), 400
+    
+    return save_product_changes(product, data, partial=True)
+
 @products_bp.route('/api/products/<int:id>', methods=['DELETE'])
 def delete_product(id):
     """Delete a product"""
@@ -531,6 +702,7 @@ def delete_product(id):
     try:
         db.session.delete(product)
         db.session.commit()
+        response_cache.invalidate('products', f'product:{id}')
         return jsonify({'message': 'Product deleted successfully'})
     except Exception as e:
         db.session.rollback()
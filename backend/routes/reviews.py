@@ -1,40 +1,52 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, current_app
+from sqlalchemy import update
 from models import db, Product, Review
+from models.catalog_version import touch_catalog
 from utils.helpers import validate_review_data
+from utils.cache import response_cache
+from utils.ratings import apply_rating_change
+from utils.pagination import InvalidCursor, keyset_order
+from utils.reviews import REVIEW_SORTS, resolve_review_sort, parse_rating_filter, review_signature, product_reviews_query, paginate_reviews
 from datetime import datetime
 
 reviews_bp = Blueprint('reviews', __name__)
 
 @reviews_bp.route('/api/products/<int:id>/reviews', methods=['GET'])
 def get_product_reviews(id):
-    """Get all reviews for a specific product"""
-    product = Product.query.get_or_404(id)
+    """Get reviews for a specific product, newest first by default"""
+    if db.session.query(Product.id).filter_by(id=id).first() is None:
+        return jsonify({'error': 'Product not found'}), 404
     
     # Get query parameters
     page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 10, type=int)
-    sort_by = request.args.get('sort_by', 'date')
-    sort_order = request.args.get('sort_order', 'desc')
+    per_page = min(max(request.args.get('per_page', 10, type=int), 1), current_app.config['MAX_PAGE_SIZE'])
+    sort_by, sort_order = resolve_review_sort(request.args.get('sort_by', 'date'), request.args.get('sort_order', 'desc'))
+    cursor = request.args.get('cursor')
+    try:
+        ratings = parse_rating_filter(request.args.get('rating'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    # Build query
-    query = Review.query.filter_by(product_id=id)
+    query = product_reviews_query(db.session, id, ratings)
+    
+    # Keyset pagination when a cursor is given (an empty cursor starts at the first page)
+    if cursor is not None:
+        try:
+            reviews, next_cursor = paginate_reviews(
+                query, cursor, per_page, sort_by, sort_order, review_signature(sort_by, sort_order, ratings)
+            )
+        except InvalidCursor as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify({
+            'reviews': [review.to_dict() for review in reviews],
+            'next_cursor': next_cursor,
+            'per_page': per_page
+        })
     
-    # Apply sorting
-    if sort_by == 'rating':
-        if sort_order == 'desc':
-            query = query.order_by(Review.rating.desc())
-        else:
-            query = query.order_by(Review.rating.asc())
-    elif sort_by == 'user':
-        if sort_order == 'desc':
-            query = query.order_by(Review.user.desc())
-        else:
-            query = query.order_by(Review.user.asc())
-    else:  # default to date
-        if sort_order == 'desc':
-            query = query.order_by(Review.date.desc())
-        else:
-            query = query.order_by(Review.date.asc())
+    # Apply sorting (review id breaks ties so pages are stable)
+    column_name, _ = REVIEW_SORTS[sort_by]
+    query = query.order_by(*keyset_order(getattr(Review, column_name), Review.id, sort_order == 'desc', nullable=False))
     
     # Paginate results
     pagination = query.paginate(page=page, per_page=per_page, error_out=False)
@@ -63,18 +75,22 @@ def create_product_review(id):
         return jsonify({'error': error_message}), 400
     
     try:
+        rating = int(data['rating'])
         review = Review(
             product_id=id,
             user=data['user'],
             avatar=data.get('avatar'),
             title=data['title'],
             comment=data['comment'],
-            rating=data['rating'],
+            rating=rating,
             date=datetime.utcnow()
         )
         
         db.session.add(review)
+        apply_rating_change(db.session, id, added=rating)
         db.session.commit()
+        # Ratings show up in every product listing, not just the detail
+        response_cache.invalidate('products', f'product:{id}')
         
         return jsonify(review.to_dict()), 201
         
@@ -95,13 +111,18 @@ def update_product_review(id, review_id):
         return jsonify({'error': error_message}), 400
     
     try:
+        rating = int(data['rating'])
+        if rating != review.rating:
+            apply_rating_change(db.session, id, added=rating, removed=review.rating)
+        
         review.user = data['user']
         review.avatar = data.get('avatar')
         review.title = data['title']
         review.comment = data['comment']
-        review.rating = data['rating']
+        review.rating = rating
         
         db.session.commit()
+        response_cache.invalidate('products', f'product:{id}')
         
         return jsonify(review.to_dict())
         
@@ -117,8 +138,33 @@ def delete_product_review(id, review_id):
     
     try:
         db.session.delete(review)
+        apply_rating_change(db.session, id, removed=review.rating)
         db.session.commit()
+        response_cache.invalidate('products', f'product:{id}')
         return jsonify({'message': 'Review deleted successfully'})
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': str(e)}), 500 
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+@reviews_bp.route('/api/products/<int:id>/reviews/<int:review_id>/helpful', methods=['POST'])
+def mark_review_helpful(id, review_id):
+    """Count a vote that a review was helpful"""
+    try:
+        # Relative UPDATE so concurrent votes can't overwrite each other
+        result = db.session.execute(
+            update(Review).where(Review.id == review_id, Review.product_id == id)
+            .values(helpful_count=Review.helpful_count + 1)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            db.session.rollback()
+            return jsonify({'error': 'Review not found'}), 404
+        touch_catalog(db.session, 'products')
+        db.session.commit()
+        response_cache.invalidate(f'product:{id}')
+        
+        helpful_count = db.session.query(Review.helpful_count).filter_by(id=review_id).scalar()
+        return jsonify({'id': review_id, 'product_id': id, 'helpful_count': helpful_count})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark response encoding: Flask's default JSON provider against
+FastJSONProvider, on a 100-product page and a 50-order admin page.
+Also checks that both providers produce byte-identical output.
+
+Usage: python scripts/benchmark_json.py [--rounds N]
+"""
+
+import os
+import sys
+import time
+import argparse
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from flask.json.provider import DefaultJSONProvider
+from app_factory import create_app
+from models import db, Category, Brand, Product, ProductImage, ProductSpecification, ProductFeature, Review, Order, OrderItem
+from utils.json_provider import FastJSONProvider, orjson
+
+def seed():
+    category = Category(name='Cookware', slug='cookware')
+    brand = Brand(name='Wega', slug='wega')
+    db.session.add_all([category, brand])
+    db.session.flush()
+    for i in range(100):
+        product = Product(name=f'Non-stick Frying Pan {i} – 28cm', description='Forged aluminium pan with a ' * 4,
+                          price=1499.99 + i, original_price=1899.5, sku=f'FP-{i}', stock=i, rating=4.35,
+                          review_count=3, is_new=i % 2 == 0, is_sale=i % 3 == 0, is_featured=False,
+                          category_id=category.id, brand_id=brand.id)
+        db.session.add(product)
+        db.session.flush()
+        for j in range(3):
+            db.session.add(ProductImage(product_id=product.id, image_url=f'https://res.cloudinary.com/demo/pan-{i}-{j}.jpg',
+                                        is_primary=j == 0, display_order=j))
+            db.session.add(ProductSpecification(product_id=product.id, name=f'Spec {j}', value='Aluminium', display_order=j))
+            db.session.add(ProductFeature(product_id=product.id, feature=f'Dishwasher safe {j}', display_order=j))
+            db.session.add(Review(product_id=product.id, user='Jane', title='Great pan', comment='Heats evenly ' * 5,
+                                  rating=4, date=datetime(2025, 1, 1) + timedelta(days=j)))
+    for i in range(50):
+        order = Order(order_number=f'WEGA-{i:05d}', first_name='Jane', last_name='Wanjiru', email='jane@example.com',
+                      phone='0712345678', address='Moi Avenue', city='Nairobi', state='Nairobi',
+                      total_amount=4500.5, shipping_cost=250, payment_method='mpesa')
+        db.session.add(order)
+        db.session.flush()
+        for j in range(3):
+            db.session.add(OrderItem(order_id=order.id, product_id=j + 1, quantity=2, price=1499.99))
+    db.session.commit()
+
+def bench(provider, payload, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        provider.response(payload)
+    return (time.perf_counter() - started) / rounds * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark JSON response encoding')
+    parser.add_argument('--rounds', type=int, default=200)
+    args = parser.parse_args()
+
+    app = create_app('testing')
+    with app.test_request_context():
+        db.create_all()
+        seed()
+        pages = {
+            '100-product page': {'products': [p.to_dict() for p in Product.query.limit(100)], 'total': 100},
+            '50-order admin page': {'orders': [o.to_dict() for o in Order.query.limit(50)], 'total': 50},
+        }
+        default, fast = DefaultJSONProvider(app), FastJSONProvider(app)
+        print(f"orjson {'available' if orjson else 'NOT installed (stdlib fallback)'}")
+        for name, payload in pages.items():
+            same = default.response(payload).get_data() == fast.response(payload).get_data()
+            before, after = bench(default, payload, args.rounds), bench(fast, payload, args.rounds)
+            print(f"{name}: default {before:.2f}ms, fast {after:.2f}ms ({before / after:.1f}x), "
+                  f"{len(default.response(payload).get_data())} bytes, identical={same}")
+        db.drop_all()
+
+if __name__ == "__main__":
+    main()
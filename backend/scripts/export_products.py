@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Export the product catalog as NDJSON or CSV, streaming rows from the database.
+
+NDJSON has one product per line with its images, specifications and
+features. CSV uses the column layout scripts/import_products.py reads,
+so an export can be edited and imported again. Output ending in .gz is
+gzip compressed.
+
+Usage: python scripts/export_products.py [products.ndjson] [--format ndjson|csv] [--gzip] [--batch-size N]
+"""
+
+import os
+import sys
+import time
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app_factory import create_app
+from models import db
+from utils.product_export import EXPORT_FORMATS, iter_export_rows, export_chunks, gzip_chunks
+
+def main():
+    parser = argparse.ArgumentParser(description='Export products as NDJSON or CSV')
+    parser.add_argument('path', nargs='?', help='Output file (defaults to stdout)')
+    parser.add_argument('--format', choices=EXPORT_FORMATS, help='Defaults to the file extension, else ndjson')
+    parser.add_argument('--gzip', action='store_true', help='Compress the output (implied by a .gz path)')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Rows fetched per round trip')
+    parser.add_argument('--config', default=os.environ.get('FLASK_ENV', 'development'))
+    args = parser.parse_args()
+
+    path = args.path or ''
+    compress = args.gzip or path.endswith('.gz')
+    fmt = args.format or ('csv' if path.removesuffix('.gz').endswith('.csv') else 'ndjson')
+
+    app = create_app(args.config)
+    with app.app_context():
+        started = time.monotonic()
+        count = 0
+
+        def counted(rows):
+            nonlocal count
+            for row in rows:
+                count += 1
+                yield row
+
+        chunks = export_chunks(counted(iter_export_rows(db.session, batch_size=args.batch_size)), fmt)
+        if compress:
+            chunks = gzip_chunks(chunks)
+        output = open(path, 'wb') if path else sys.stdout.buffer
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+        finally:
+            if path:
+                output.close()
+        elapsed = time.monotonic() - started
+
+    if path:
+        print(f"✅ Exported {count} products to {path} in {elapsed:.1f}s")
+    else:
+        print(f"✅ Exported {count} products in {elapsed:.1f}s", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
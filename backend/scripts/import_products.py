@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Bulk import products from a CSV or JSONL file, upserting by SKU.
+
+CSV files have one product per row with the columns name, price, sku,
+description, original_price, stock, is_new, is_sale, is_featured,
+category (or category_id), brand (or brand_id), images, features and
+specifications. Multi-valued columns are '|' separated; specifications
+are written as 'Name: Value'. JSONL files hold one POST /api/products
+payload per line (category/brand may be given by name).
+
+Usage: python scripts/import_products.py products.csv [--format csv|jsonl] [--no-upsert] [--batch-size N]
+"""
+
+import os
+import sys
+import time
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app_factory import create_app
+from models import db
+from utils.product_import import IMPORT_FORMATS, ProductImporter, import_format_for, iter_import_rows
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk import products from CSV or JSONL')
+    parser.add_argument('path', help='File to import')
+    parser.add_argument('--format', choices=IMPORT_FORMATS, help='Defaults to the file extension')
+    parser.add_argument('--no-upsert', action='store_true', help='Report existing SKUs as errors instead of updating them')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Rows written per transaction')
+    parser.add_argument('--config', default=os.environ.get('FLASK_ENV', 'development'))
+    args = parser.parse_args()
+
+    fmt = args.format or import_format_for(args.path)
+    if not fmt:
+        parser.error('Could not tell the format from the file name; pass --format')
+
+    app = create_app(args.config)
+    with app.app_context():
+        started = time.monotonic()
+        importer = ProductImporter(db.session, upsert=not args.no_upsert, batch_size=args.batch_size)
+        with open(args.path, 'rb') as stream:
+            summary = importer.run(iter_import_rows(stream, fmt))
+        elapsed = time.monotonic() - started
+
+    print(f"✅ Created {summary['created']}, updated {summary['updated']}, failed {summary['failed']} in {elapsed:.1f}s")
+    for error in summary['errors']:
+        print(f"  ❌ line {error['line']}" + (f" ({error['sku']})" if error['sku'] else '') + f": {error['error']}")
+    if summary['errors_truncated']:
+        print(f"  ... {summary['failed'] - len(summary['errors'])} more errors")
+    return 1 if summary['failed'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -72,7 +72,7 @@ with app.app_context():
     cursor.execute("SELECT * FROM reviews")
     rows = cursor.fetchall()
     for row in rows:
-        review = Review(id=row[0], product_id=row[1], user=row[2], avatar=row[3], title=row[4], comment=row[5], rating=row[6], date=row[7], created_at=row[8])
+        review = Review(id=row[0], product_id=row[1], user=row[2], avatar=row[3], title=row[4], comment=row[5], rating=row[6], date=row[7] or row[8], created_at=row[8])
         db.session.add(review)
 
     # Migrate carts
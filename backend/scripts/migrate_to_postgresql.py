@@ -282,7 +282,7 @@ def migrate_reviews(sqlite_conn, pg_conn):
                 review['title'],
                 review['comment'],
                 review['rating'],
-                review['date'],
+                review['date'] or review['created_at'],
                 review['created_at']
             ))
         except Exception as e:
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Regenerate the stored product card documents used by product listings.
+Writes keep cards current on their own; run this after migrating, or to
+repair cards after changes made directly in the database.
+
+Usage: python scripts/rebuild_product_cards.py [--batch-size N] [product_id ...]
+"""
+
+import os
+import sys
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app_factory import create_app
+from models import db, Product
+from utils.product_cards import refresh_product_cards
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild stored product cards')
+    parser.add_argument('product_ids', nargs='*', type=int, help='Products to rebuild (default: all)')
+    parser.add_argument('--batch-size', type=int, default=500, help='Products rebuilt per transaction')
+    parser.add_argument('--config', default=os.environ.get('FLASK_ENV', 'development'))
+    args = parser.parse_args()
+
+    app = create_app(args.config)
+    with app.app_context():
+        product_ids = args.product_ids or [row[0] for row in db.session.query(Product.id).order_by(Product.id)]
+        for start in range(0, len(product_ids), args.batch_size):
+            refresh_product_cards(db.session, product_ids[start:start + args.batch_size])
+            db.session.commit()
+        print(f"✅ Rebuilt {len(product_ids)} product cards")
+
+if __name__ == "__main__":
+    main()
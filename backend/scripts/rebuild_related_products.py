@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Recompute the related-products index served by /api/products/<id>/related.
+Product writes queue the products they change; the app refreshes the lists
+near them every RELATED_REFRESH_INTERVAL seconds. Run this after migrating,
+and periodically to pick up lists further away. With --stale, only the
+queued products are refreshed (for running from cron instead of in-process).
+
+Usage: python scripts/rebuild_related_products.py [--limit N] [--stale]
+"""
+
+import os
+import sys
+import time
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app_factory import create_app
+from models import db
+from models.catalog_version import touch_catalog
+from utils.related_products import rebuild_related_products, refresh_stale_related_products, related_limit
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild the related-products index')
+    parser.add_argument('--limit', type=int, help='Related products stored per product (default: RELATED_PRODUCTS_LIMIT)')
+    parser.add_argument('--stale', action='store_true', help='Only refresh the products queued by recent writes')
+    parser.add_argument('--config', default=os.environ.get('FLASK_ENV', 'development'))
+    args = parser.parse_args()
+
+    app = create_app(args.config)
+    with app.app_context():
+        started = time.monotonic()
+        if args.stale:
+            count = refresh_stale_related_products(db.session, limit=args.limit or related_limit())
+            print(f"✅ Refreshed related products around {count} queued products in {time.monotonic() - started:.1f}s")
+            return
+        count = rebuild_related_products(db.session, limit=args.limit or related_limit())
+        touch_catalog(db.session, 'products')
+        db.session.commit()
+        print(f"✅ Rebuilt related products for {count} products in {time.monotonic() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Rebuild product rating aggregates (average, count and star histogram) from
+the reviews table. Review writes keep these up to date on their own; run
+this after a backfill, a bulk review import or seeding.
+
+Usage: python scripts/recompute_ratings.py [--batch-size N] [product_id ...]
+"""
+
+import os
+import sys
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app_factory import create_app
+from models import db
+from utils.ratings import recompute_rating_aggregates
+from utils.cache import response_cache
+
+def main():
+    parser = argparse.ArgumentParser(description='Recompute product rating aggregates from reviews')
+    parser.add_argument('product_ids', nargs='*', type=int, help='Products to recompute (default: all)')
+    parser.add_argument('--batch-size', type=int, default=500, help='Products updated per transaction')
+    parser.add_argument('--config', default=os.environ.get('FLASK_ENV', 'development'))
+    args = parser.parse_args()
+
+    app = create_app(args.config)
+    with app.app_context():
+        updated = recompute_rating_aggregates(db.session, args.product_ids or None, args.batch_size)
+        if args.product_ids:
+            response_cache.invalidate('products', *[f'product:{product_id}' for product_id in args.product_ids])
+        else:
+            response_cache.invalidate_all()
+        print(f"✅ Recomputed rating aggregates for {updated} products")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Delete carts nobody has touched for CART_TTL_DAYS days, in small batches.
+Safe to run while the site is live (e.g. nightly from cron); set
+CART_SWEEP_INTERVAL instead to sweep from inside the app.
+
+Usage: python scripts/sweep_abandoned_carts.py [--ttl-days N] [--batch-size N] [--max-batches N] [--dry-run]
+"""
+
+import os
+import sys
+import argparse
+from datetime import timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app_factory import create_app
+from models import db
+from utils.cart_sweeper import count_idle_carts, sweep_abandoned_carts, sweep_settings
+
+def main():
+    parser = argparse.ArgumentParser(description='Delete abandoned carts')
+    parser.add_argument('--ttl-days', type=int, help='Idle days before a cart is deleted (default: CART_TTL_DAYS)')
+    parser.add_argument('--batch-size', type=int, help='Carts deleted per transaction (default: CART_SWEEP_BATCH_SIZE)')
+    parser.add_argument('--max-batches', type=int, help='Stop after this many batches')
+    parser.add_argument('--pause', type=float, default=0, help='Seconds to sleep between batches')
+    parser.add_argument('--dry-run', action='store_true', help='Only count the carts that would be deleted')
+    parser.add_argument('--config', default=os.environ.get('FLASK_ENV', 'development'))
+    args = parser.parse_args()
+
+    app = create_app(args.config)
+    with app.app_context():
+        settings = sweep_settings(app.config)
+        if args.ttl_days is not None:
+            settings['ttl'] = timedelta(days=args.ttl_days)
+        if args.batch_size:
+            settings['batch_size'] = args.batch_size
+
+        if args.dry_run:
+            print(f"✅ {count_idle_carts(db.session, settings['ttl'])} carts idle for over {settings['ttl'].days} days")
+            return
+
+        run = sweep_abandoned_carts(db.session, max_batches=args.max_batches, pause=args.pause, **settings)
+        print(f"✅ Deleted {run['carts_deleted']} carts ({run['items_deleted']} items) idle since {run['cutoff']} "
+              f"in {run['batches']} batches, {run['seconds']}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import pytest
+from app_factory import create_app
+from models import db
+from models.category import Category
+from models.brand import Brand
+from models.product import Product
+from models.delivery_location import DeliveryLocation
+from utils.bootstrap import bootstrap_snapshot
+from sqlalchemy import event
+import json
+
+app = create_app('testing')
+
+@pytest.fixture
+def client():
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            # Versions restart at 0 with every test database
+            bootstrap_snapshot.clear()
+            cookware, bakeware = Category(name='Cookware', slug='cookware'), Category(name='Bakeware', slug='bakeware')
+            wega = Brand(name='Wega', slug='wega')
+            db.session.add_all([cookware, bakeware, wega])
+            db.session.flush()
+            db.session.add_all([
+                Product(name='Frying Pan', price=1500, category_id=cookware.id, brand_id=wega.id),
+                Product(name='Stock Pot', price=6000, category_id=cookware.id),
+                Product(name='Cake Tin', price=800, category_id=bakeware.id, brand_id=wega.id),
+                DeliveryLocation(name='Nairobi CBD', slug='nairobi-cbd', city='Nairobi', shipping_price=200, is_active=True),
+                DeliveryLocation(name='Closed Depot', slug='closed', city='Mombasa', shipping_price=500, is_active=False),
+            ])
+            db.session.commit()
+
+            yield client
+
+            db.session.remove()
+            db.drop_all()
+
+def fetch(client, headers=None):
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = client.get('/api/bootstrap', headers=headers or {})
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    return response, statements
+
+def test_bootstrap_payload(client):
+    """One payload carries counted categories and brands, active locations and price bounds"""
+    response, _ = fetch(client)
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['version'] == response.headers['ETag'].strip('"')
+    assert [(c['name'], c['product_count']) for c in data['categories']] == [('Cookware', 2), ('Bakeware', 1)]
+    assert [(b['name'], b['product_count']) for b in data['brands']] == [('Wega', 2)]
+    assert [l['name'] for l in data['delivery_locations']] == ['Nairobi CBD']
+    assert data['price_range'] == {'min_price': 800.0, 'max_price': 6000.0, 'total_products': 3}
+
+def test_snapshot_is_built_once_per_version(client):
+    """Repeat requests only read the versions; a matching ETag gets 304"""
+    first, _ = fetch(client)
+    second, statements = fetch(client)
+    assert second.data == first.data
+    assert len(statements) == 1 and 'catalog_versions' in statements[0]
+    assert not second.headers['ETag'].startswith('W/')
+
+    not_modified, _ = fetch(client, {'If-None-Match': first.headers['ETag']})
+    assert not_modified.status_code == 304
+
+def test_writes_rebuild_the_snapshot(client):
+    """Catalog and delivery location writes move the version"""
+    etag = fetch(client)[0].headers['ETag']
+
+    location = DeliveryLocation.query.filter_by(slug='closed').one()
+    location.is_active = True
+    db.session.commit()
+    response, _ = fetch(client, {'If-None-Match': etag})
+    assert response.status_code == 200
+    assert len(json.loads(response.data)['delivery_locations']) == 2
+
+    db.session.add(Product(name='Sauce Pan', price=100, category_id=Category.query.filter_by(name='Bakeware').one().id))
+    db.session.commit()
+    data = json.loads(fetch(client)[0].data)
+    assert data['categories'][1]['product_count'] == 2
+    assert data['price_range']['min_price'] == 100.0
@@ -0,0 +1,99 @@
+import pytest
+from app_factory import create_app
+from models import db
+from models.product import Product
+from models.related_product import StaleRelatedProduct
+from sqlalchemy import event
+import json
+
+app = create_app('testing')
+
+@pytest.fixture
+def client():
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            db.session.add_all([
+                Product(name='Frying Pan', price=1500, sku='FP-1', stock=10),
+                Product(name='Sauce Pan', price=900, sku='SP-1', stock=5),
+                Product(name='Stock Pot', price=2500, sku='STK-1', stock=3, original_price=3000),
+            ])
+            db.session.commit()
+
+            yield client
+
+            db.session.remove()
+            db.drop_all()
+
+def patch(client, payload):
+    response = client.patch('/api/products/bulk', data=json.dumps(payload), content_type='application/json')
+    return response.status_code, json.loads(response.data)
+
+def test_bulk_patch_by_id_and_sku(client):
+    """Entries are matched by id or SKU and reported one by one"""
+    status, data = patch(client, {'products': [
+        {'id': 1, 'price': 1200, 'is_sale': True},
+        {'sku': 'SP-1', 'stock': 0},
+        {'id': 3, 'original_price': None, 'price': 2000},
+        {'id': 99, 'price': 10},
+        {'sku': 'FP-1', 'price': -5},
+        {'id': 2, 'name': 'Renamed'},
+    ]})
+    assert status == 200
+    assert (data['updated'], data['failed']) == (3, 3)
+    assert [r['status'] for r in data['results']] == ['updated', 'updated', 'updated', 'error', 'error', 'error']
+    assert data['results'][1]['id'] == 2
+    assert data['results'][3]['error'] == 'Product not found'
+    assert data['results'][4]['error'] == 'Price cannot be negative'
+
+    db.session.expire_all()
+    pan, sauce, pot = (db.session.get(Product, i) for i in (1, 2, 3))
+    assert (float(pan.price), pan.is_sale, pan.stock) == (1200.0, True, 10)
+    assert (float(sauce.price), sauce.stock) == (900.0, 0)
+    assert (float(pot.price), pot.original_price) == (2000.0, None)
+
+def test_bulk_patch_is_set_based(client):
+    """One lookup plus one UPDATE per distinct field set, whatever the entry count"""
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if 'catalog_versions' not in statement:
+            statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        status, data = patch(client, [{'id': i, 'price': 100 * i} for i in (1, 2, 3)] + [{'sku': 'FP-1', 'stock': 7}])
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    assert status == 200 and data['updated'] == 4
+    assert len([s for s in statements if s.startswith('UPDATE products')]) == 2
+    # A single id/SKU lookup before the updates (card regeneration follows at commit)
+    first_update = next(i for i, s in enumerate(statements) if s.startswith('UPDATE'))
+    assert len([s for s in statements[:first_update] if s.startswith('SELECT')]) == 1
+
+    product = db.session.get(Product, 1)
+    assert (float(product.price), product.stock) == (100.0, 7)
+
+def test_bulk_patch_validation(client):
+    """The request must carry a bounded list of entries"""
+    assert patch(client, {'products': []})[0] == 400
+    assert patch(client, {'products': [{'id': 1}] * (app.config['MAX_BULK_PATCH_ITEMS'] + 1)})[0] == 400
+    status, data = patch(client, [{'price': 10}, {'id': '1', 'price': 10}])
+    assert [r['error'] for r in data['results']] == ['id or sku is required', 'id must be an integer']
+
+def test_bulk_patch_only_queues_related_lists(client):
+    """Repricing leaves related lists to the background refresh, however many products it touches"""
+    db.session.add_all([Product(name=f'Lid {i}', price=100 + i, stock=1) for i in range(600)])
+    db.session.commit()
+    StaleRelatedProduct.query.delete()
+    db.session.commit()
+
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        status, data = patch(client, [{'id': i, 'price': 50} for i in range(1, 604)])
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    assert status == 200 and data['updated'] == 603
+    assert not [s for s in statements if 'related_products' in s.replace('stale_related_products', '')]
+    assert StaleRelatedProduct.query.count() == 603
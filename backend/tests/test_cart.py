@@ -0,0 +1,194 @@
+import pytest
+from sqlalchemy import event
+from app_factory import create_app
+from models import db
+from models.category import Category
+from models.product import Product
+from models.product_image import ProductImage
+from models.product_specification import ProductSpecification
+from models.product_card import ProductCard
+from models.review import Review
+import json
+
+app = create_app('testing')
+
+@pytest.fixture
+def client():
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            category = Category(name='Cookware', slug='cookware')
+            db.session.add(category)
+            db.session.flush()
+            for i, price in enumerate(['1500.00', '249.50', '3200.00']):
+                product = Product(name=f'Product {i}', price=price, stock=10, category_id=category.id)
+                db.session.add(product)
+                db.session.flush()
+                db.session.add(ProductImage(product_id=product.id, image_url=f'/static/uploads/{i}.jpg', is_primary=True))
+                db.session.add(ProductSpecification(product_id=product.id, name='Material', value='Steel'))
+                db.session.add(Review(product_id=product.id, user='Jane', title='Good', comment='Works', rating=5))
+            db.session.commit()
+
+            yield client
+
+            db.session.remove()
+            db.drop_all()
+
+def add(client, product_id, quantity, query=''):
+    response = client.post(f'/api/cart/items{query}', json={'session_id': 'guest-1', 'product_id': product_id, 'quantity': quantity})
+    assert response.status_code == 200, response.data
+    return json.loads(response.data)
+
+def statements_for(client, url):
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if 'catalog_versions' not in statement:
+            statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    assert response.status_code == 200
+    return json.loads(response.data), statements
+
+def test_cart_carries_cards_and_totals(client):
+    """Cart responses embed product cards with server-side line totals, item count and subtotal"""
+    add(client, 1, 2)
+    data = add(client, 2, 3)
+    assert data['item_count'] == 5
+    assert data['subtotal'] == 2 * 1500 + 3 * 249.5
+    assert [(item['product_id'], item['unit_price'], item['line_total']) for item in data['items']] == [
+        (1, 1500.0, 3000.0), (2, 249.5, 748.5)
+    ]
+    product = data['items'][0]['product']
+    assert product['name'] == 'Product 0'
+    assert product['image_url'] == 'http://localhost/static/uploads/0.jpg'
+    assert 'specifications' not in product and 'reviews' not in product
+
+    item_id = data['items'][1]['id']
+    data = json.loads(client.put(f'/api/cart/items/{item_id}', json={'quantity': 1}).data)
+    assert (data['item_count'], data['subtotal']) == (3, 3249.5)
+    data = json.loads(client.delete(f'/api/cart/items/{item_id}').data)
+    assert (data['item_count'], data['subtotal'], len(data['items'])) == (2, 3000.0, 1)
+
+def test_cart_get_is_two_queries(client):
+    """Reading a cart costs the cart lookup plus one joined item query, however many items it holds"""
+    for product_id in (1, 2, 3):
+        add(client, product_id, 1)
+    data, statements = statements_for(client, '/api/cart?session_id=guest-1')
+    assert len(data['items']) == 3
+    assert len(statements) == 2, statements
+
+    # Products without a stored card are rendered on the fly
+    db.session.query(ProductCard).delete()
+    db.session.commit()
+    fallback, _ = statements_for(client, '/api/cart?session_id=guest-1')
+    assert fallback == data
+
+def test_verbose_cart(client):
+    """?verbose=true keeps the full product documents, loaded up front"""
+    for product_id in (1, 2, 3):
+        add(client, product_id, 1)
+    data, statements = statements_for(client, '/api/cart?session_id=guest-1&verbose=true')
+    assert data['subtotal'] == 4949.5
+    assert data['items'][0]['product']['specifications'][0]['value'] == 'Steel'
+    assert not any('FROM reviews' in statement for statement in statements)
+    assert len(statements) <= 6
+
+    assert 'specifications' in add(client, 1, 1, '?verbose=true')['items'][0]['product']
+
+def test_missing_cart(client):
+    """An unknown session has an empty cart"""
+    data, _ = statements_for(client, '/api/cart?session_id=nobody')
+    assert data == {'cart': None, 'items': [], 'total': 0, 'item_count': 0, 'subtotal': 0}
+
+def batch(client, operations, session_id='guest-1'):
+    return client.post('/api/cart/batch', json={'session_id': session_id, 'operations': operations})
+
+def test_batch_applies_operations_in_order(client):
+    """Batch operations fold in order: adds accumulate, set replaces, remove and set 0 delete"""
+    item_id = add(client, 1, 2)['items'][0]['id']
+    add(client, 3, 1)
+    response = batch(client, [
+        {'op': 'add', 'product_id': 1, 'quantity': 3},
+        {'op': 'add', 'product_id': 2},
+        {'op': 'add', 'product_id': 2, 'quantity': 2},
+        {'op': 'set', 'item_id': item_id, 'quantity': 4},
+        {'op': 'add', 'product_id': 1},
+        {'op': 'set', 'product_id': 3, 'quantity': 0},
+        {'op': 'remove', 'item_id': 999},
+    ])
+    assert response.status_code == 200, response.data
+    data = json.loads(response.data)
+    assert [(item['product_id'], item['quantity']) for item in data['items']] == [(1, 5), (2, 3)]
+    assert data['subtotal'] == 5 * 1500 + 3 * 249.5
+
+    data = json.loads(batch(client, [{'op': 'remove', 'product_id': 2}]).data)
+    assert [item['product_id'] for item in data['items']] == [1]
+
+def test_batch_is_all_or_nothing(client):
+    """One bad operation rejects the whole batch and leaves the cart untouched"""
+    add(client, 1, 2)
+    response = batch(client, [{'op': 'add', 'product_id': 2}, {'op': 'add', 'product_id': 99}])
+    assert response.status_code == 400
+    assert json.loads(response.data)['index'] == 1
+    response = batch(client, [{'op': 'set', 'item_id': 999, 'quantity': 1}])
+    assert (response.status_code, json.loads(response.data)['index']) == (400, 0)
+    response = batch(client, [{'op': 'add', 'product_id': 2}, {'op': 'add', 'product_id': 2, 'quantity': 0}])
+    assert (response.status_code, json.loads(response.data)['index']) == (400, 1)
+    assert batch(client, []).status_code == 400
+
+    data, _ = statements_for(client, '/api/cart?session_id=guest-1')
+    assert [(item['product_id'], item['quantity']) for item in data['items']] == [(1, 2)]
+
+def test_batch_merges_guest_cart(client):
+    """Merging a guest cart adds its quantities to the customer's cart and deletes it"""
+    add(client, 1, 2)
+    add(client, 2, 1)
+    assert batch(client, [{'op': 'add', 'product_id': 1}], session_id='customer-7').status_code == 200
+
+    response = batch(client, [{'op': 'merge', 'session_id': 'guest-1'}, {'op': 'add', 'product_id': 3}], session_id='customer-7')
+    assert response.status_code == 200, response.data
+    data = json.loads(response.data)
+    assert [(item['product_id'], item['quantity']) for item in data['items']] == [(1, 3), (2, 1), (3, 1)]
+    assert json.loads(client.get('/api/cart?session_id=guest-1').data)['cart'] is None
+
+    response = batch(client, [{'op': 'merge', 'session_id': 'customer-7'}], session_id='customer-7')
+    assert response.status_code == 400
+
+def test_add_to_cart_is_an_upsert(client):
+    """Adding to a cart is two writes with no reads, and repeat adds accumulate on one row"""
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        add(client, 1, 2)
+        writes = [s for s in statements if not s.lstrip().upper().startswith('SELECT')]
+        item_insert_at = next(i for i, s in enumerate(statements) if 'INSERT INTO cart_items' in s)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    assert [s.split()[2] for s in writes] == ['carts', 'cart_items']
+    assert 'ON CONFLICT' in writes[1]
+    assert item_insert_at == 1
+
+    data = add(client, 1, 3)
+    assert [(item['product_id'], item['quantity']) for item in data['items']] == [(1, 5)]
+
+    response = client.post('/api/cart/items', json={'session_id': 'guest-2', 'product_id': 99, 'quantity': 1})
+    assert response.status_code == 404
+    assert json.loads(client.get('/api/cart?session_id=guest-2').data)['cart'] is None
+
+def test_cart_items_are_unique_per_product(client):
+    """The database rejects a second row for the same product in a cart"""
+    from models.cart import Cart
+    from models.cart_item import CartItem
+    from sqlalchemy.exc import IntegrityError
+
+    add(client, 1, 1)
+    cart = Cart.query.filter_by(session_id='guest-1').one()
+    db.session.add(CartItem(cart_id=cart.id, product_id=1, quantity=1))
+    with pytest.raises(IntegrityError):
+        db.session.commit()
+    db.session.rollback()
@@ -0,0 +1,166 @@
+import pytest
+from sqlalchemy import event
+from app_factory import create_app
+from models import db
+from models.product import Product
+from models.cart import Cart
+from models.cart_item import CartItem
+from models.order import Order
+from utils.cache import FakeRedis
+from utils.cart_store import CartStore, KeyValueCartStore, SQLCartStore, create_cart_store
+import json
+
+app = create_app('testing')
+
+@pytest.fixture
+def client():
+    original = app.extensions['cart_store']
+    app.extensions['cart_store'] = KeyValueCartStore(FakeRedis())
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            for i, price in enumerate(['1500.00', '249.50', '3200.00']):
+                db.session.add(Product(name=f'Product {i}', price=price, stock=10))
+            db.session.flush()
+            # A cart that was persisted before it went hot
+            cart = Cart(session_id='returning')
+            db.session.add(cart)
+            db.session.flush()
+            db.session.add(CartItem(cart_id=cart.id, product_id=3, quantity=2))
+            db.session.commit()
+
+            yield client
+
+            db.session.remove()
+            db.drop_all()
+    app.extensions['cart_store'] = original
+
+def store():
+    return app.extensions['cart_store']
+
+def add(client, product_id, quantity, session_id='guest-1'):
+    response = client.post('/api/cart/items', json={'session_id': session_id, 'product_id': product_id, 'quantity': quantity})
+    assert response.status_code == 200, response.data
+    return json.loads(response.data)
+
+def batch(client, operations, session_id='guest-1'):
+    return client.post('/api/cart/batch', json={'session_id': session_id, 'operations': operations})
+
+@pytest.fixture
+def writes():
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith('SELECT'):
+            statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    yield statements
+    event.remove(db.engine, 'before_cursor_execute', record)
+
+def sql_items(session_id):
+    return sorted((item.id, item.product_id, item.quantity) for item in
+                  CartItem.query.join(Cart).filter(Cart.session_id == session_id))
+
+def test_cart_changes_stay_off_sql(client, writes):
+    """Adding, updating, removing, batching and reading carts only reads products from SQL"""
+    add(client, 1, 2)
+    data = add(client, 2, 1)
+    assert [(item['product_id'], item['quantity']) for item in data['items']] == [(1, 2), (2, 1)]
+    assert (data['item_count'], data['subtotal']) == (3, 3249.5)
+    assert data['items'][0]['product']['name'] == 'Product 0'
+
+    item_id = data['items'][1]['id']
+    data = json.loads(client.put(f'/api/cart/items/{item_id}', json={'quantity': 4}).data)
+    assert (data['item_count'], data['subtotal']) == (6, 3998.0)
+    data = json.loads(batch(client, [{'op': 'add', 'product_id': 1}, {'op': 'set', 'item_id': item_id, 'quantity': 0}]).data)
+    assert [(item['product_id'], item['quantity']) for item in data['items']] == [(1, 3)]
+    data = json.loads(client.get('/api/cart?session_id=guest-1&verbose=true').data)
+    assert data['items'][0]['product']['price'] == 1500.0
+
+    assert writes == []
+    assert Cart.query.filter_by(session_id='guest-1').first() is None
+
+def test_errors_match_sql_store(client):
+    """Unknown products and items are rejected as they are with the SQL store"""
+    response = client.post('/api/cart/items', json={'session_id': 'guest-1', 'product_id': 99, 'quantity': 1})
+    assert response.status_code == 404
+    assert json.loads(client.get('/api/cart?session_id=guest-1').data)['cart'] is None
+    assert client.put('/api/cart/items/999', json={'quantity': 1}).status_code == 404
+    assert json.loads(client.delete('/api/cart/items/999').data)['message'] == 'Item not found in cart'
+
+    add(client, 1, 1)
+    response = batch(client, [{'op': 'add', 'product_id': 2}, {'op': 'add', 'product_id': 99}])
+    assert (response.status_code, json.loads(response.data)['index']) == (400, 1)
+    data = json.loads(client.get('/api/cart?session_id=guest-1').data)
+    assert [(item['product_id'], item['quantity']) for item in data['items']] == [(1, 1)]
+
+def test_sql_carts_are_loaded_with_their_ids(client):
+    """A cart already in SQL is served from it once, then changed in the store under the same ids"""
+    data = json.loads(client.get('/api/cart?session_id=returning').data)
+    item_id = data['items'][0]['id']
+    assert data['id'] is not None
+    assert [(item['product_id'], item['quantity']) for item in data['items']] == [(3, 2)]
+
+    data = json.loads(client.put(f'/api/cart/items/{item_id}', json={'quantity': 5}).data)
+    assert data['items'][0]['quantity'] == 5
+    assert sql_items('returning') == [(item_id, 3, 2)]
+
+    store().flush(db.session)
+    assert sql_items('returning') == [(item_id, 3, 5)]
+
+def test_flush_writes_changed_carts_behind(client):
+    """flush persists every changed cart, keeping item ids, merges and clears"""
+    first = add(client, 1, 2)['items'][0]['id']
+    add(client, 2, 1, session_id='guest-2')
+    add(client, 3, 1, session_id='guest-2')
+    data = json.loads(batch(client, [{'op': 'merge', 'session_id': 'guest-2'}]).data)
+    assert [(item['product_id'], item['quantity']) for item in data['items']] == [(1, 2), (2, 1), (3, 1)]
+    assert json.loads(client.get('/api/cart?session_id=guest-2').data)['cart'] is None
+    assert client.delete('/api/cart?session_id=returning').status_code == 200
+
+    assert store().flush(db.session) == 3
+    assert sql_items('guest-1') == [(item['id'], item['product_id'], item['quantity']) for item in data['items']]
+    assert sql_items('guest-1')[0][0] == first
+    assert Cart.query.filter(Cart.session_id.in_(['guest-2', 'returning'])).count() == 0
+    assert json.loads(client.get('/api/cart?session_id=guest-1').data)['id'] is not None
+
+    # Nothing changed since, so nothing to write
+    assert store().flush(db.session) == 0
+
+    # New items keep taking ids SQL hasn't used
+    data = add(client, 2, 1, session_id='guest-3')
+    assert data['items'][0]['id'] > max(item_id for item_id, _, _ in sql_items('guest-1'))
+
+def test_checkout_persists_the_hot_cart(client):
+    """Checkout writes the cart through before ordering it, then forgets it"""
+    add(client, 1, 2)
+    add(client, 2, 1)
+    response = client.post('/api/orders', json={
+        'session_id': 'guest-1', 'first_name': 'Jane', 'last_name': 'Doe', 'email': 'jane@example.com',
+        'phone': '0700000000', 'address': '1 Road', 'city': 'Nairobi', 'state': 'Nairobi'
+    })
+    assert response.status_code == 201, response.data
+    order = Order.query.one()
+    assert float(order.total_amount) == 3249.5
+    assert sorted((item.product_id, item.quantity) for item in order.items) == [(1, 2), (2, 1)]
+
+    assert Cart.query.filter_by(session_id='guest-1').first() is None
+    assert json.loads(client.get('/api/cart?session_id=guest-1').data)['cart'] is None
+    assert store().flush(db.session) == 0
+
+def test_create_cart_store():
+    """CART_STORE_TYPE picks the backend; the in-process fake is only allowed under tests"""
+    assert isinstance(create_cart_store({'CART_STORE_TYPE': 'sql'}), SQLCartStore)
+    assert isinstance(create_cart_store({'CART_STORE_TYPE': 'fakeredis', 'TESTING': True}), KeyValueCartStore)
+    with pytest.raises(RuntimeError):
+        create_cart_store({'CART_STORE_TYPE': 'fakeredis'})
+    with pytest.raises(RuntimeError):
+        create_cart_store({'CART_STORE_TYPE': 'memcached'})
+
+def test_incomplete_store_fails_when_created():
+    """A store missing part of the interface can't be instantiated"""
+    class ReadOnlyStore(CartStore):
+        def get(self, session, session_id, verbose=False):
+            return None
+
+    with pytest.raises(TypeError):
+        ReadOnlyStore()
@@ -0,0 +1,78 @@
+import pytest
+from datetime import datetime, timedelta
+from app_factory import create_app
+from models import db
+from models.product import Product
+from models.cart import Cart
+from models.cart_item import CartItem
+from utils.cart_sweeper import CartSweeper, count_idle_carts, sweep_abandoned_carts, sweep_metrics
+import json
+
+app = create_app('testing')
+
+NOW = datetime(2026, 10, 1)
+
+@pytest.fixture
+def client():
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            db.session.add(Product(name='Frying Pan', price=1500))
+            db.session.flush()
+            # 7 abandoned carts, one cart idle but with a recently changed item, and one active cart
+            for i in range(7):
+                stale = NOW - timedelta(days=40 + i)
+                cart = Cart(session_id=f'old-{i}', created_at=stale, updated_at=stale)
+                db.session.add(cart)
+                db.session.flush()
+                db.session.add(CartItem(cart_id=cart.id, product_id=1, quantity=1, created_at=stale, updated_at=stale))
+            cart = Cart(session_id='item-touched', created_at=NOW - timedelta(days=60), updated_at=NOW - timedelta(days=60))
+            db.session.add(cart)
+            db.session.flush()
+            db.session.add(CartItem(cart_id=cart.id, product_id=1, quantity=2, updated_at=NOW - timedelta(days=1)))
+            db.session.add(Cart(session_id='active', created_at=NOW - timedelta(days=2), updated_at=NOW - timedelta(hours=3)))
+            db.session.commit()
+            sweep_metrics.reset()
+
+            yield client
+
+            db.session.remove()
+            db.drop_all()
+
+def test_sweep_deletes_only_idle_carts_in_batches(client):
+    """Carts (and their items) idle past the TTL go, a few per transaction; recently touched ones stay"""
+    ttl = timedelta(days=30)
+    assert count_idle_carts(db.session, ttl, now=NOW) == 7
+
+    run = sweep_abandoned_carts(db.session, ttl, batch_size=3, now=NOW)
+    assert (run['carts_deleted'], run['items_deleted'], run['batches']) == (7, 7, 3)
+    assert sorted(session_id for session_id, in db.session.query(Cart.session_id)) == ['active', 'item-touched']
+    assert db.session.query(CartItem).count() == 1
+
+    assert sweep_abandoned_carts(db.session, ttl, now=NOW)['carts_deleted'] == 0
+
+def test_sweep_can_stop_after_some_batches(client):
+    """max_batches bounds a run; the rest wait for the next sweep"""
+    run = sweep_abandoned_carts(db.session, timedelta(days=30), batch_size=2, max_batches=2, now=NOW)
+    assert (run['carts_deleted'], run['batches']) == (4, 2)
+    assert count_idle_carts(db.session, timedelta(days=30), now=NOW) == 3
+
+def test_sweeper_metrics(client):
+    """Runs are totalled per process and exposed with the last run's details"""
+    sweep_abandoned_carts(db.session, timedelta(days=45), batch_size=10, now=NOW)
+    sweep_abandoned_carts(db.session, timedelta(days=30), batch_size=10, now=NOW)
+
+    stats = json.loads(client.get('/api/cart/sweeper/stats').data)
+    assert (stats['runs'], stats['carts_deleted'], stats['items_deleted']) == (2, 7, 7)
+    assert stats['last_run']['carts_deleted'] == 6
+    assert stats['last_run']['cutoff'] == (NOW - timedelta(days=30)).isoformat()
+
+def test_in_process_sweeper_uses_config(client):
+    """The scheduled sweeper reads its TTL and batch size from the config"""
+    app.config['CART_TTL_DAYS'] = 1
+    try:
+        run = CartSweeper(app, interval=3600).run_once()
+    finally:
+        app.config['CART_TTL_DAYS'] = 30
+    # Measured from the real clock, so every fixture cart is long idle
+    assert run['carts_deleted'] == 9
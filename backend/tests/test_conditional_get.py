@@ -0,0 +1,74 @@
+import pytest
+from app_factory import create_app
+from models import db
+from models.category import Category
+from models.brand import Brand
+from models.product import Product
+from sqlalchemy import event
+import json
+
+app = create_app('testing')
+
+@pytest.fixture
+def client():
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            category = Category(name='Cookware', slug='cookware')
+            brand = Brand(name='Wega', slug='wega')
+            db.session.add_all([category, brand])
+            db.session.commit()
+            db.session.add(Product(name='Frying Pan', price=1500, category_id=category.id, brand_id=brand.id))
+            db.session.commit()
+
+            yield client
+
+            db.session.remove()
+            db.drop_all()
+
+def test_etag_round_trip(client):
+    """A matching If-None-Match gets 304 without running the listing query"""
+    first = client.get('/api/products')
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    assert first.headers['Last-Modified']
+
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        second = client.get('/api/products', headers={'If-None-Match': etag})
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+    assert second.status_code == 304
+    assert second.data == b''
+    assert len(statements) == 1
+    assert 'catalog_versions' in statements[0]
+
+def test_writes_change_the_etag(client):
+    """Product, category and brand writes each produce a new validator"""
+    etag = client.get('/api/products').headers['ETag']
+
+    product = Product.query.first()
+    product.price = 1800
+    db.session.commit()
+    response = client.get('/api/products', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+
+    brands_etag = client.get('/api/brands').headers['ETag']
+    client.put('/api/categories/1', data=json.dumps({'name': 'Pots', 'slug': 'pots'}),
+               content_type='application/json')
+    assert client.get('/api/products', headers={'If-None-Match': etag}).status_code == 200
+    # Brands are versioned separately
+    assert client.get('/api/brands', headers={'If-None-Match': brands_etag}).status_code == 304
+
+def test_if_modified_since(client):
+    """If-Modified-Since is honoured when no ETag is sent"""
+    last_modified = client.get('/api/categories').headers['Last-Modified']
+    response = client.get('/api/categories', headers={'If-Modified-Since': last_modified})
+    assert response.status_code == 304
+    response = client.get('/api/categories', headers={'If-Modified-Since': 'Mon, 01 Jan 2001 00:00:00 GMT'})
+    assert response.status_code == 200
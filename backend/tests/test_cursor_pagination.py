@@ -0,0 +1,75 @@
+import pytest
+from app_factory import create_app
+from models import db
+from models.category import Category
+from models.product import Product
+import json
+
+app = create_app('testing')
+
+@pytest.fixture
+def client():
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            category = Category(name='Cookware', slug='cookware')
+            db.session.add(category)
+            db.session.commit()
+
+            # Duplicate prices and missing ratings exercise the tiebreaker and NULL handling
+            for i in range(12):
+                db.session.add(Product(
+                    name=f'Product {i:02d}',
+                    price=100 * (i // 3 + 1),
+                    rating=None if i % 4 == 0 else 3 + (i % 3) * 0.5,
+                    is_sale=i % 2 == 0,
+                    category_id=category.id
+                ))
+            db.session.commit()
+
+            yield client
+
+            db.session.remove()
+            db.drop_all()
+
+def walk(client, params):
+    """Follow next_cursor until exhausted and return all product names"""
+    names, cursor, pages = [], '', 0
+    while cursor is not None:
+        response = client.get(f'/api/products?{params}&per_page=5&cursor={cursor}')
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        names.extend(p['name'] for p in data['products'])
+        cursor = data['next_cursor']
+        pages += 1
+        assert pages < 10
+    return names
+
+@pytest.mark.parametrize('sort_by', ['name', 'price', 'rating', 'created_at'])
+@pytest.mark.parametrize('sort_order', ['asc', 'desc'])
+def test_cursor_walk_returns_every_product_once(client, sort_by, sort_order):
+    """Walking the cursor visits every product exactly once in sort order"""
+    names = walk(client, f'sort_by={sort_by}&sort_order={sort_order}')
+    assert len(names) == 12
+    assert len(set(names)) == 12
+
+def test_cursor_matches_offset_order(client):
+    """Keyset pages follow the same order as a single large page"""
+    response = client.get('/api/products?sort_by=price&sort_order=desc&per_page=50')
+    expected = [p['name'] for p in json.loads(response.data)['products']]
+    assert walk(client, 'sort_by=price&sort_order=desc') == expected
+
+def test_cursor_with_filters_and_without_total(client):
+    """Filters apply to cursor pages and include_total=false skips the count"""
+    response = client.get('/api/products?is_sale=true&cursor=&per_page=4&include_total=false')
+    data = json.loads(response.data)
+    assert 'total' not in data
+    assert len(data['products']) == 4
+    assert walk(client, 'is_sale=true') == [f'Product {i:02d}' for i in range(0, 12, 2)]
+
+def test_cursor_rejects_mismatched_sort(client):
+    """A cursor is only valid for the sort it was issued for"""
+    data = json.loads(client.get('/api/products?cursor=&per_page=5').data)
+    response = client.get(f"/api/products?sort_by=price&cursor={data['next_cursor']}")
+    assert response.status_code == 400
+    assert client.get('/api/products?cursor=not-a-cursor').status_code == 400
@@ -0,0 +1,83 @@
+import pytest
+from app_factory import create_app
+from models import db
+from models.category import Category
+from models.brand import Brand
+from models.product import Product
+from sqlalchemy import event
+import json
+
+app = create_app('testing')
+
+@pytest.fixture
+def client():
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            cookware = Category(name='Cookware', slug='cookware')
+            bakeware = Category(name='Bakeware', slug='bakeware')
+            wega = Brand(name='Wega', slug='wega')
+            chef = Brand(name='Chef', slug='chef')
+            db.session.add_all([cookware, bakeware, wega, chef])
+            db.session.commit()
+
+            db.session.add_all([
+                Product(name='Frying Pan', price=800, category_id=cookware.id, brand_id=wega.id, is_sale=True),
+                Product(name='Sauce Pan', price=2500, category_id=cookware.id, brand_id=chef.id, is_new=True),
+                Product(name='Stock Pot', price=6000, category_id=cookware.id, brand_id=wega.id, is_featured=True),
+                Product(name='Cake Tin', price=900, category_id=bakeware.id, brand_id=wega.id, is_sale=True),
+                Product(name='Loaf Pan', price=1200, category_id=bakeware.id, brand_id=chef.id),
+            ])
+            db.session.commit()
+
+            yield client
+
+            db.session.remove()
+            db.drop_all()
+
+def get_facets(client, query=''):
+    response = client.get(f'/api/products/facets{query}')
+    assert response.status_code == 200
+    return json.loads(response.data)
+
+def test_facets_without_filters(client):
+    """Every facet is counted over the whole catalog"""
+    data = get_facets(client)
+    assert data['total'] == 5
+    assert data['categories'] == [{'name': 'Cookware', 'count': 3}, {'name': 'Bakeware', 'count': 2}]
+    assert data['brands'] == [{'name': 'Wega', 'count': 3}, {'name': 'Chef', 'count': 2}]
+    assert data['flags'] == {'is_featured': 1, 'is_new': 1, 'is_sale': 2}
+    assert [b['count'] for b in data['price_buckets']] == [2, 2, 1, 0, 0]
+
+def test_facets_exclude_their_own_filter(client):
+    """A facet's counts apply every filter except its own"""
+    data = get_facets(client, '?category=Cookware&brand=Wega&max_price=1000')
+    assert data['total'] == 1
+    # Other categories stay visible under the brand and price filters
+    assert data['categories'] == [{'name': 'Bakeware', 'count': 1}, {'name': 'Cookware', 'count': 1}]
+    assert data['brands'] == [{'name': 'Wega', 'count': 1}]
+    # Price buckets ignore the price filter itself
+    assert [b['count'] for b in data['price_buckets']] == [1, 0, 1, 0, 0]
+    assert data['flags']['is_sale'] == 1
+
+def test_facets_match_listing_and_search(client):
+    """Facet totals agree with the listing and honour search"""
+    data = get_facets(client, '?search=pan&is_sale=true')
+    listing = json.loads(client.get('/api/products?search=pan&is_sale=true').data)
+    assert data['total'] == listing['total'] == 1
+    assert data['flags']['is_sale'] == 1
+    assert data['flags']['is_new'] == 0
+
+def test_facets_single_query(client):
+    """All facet counts come from one grouped query"""
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        # The conditional GET validator lookup is not part of the view's work
+        if 'catalog_versions' not in statement:
+            statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        get_facets(client, '?category=Cookware&is_new=true&min_price=100')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    assert len(statements) == 1
@@ -0,0 +1,57 @@
+import json
+import pytest
+from datetime import date, datetime
+from decimal import Decimal
+from flask.json.provider import DefaultJSONProvider
+from app_factory import create_app
+import utils.json_provider as json_provider
+from utils.json_provider import FastJSONProvider
+from utils.helpers import finite_float
+from models.product import Product
+
+app = create_app('testing')
+
+PAYLOADS = [
+    {'products': [{'id': 1, 'name': 'Frying Pan', 'price': 1499.99, 'rating': None, 'is_new': True, 'images': []}], 'total': 1},
+    {'name': 'Crème brûlée torch – 😀', 'control': ''.join(chr(i) for i in range(0x20)) + '\x7f"\\/'},
+    {'big': 2 ** 70, 'tiny': 1e-7, 'huge': 1e16, 'floats': [0.1 + 0.2, -0.0, 100.0, 123456789.125]},
+    [1, 'two', [3.5, {'b': 2, 'a': 1}]],
+    {'price': Decimal('1499.50'), 'created_at': datetime(2025, 3, 1, 9, 30, 15), 'day': date(2025, 3, 1)},
+]
+
+@pytest.mark.parametrize('payload', PAYLOADS)
+def test_byte_compatible_with_default_provider(payload):
+    """Responses are byte-for-byte what the default provider produces"""
+    with app.app_context():
+        expected = DefaultJSONProvider(app).response(payload).get_data()
+        assert FastJSONProvider(app).response(payload).get_data() == expected
+
+def test_decimal_and_dates_keep_default_format():
+    """Decimal, datetime and date need no manual conversion and come out as Flask writes them"""
+    payload = {'price': Decimal('1499.50'), 'created_at': datetime(2025, 3, 1, 9, 30, 15), 'day': date(2025, 3, 1)}
+    expected = '{"created_at":"Sat, 01 Mar 2025 09:30:15 GMT","day":"Sat, 01 Mar 2025 00:00:00 GMT","price":"1499.50"}\n'
+    with app.app_context():
+        assert FastJSONProvider(app).response(payload).get_data(as_text=True) == expected
+
+def test_stored_non_finite_numbers_are_reported_as_none():
+    """NaN and Infinity never reach the encoder from stored numbers"""
+    with app.app_context():
+        product = Product(name='Pan', price=Decimal('NaN'), original_price=Decimal('Infinity'), rating=Decimal('4.50'))
+        data = product.to_dict()
+        assert (data['price'], data['original_price'], data['rating']) == (None, None, 4.5)
+        assert json.loads(app.json.dumps(data))['price'] is None
+        assert finite_float(Decimal('1499.50')) == 1499.5 and finite_float(None) is None
+
+def test_stdlib_fallback(monkeypatch):
+    """Without orjson the provider still encodes the same bytes"""
+    monkeypatch.setattr(json_provider, 'orjson', None)
+    with app.app_context():
+        provider = FastJSONProvider(app)
+        for payload in PAYLOADS:
+            assert provider.response(payload).get_data() == DefaultJSONProvider(app).response(payload).get_data()
+        assert provider.dumps({'price': Decimal('2.50')}) == '{"price": "2.50"}'
+
+def test_app_uses_fast_provider():
+    """create_app installs the provider unless FAST_JSON is off"""
+    assert isinstance(app.json, FastJSONProvider)
+    assert json.loads(app.test_client().get('/api/cache/stats').data) is not None
@@ -0,0 +1,95 @@
+import pytest
+from app_factory import create_app
+from models import db
+from models.category import Category
+from models.product import Product
+from models.catalog_version import touch_catalog
+from utils.price_stats import price_stats_cache
+from sqlalchemy import event, update
+import json
+
+app = create_app('testing')
+
+@pytest.fixture
+def client():
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            price_stats_cache.clear()
+            cookware = Category(name='Cookware', slug='cookware')
+            bakeware = Category(name='Bakeware', slug='bakeware')
+            db.session.add_all([cookware, bakeware])
+            db.session.commit()
+
+            for price, category in ((500, cookware), (999, cookware), (1000, cookware),
+                                    (7500, bakeware), (30000, bakeware), (65000, bakeware)):
+                db.session.add(Product(name=f'Item {price}', price=price, category_id=category.id))
+            db.session.commit()
+
+            yield client
+
+            price_stats_cache.clear()
+            db.session.remove()
+            db.drop_all()
+
+def get_stats(client, query=''):
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        # The conditional GET validator lookup is not part of the view's work
+        if 'catalog_versions' not in statement:
+            statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = client.get(f'/api/products/price-stats{query}')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    assert response.status_code == 200
+    return json.loads(response.data), statements
+
+def test_distribution_in_one_query(client):
+    """Summary and histogram come from a single grouped query"""
+    data, statements = get_stats(client)
+    assert len(statements) == 1
+    assert data['total_products'] == 6
+    assert data['min_price'] == 500
+    assert data['max_price'] == 65000
+    assert [b['count'] for b in data['distribution']] == [2, 1, 1, 0, 2]
+    assert data['distribution'][0]['range'] == 'Under KES 1,000'
+    assert data['distribution'][-1]['range'] == 'Over KES 30,000'
+    # The open-ended top bucket keeps the bound the API has always reported
+    assert (data['distribution'][-1]['min_price'], data['distribution'][-1]['max_price']) == (30000, 50000)
+
+def test_custom_edges_and_scope(client):
+    """Bucket edges are configurable and stats can be scoped by category"""
+    data, _ = get_stats(client, '?edges=0,1000,50000&category=Bakeware')
+    assert data['total_products'] == 3
+    assert [(b['min_price'], b['max_price'], b['count']) for b in data['distribution']] == \
+        [(0, 1000, 0), (1000, 50000, 2), (50000, None, 1)]
+    assert client.get('/api/products/price-stats?edges=5,1').status_code == 400
+
+def test_memoized_until_price_changes(client):
+    """Results are memoized and refreshed when a price changes"""
+    get_stats(client)
+    data, statements = get_stats(client)
+    assert statements == []
+
+    product = Product.query.filter_by(name='Item 65000').first()
+    product.price = 100
+    db.session.commit()
+
+    data, statements = get_stats(client)
+    assert len(statements) == 1
+    assert data['min_price'] == 100
+
+def test_memo_follows_catalog_version(client):
+    """A price change made elsewhere is seen once it bumps the catalog version"""
+    get_stats(client)
+
+    # A Core update fires no session events here, as with a write from another worker
+    db.session.execute(update(Product).where(Product.name == 'Item 65000').values(price=99999))
+    touch_catalog(db.session, 'products')
+    db.session.commit()
+
+    data, statements = get_stats(client)
+    assert len(statements) == 1
+    assert data['max_price'] == 99999
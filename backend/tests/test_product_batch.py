@@ -0,0 +1,78 @@
+import pytest
+from app_factory import create_app
+from models import db
+from models.category import Category
+from models.brand import Brand
+from models.product import Product
+from models.product_image import ProductImage
+from models.review import Review
+from sqlalchemy import event
+import json
+
+app = create_app('testing')
+
+@pytest.fixture
+def client():
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            category = Category(name='Cookware', slug='cookware')
+            brand = Brand(name='Wega', slug='wega')
+            db.session.add_all([category, brand])
+            db.session.commit()
+
+            for name in ('Frying Pan', 'Sauce Pan', 'Stock Pot'):
+                product = Product(name=name, price=1500, category_id=category.id, brand_id=brand.id)
+                db.session.add(product)
+                db.session.flush()
+                db.session.add(ProductImage(product_id=product.id, image_url='https://res.cloudinary.com/demo/pan.jpg', is_primary=True))
+                db.session.add(Review(product_id=product.id, user='Jane', title='Great', rating=5, comment='Great pan'))
+            db.session.commit()
+
+            yield client
+
+            db.session.remove()
+            db.drop_all()
+
+def get_batch(client, query):
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if 'catalog_versions' not in statement:
+            statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = client.get(f'/api/products/batch{query}')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    return response, statements
+
+def test_batch_preserves_order_and_reports_missing(client):
+    """Products come back in request order; unknown IDs are listed as missing"""
+    response, statements = get_batch(client, '?ids=3,99,1,3')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert [p['id'] for p in data['products']] == [3, 1]
+    assert data['products'][0]['name'] == 'Stock Pot'
+    assert data['products'][0]['category'] == 'Cookware'
+    assert data['missing'] == [99]
+    # Products (with category and brand) plus one selectin for images; no reviews
+    assert len(statements) == 2
+    assert not any('reviews' in s for s in statements)
+
+def test_batch_projection(client):
+    """fields limits both the payload and the columns loaded"""
+    response, statements = get_batch(client, '?ids=2,1&fields=name,price')
+    data = json.loads(response.data)
+    assert data['products'] == [
+        {'id': 2, 'name': 'Sauce Pan', 'price': 1500.0},
+        {'id': 1, 'name': 'Frying Pan', 'price': 1500.0},
+    ]
+    assert len(statements) == 1
+
+def test_batch_validation(client):
+    """Missing, malformed and oversized id lists are rejected"""
+    assert client.get('/api/products/batch').status_code == 400
+    assert client.get('/api/products/batch?ids=1,abc').status_code == 400
+    assert client.get('/api/products/batch?ids=1&fields=bogus').status_code == 400
+    ids = ','.join(str(i) for i in range(1, app.config['MAX_BATCH_IDS'] + 2))
+    assert client.get(f'/api/products/batch?ids={ids}').status_code == 400
@@ -0,0 +1,97 @@
+import pytest
+from app_factory import create_app
+from models import db
+from models.category import Category
+from models.brand import Brand
+from models.product import Product
+from models.product_card import ProductCard
+from models.product_image import ProductImage
+from utils.product_cards import PRODUCT_LIST_FIELDS, product_list_dict
+from sqlalchemy import event
+import json
+
+app = create_app('testing')
+
+@pytest.fixture
+def client():
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            category = Category(name='Cookware', slug='cookware')
+            brand = Brand(name='Wega', slug='wega')
+            db.session.add_all([category, brand])
+            db.session.commit()
+            for name, price in (('Frying Pan', 1500), ('Sauce Pan', 900)):
+                product = Product(name=name, price=price, category_id=category.id, brand_id=brand.id)
+                db.session.add(product)
+                db.session.flush()
+                db.session.add(ProductImage(product_id=product.id, image_url='pan.jpg', is_primary=True, display_order=0))
+            db.session.commit()
+
+            yield client
+
+            db.session.remove()
+            db.drop_all()
+
+def card(product_id):
+    return json.loads(db.session.get(ProductCard, product_id).document)
+
+def listing(client, query=''):
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if 'catalog_versions' not in statement:
+            statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = client.get(f'/api/products{query}')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    return json.loads(response.data), statements
+
+def test_listing_is_spliced_from_cards(client):
+    """Full list entries come from stored cards and match the ORM serializer"""
+    data, statements = listing(client, '?include_total=false')
+    assert [p['name'] for p in data['products']] == ['Frying Pan', 'Sauce Pan']
+    # Relative image paths get the request's base URL at response time
+    assert data['products'][0]['image_url'] == 'http://localhost/static/uploads/pan.jpg'
+    assert not any('product_images' in s for s in statements)
+    assert any('product_cards' in s for s in statements)
+
+    with app.test_request_context():
+        product = db.session.get(Product, 1)
+        assert data['products'][0] == product_list_dict(product, list(PRODUCT_LIST_FIELDS))
+
+def test_cards_follow_writes(client):
+    """Product, image, category and brand writes regenerate the affected cards"""
+    product = db.session.get(Product, 1)
+    product.price = 1200
+    db.session.add(ProductImage(product_id=1, image_url='https://res.cloudinary.com/demo/lid.jpg', display_order=1))
+    db.session.commit()
+    assert card(1)['price'] == 1200.0
+    assert len(card(1)['images']) == 2
+    assert card(2)['price'] == 900.0
+
+    category = db.session.get(Category, 1)
+    category.name = 'Pots & Pans'
+    db.session.commit()
+    assert card(1)['category'] == card(2)['category'] == 'Pots & Pans'
+
+    client.post('/api/products/2/reviews', data=json.dumps({
+        'user': 'Jane', 'title': 'Nice', 'comment': 'Good pan', 'rating': 4
+    }), content_type='application/json')
+    assert (card(2)['rating'], card(2)['review_count']) == (4.0, 1)
+
+    client.patch('/api/products/bulk', data=json.dumps([{'id': 2, 'stock': 7}]), content_type='application/json')
+    assert card(2)['stock'] == 7
+
+    client.delete('/api/products/2')
+    assert db.session.get(ProductCard, 2) is None
+
+def test_missing_cards_render_on_demand(client):
+    """Products without a stored card still list correctly"""
+    ProductCard.query.delete()
+    db.session.commit()
+    data, _ = listing(client, '?include_total=false')
+    assert [p['name'] for p in data['products']] == ['Frying Pan', 'Sauce Pan']
+    sparse, _ = listing(client, '?fields=name&include_total=false')
+    assert sparse['products'] == [{'id': 1, 'name': 'Frying Pan'}, {'id': 2, 'name': 'Sauce Pan'}]
@@ -0,0 +1,111 @@
+import io
+import csv
+import gzip
+import json
+import pytest
+from app_factory import create_app
+from models import db
+from models.category import Category
+from models.brand import Brand
+from models.product import Product
+from models.product_image import ProductImage
+from models.product_feature import ProductFeature
+from models.product_specification import ProductSpecification
+from utils.product_import import iter_import_rows, normalize_import_row
+
+app = create_app('testing')
+
+IMAGE = 'https://res.cloudinary.com/demo/image/upload/pan.jpg'
+
+@pytest.fixture
+def client():
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            cookware, bakeware = Category(name='Cookware', slug='cookware'), Category(name='Bakeware', slug='bakeware')
+            brand = Brand(name='Wega', slug='wega')
+            db.session.add_all([cookware, bakeware, brand])
+            db.session.flush()
+
+            pan = Product(name='Frying Pan', price=1499.99, sku='FP-1', stock=5, is_sale=True,
+                          category_id=cookware.id, brand_id=brand.id)
+            db.session.add(pan)
+            db.session.flush()
+            db.session.add_all([
+                ProductImage(product_id=pan.id, image_url=IMAGE, is_primary=True, display_order=0),
+                ProductFeature(product_id=pan.id, feature='Non-stick', display_order=0),
+                ProductFeature(product_id=pan.id, feature='Oven safe', display_order=1),
+                ProductSpecification(product_id=pan.id, name='Material', value='Steel', display_order=0),
+            ])
+            for i in range(25):
+                db.session.add(Product(name=f'Tray {i}', price=100 + i, sku=f'TR-{i}', category_id=bakeware.id))
+            db.session.commit()
+
+            yield client
+
+            db.session.remove()
+            db.drop_all()
+
+def test_ndjson_export(client):
+    """Every product is one JSON line, in id order, with its children"""
+    app.config['EXPORT_BATCH_SIZE'] = 7
+    try:
+        response = client.get('/api/products/export')
+    finally:
+        app.config['EXPORT_BATCH_SIZE'] = 1000
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == 'application/x-ndjson'
+    assert response.headers['Content-Disposition'] == 'attachment; filename=products.ndjson'
+
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert len(rows) == 26
+    assert [row['id'] for row in rows] == sorted(row['id'] for row in rows)
+    pan = rows[0]
+    assert (pan['sku'], pan['price'], pan['category'], pan['brand'], pan['is_sale']) == ('FP-1', 1499.99, 'Cookware', 'Wega', True)
+    assert pan['images'] == [{'image_url': IMAGE, 'is_primary': True, 'display_order': 0}]
+    assert pan['features'] == ['Non-stick', 'Oven safe']
+    assert pan['specifications'] == [{'name': 'Material', 'value': 'Steel', 'display_order': 0}]
+
+def test_csv_export_reads_back_as_import(client):
+    """CSV exports use the import layout, so they can be imported again"""
+    response = client.get('/api/products/export?format=csv&category=Cookware')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+
+    records = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert len(records) == 1
+    assert records[0]['images'] == IMAGE
+    assert records[0]['features'] == 'Non-stick|Oven safe'
+    assert records[0]['is_sale'] == 'true'
+
+    with app.app_context():
+        [(_, data, error)] = iter_import_rows(io.BytesIO(response.data), 'csv')
+        row = normalize_import_row(data, {'Cookware': 1}, {'Wega': 1})
+    assert error is None
+    assert row['values']['sku'] == 'FP-1' and row['features'][1]['feature'] == 'Oven safe'
+    assert row['specifications'][0]['name'] == 'Material' and row['specifications'][0]['value'] == 'Steel'
+
+def test_gzip_export(client):
+    """Clients that accept gzip get the same export compressed"""
+    plain = client.get('/api/products/export').data
+    response = client.get('/api/products/export', headers={'Accept-Encoding': 'gzip, deflate'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Vary'] == 'Accept-Encoding'
+    assert gzip.decompress(response.data) == plain
+
+    identity = client.get('/api/products/export', headers={'Accept-Encoding': 'gzip;q=0, identity'})
+    assert 'Content-Encoding' not in identity.headers and identity.data == plain
+
+    # Each encoding has its own strong validator
+    assert response.headers['ETag'] == identity.headers['ETag'][:-1] + '-gzip"'
+    revalidated = client.get('/api/products/export', headers={'Accept-Encoding': 'gzip', 'If-None-Match': response.headers['ETag']})
+    assert (revalidated.status_code, revalidated.headers['Vary']) == (304, 'Accept-Encoding')
+    changed = client.get('/api/products/export', headers={'If-None-Match': response.headers['ETag']})
+    assert (changed.status_code, changed.data) == (200, plain)
+
+def test_export_revalidation_and_errors(client):
+    """Unchanged catalogs answer 304; unknown formats are rejected"""
+    etag = client.get('/api/products/export').headers['ETag']
+    assert client.get('/api/products/export', headers={'If-None-Match': etag}).status_code == 304
+    assert client.get('/api/products/export?format=xml').status_code == 400
@@ -0,0 +1,81 @@
+import pytest
+from app_factory import create_app
+from models import db
+from models.category import Category
+from models.brand import Brand
+from models.product import Product
+from models.product_image import ProductImage
+from models.product_specification import ProductSpecification
+from models.review import Review
+from sqlalchemy import event
+import json
+
+app = create_app('testing')
+
+LIST_FIELDS = {
+    'id', 'name', 'description', 'price', 'original_price', 'image_url', 'images',
+    'is_new', 'is_sale', 'is_featured', 'category', 'brand', 'rating', 'review_count',
+    'stock', 'sku'
+}
+
+@pytest.fixture
+def client():
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            category = Category(name='Cookware', slug='cookware')
+            brand = Brand(name='Wega', slug='wega')
+            db.session.add_all([category, brand])
+            db.session.commit()
+
+            for i in range(5):
+                product = Product(name=f'Pot {i}', price=1000 + i, category_id=category.id, brand_id=brand.id)
+                db.session.add(product)
+                db.session.flush()
+                for j in range(3):
+                    db.session.add(ProductImage(product_id=product.id, image_url=f'https://example.com/{i}-{j}.jpg',
+                                                is_primary=j == 1, display_order=j))
+                    db.session.add(ProductSpecification(product_id=product.id, name=f'Spec {j}', value='x'))
+                    db.session.add(Review(product_id=product.id, user='u', title='t', comment='c', rating=5))
+            db.session.commit()
+
+            yield client
+
+            db.session.remove()
+            db.drop_all()
+
+def count_queries(client, url):
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        # The conditional GET validator lookup is not part of the view's work
+        if 'catalog_versions' not in statement:
+            statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    return response, statements
+
+def test_default_fields_unchanged(client):
+    """Without fields= every list field is returned"""
+    response, statements = count_queries(client, '/api/products?include_total=false')
+    data = json.loads(response.data)
+    assert set(data['products'][0]) == LIST_FIELDS
+    assert data['products'][0]['image_url'] == 'https://example.com/0-1.jpg'
+    # One query for the page and one selectin load for images
+    assert len(statements) == 2
+    assert not any('reviews' in s or 'product_specifications' in s for s in statements)
+
+def test_sparse_fields(client):
+    """fields= limits both the payload and what is loaded"""
+    response, statements = count_queries(client, '/api/products?fields=name,price&include_total=false')
+    data = json.loads(response.data)
+    assert set(data['products'][0]) == {'id', 'name', 'price'}
+    assert len(statements) == 1
+    assert 'product_images' not in statements[0]
+
+def test_invalid_fields(client):
+    """Unknown fields are rejected"""
+    response = client.get('/api/products?fields=name,reviews')
+    assert response.status_code == 400
@@ -0,0 +1,99 @@
+import io
+import pytest
+from app_factory import create_app
+from models import db
+from models.admin_user import AdminUser
+from models.category import Category
+from models.brand import Brand
+from models.product import Product
+from models.product_image import ProductImage
+from models.product_feature import ProductFeature
+from models.product_specification import ProductSpecification
+from utils.auth import generate_tokens
+import json
+
+app = create_app('testing')
+
+IMAGE = 'https://res.cloudinary.com/demo/image/upload/pan.jpg'
+
+@pytest.fixture
+def client():
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            db.session.add_all([Category(name='Cookware', slug='cookware'), Brand(name='Wega', slug='wega')])
+            admin = AdminUser(username='admin', email='admin@example.com', role='admin')
+            admin.set_password('Secret123!')
+            db.session.add(admin)
+            db.session.commit()
+            client.environ_base['HTTP_AUTHORIZATION'] = f"Bearer {generate_tokens(admin.id, admin.username, admin.role)['access_token']}"
+
+            yield client
+
+            db.session.remove()
+            db.drop_all()
+
+def import_file(client, content, filename, query=''):
+    response = client.post(f'/api/products/import{query}', data={
+        'file': (io.BytesIO(content.encode('utf-8')), filename)
+    }, content_type='multipart/form-data')
+    return response.status_code, json.loads(response.data)
+
+def test_csv_import_with_children_and_errors(client):
+    """CSV rows become products with images, features and specifications; bad rows are reported"""
+    content = (
+        'name,price,sku,category,brand,is_sale,images,features,specifications\n'
+        f'Frying Pan,1500,FP-1,Cookware,Wega,true,{IMAGE},Non-stick|Oven safe,Material: Steel|Diameter: 28cm\n'
+        'No Price,,NP-1,Cookware,,,,,\n'
+        'Sauce Pan,900,SP-1,Bakeware,,,,,\n'
+        'Stock Pot,2500,,,,,,,\n'
+    )
+    status, summary = import_file(client, content, 'products.csv', '?batch_size=2')
+    assert status == 200
+    assert (summary['created'], summary['updated'], summary['failed']) == (2, 0, 2)
+    assert summary['errors'] == [
+        {'line': 3, 'sku': 'NP-1', 'error': 'Product price is required'},
+        {'line': 4, 'sku': 'SP-1', 'error': "Unknown category 'Bakeware'"},
+    ]
+
+    pan = Product.query.filter_by(sku='FP-1').one()
+    assert pan.category.name == 'Cookware' and pan.brand.name == 'Wega' and pan.is_sale is True
+    assert [img.image_url for img in pan.images] == [IMAGE] and pan.images[0].is_primary
+    assert [f.feature for f in pan.features] == ['Non-stick', 'Oven safe']
+    assert [(s.name, s.value) for s in pan.specifications] == [('Material', 'Steel'), ('Diameter', '28cm')]
+    assert Product.query.filter_by(name='Stock Pot').one().sku is None
+
+def test_jsonl_upsert_by_sku(client):
+    """Existing SKUs are updated in place and only the child lists given are replaced"""
+    import_file(client, json.dumps({'name': 'Frying Pan', 'price': 1500, 'sku': 'FP-1',
+                                    'images': [IMAGE], 'features': ['Non-stick']}) + '\n', 'products.jsonl')
+    product_id = Product.query.filter_by(sku='FP-1').one().id
+
+    content = '\n'.join([
+        json.dumps({'name': 'Frying Pan XL', 'price': 1800, 'sku': 'FP-1', 'features': ['Induction ready']}),
+        '{not json',
+        json.dumps({'name': 'Wok', 'price': 2200, 'sku': 'WK-1'}),
+    ])
+    status, summary = import_file(client, content, 'products.jsonl')
+    assert status == 200
+    assert (summary['created'], summary['updated'], summary['failed']) == (1, 1, 1)
+    assert summary['errors'][0]['line'] == 2
+
+    db.session.expire_all()
+    pan = db.session.get(Product, product_id)
+    assert (pan.name, float(pan.price)) == ('Frying Pan XL', 1800.0)
+    assert [f.feature for f in pan.features] == ['Induction ready']
+    assert ProductImage.query.count() == 1
+    assert ProductFeature.query.count() == 1
+    assert ProductSpecification.query.count() == 0
+
+    status, summary = import_file(client, json.dumps({'name': 'Wok', 'price': 1, 'sku': 'WK-1'}), 'products.jsonl', '?upsert=false')
+    assert summary['errors'] == [{'line': 1, 'sku': 'WK-1', 'error': 'SKU already exists'}]
+
+def test_import_requires_auth_and_format(client):
+    """The endpoint is admin only and needs a known format"""
+    status, _ = import_file(client, 'name,price\n', 'products.txt')
+    assert status == 400
+    del client.environ_base['HTTP_AUTHORIZATION']
+    status, _ = import_file(client, 'name,price\n', 'products.csv')
+    assert status == 401
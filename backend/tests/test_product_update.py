@@ -0,0 +1,97 @@
+import pytest
+from app_factory import create_app
+from models import db
+from models.product import Product
+from models.product_image import ProductImage
+from models.product_feature import ProductFeature
+from models.product_specification import ProductSpecification
+from sqlalchemy import event
+import json
+
+app = create_app('testing')
+
+IMAGE_A = 'https://res.cloudinary.com/demo/image/upload/a.jpg'
+IMAGE_B = 'https://res.cloudinary.com/demo/image/upload/b.jpg'
+IMAGE_C = 'https://res.cloudinary.com/demo/image/upload/c.jpg'
+
+@pytest.fixture
+def client():
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            product = Product(name='Frying Pan', price=1500, sku='FP-1', stock=10, is_sale=True)
+            db.session.add(product)
+            db.session.flush()
+            db.session.add_all([
+                ProductImage(product_id=product.id, image_url=IMAGE_A, is_primary=True, display_order=0),
+                ProductImage(product_id=product.id, image_url=IMAGE_B, is_primary=False, display_order=1),
+                ProductSpecification(product_id=product.id, name='Material', value='Steel', display_order=0),
+                ProductFeature(product_id=product.id, feature='Non-stick', display_order=0),
+            ])
+            db.session.commit()
+
+            yield client
+
+            db.session.remove()
+            db.drop_all()
+
+def send(client, method, payload):
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = client.open('/api/products/1', method=method, data=json.dumps(payload), content_type='application/json')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    return response, statements
+
+def full_payload(**overrides):
+    payload = {
+        'name': 'Frying Pan', 'price': 1500, 'sku': 'FP-1', 'stock': 10, 'is_sale': True,
+        'images': [{'image_url': IMAGE_A, 'is_primary': True}, {'image_url': IMAGE_B, 'is_primary': False}],
+        'specifications': [{'name': 'Material', 'value': 'Steel'}],
+        'features': [{'feature': 'Non-stick'}],
+    }
+    payload.update(overrides)
+    return payload
+
+def test_unchanged_children_are_not_rewritten(client):
+    """Saving the same children issues no child writes"""
+    response, statements = send(client, 'PUT', full_payload(price=1400))
+    assert response.status_code == 200
+    assert json.loads(response.data)['price'] == 1400.0
+    writes = [s for s in statements if s.startswith(('INSERT', 'UPDATE', 'DELETE'))]
+    assert not any('product_images' in s or 'product_specifications' in s or 'product_features' in s for s in writes)
+
+def test_children_are_diffed(client):
+    """Rows are updated in place, inserted or deleted only as needed"""
+    image_ids = [image.id for image in ProductImage.query.order_by(ProductImage.id)]
+    response, statements = send(client, 'PUT', full_payload(
+        images=[{'image_url': IMAGE_B, 'is_primary': True}, {'image_url': IMAGE_C, 'is_primary': False}],
+        specifications=[{'name': 'Material', 'value': 'Cast iron'}, {'name': 'Diameter', 'value': '28cm'}],
+    ))
+    assert response.status_code == 200
+
+    images = ProductImage.query.order_by(ProductImage.display_order).all()
+    assert [(i.image_url, i.is_primary) for i in images] == [(IMAGE_B, True), (IMAGE_C, False)]
+    # Image B kept its row; A was deleted and C inserted
+    assert images[0].id == image_ids[1]
+    assert image_ids[0] not in [i.id for i in images]
+    specs = ProductSpecification.query.order_by(ProductSpecification.display_order).all()
+    assert [(s.id, s.value) for s in specs][0] == (1, 'Cast iron')
+    assert len([s for s in statements if s.startswith('DELETE FROM product_images')]) == 1
+    assert not any(s.startswith('DELETE FROM product_specifications') for s in statements)
+
+def test_patch_updates_only_sent_fields(client):
+    """PATCH leaves omitted fields and collections alone"""
+    response, _ = send(client, 'PATCH', {'stock': 3, 'features': [{'feature': 'Non-stick'}, {'feature': 'Oven safe'}]})
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert (data['stock'], data['price'], data['sku'], data['is_sale']) == (3, 1500.0, 'FP-1', True)
+    assert [f['feature'] for f in data['features']] == ['Non-stick', 'Oven safe']
+    assert len(data['images']) == 2
+
+    assert send(client, 'PATCH', {'price': -1})[0].status_code == 400
+    assert send(client, 'PATCH', {'colour': 'red'})[0].status_code == 400
+    assert send(client, 'PATCH', {})[0].status_code == 400
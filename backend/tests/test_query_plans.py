@@ -0,0 +1,127 @@
+import re
+import pytest
+from datetime import datetime, timedelta
+from app_factory import create_app
+from models import db
+from models.category import Category
+from models.brand import Brand
+from models.product import Product
+from models.product_image import ProductImage
+from models.product_feature import ProductFeature
+from models.product_specification import ProductSpecification
+from models.review import Review
+from models.cart import Cart
+from models.cart_item import CartItem
+from models.order import Order
+from models.order_item import OrderItem
+from utils.related_products import rebuild_related_products
+from sqlalchemy import event
+
+app = create_app('testing')
+
+# Small reference tables that are fine to read in full
+SCANS_ALLOWED = {'categories', 'brands'}
+
+@pytest.fixture
+def client():
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            categories = [Category(name=f'Category {i}', slug=f'category-{i}') for i in range(4)]
+            brands = [Brand(name=f'Brand {i}', slug=f'brand-{i}') for i in range(4)]
+            db.session.add_all(categories + brands)
+            db.session.flush()
+
+            now = datetime.utcnow()
+            for i in range(40):
+                product = Product(name=f'Product {i}', price=100 + i * 10, sku=f'SKU-{i}', stock=5,
+                                  category_id=categories[i % 4].id, brand_id=brands[i % 3].id,
+                                  created_at=now - timedelta(days=i))
+                db.session.add(product)
+                db.session.flush()
+                db.session.add_all([
+                    ProductImage(product_id=product.id, image_url=f'p{i}.jpg', is_primary=True, display_order=0),
+                    ProductSpecification(product_id=product.id, name='Material', value='Steel', display_order=0),
+                    ProductFeature(product_id=product.id, feature='Dishwasher safe', display_order=0),
+                    Review(product_id=product.id, user='Jane', title='Good', comment='Works well', rating=4, date=now),
+                ])
+
+            cart = Cart(session_id='cart-1')
+            db.session.add(cart)
+            db.session.flush()
+            db.session.add(CartItem(cart_id=cart.id, product_id=1, quantity=1))
+
+            for i in range(20):
+                order = Order(order_number=f'ORD-{i}', first_name='Jane', last_name='Doe', email=f'jane{i % 5}@example.com',
+                              phone='0700000000', address='1 Road', city='Nairobi', state='Nairobi', total_amount=500,
+                              shipping_cost=200, guest_session_id=f'guest-{i % 5}', created_at=now - timedelta(hours=i))
+                db.session.add(order)
+                db.session.flush()
+                db.session.add(OrderItem(order_id=order.id, product_id=1 + i % 40, quantity=1, price=300))
+            rebuild_related_products(db.session)
+            db.session.commit()
+
+            yield client
+
+            db.session.remove()
+            db.drop_all()
+
+def captured_selects(client, method, url, json=None):
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = client.open(url, method=method, json=json)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    assert response.status_code == 200, response.data
+    return statements
+
+def sequential_scans(statement, parameters):
+    """Tables a statement reads in full, according to the database's query planner"""
+    connection = db.session.connection()
+    if connection.dialect.name == 'postgresql':
+        # With sequential scans priced out, any left are ones no index can replace
+        connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+        plan = [row[0] for row in connection.exec_driver_sql('EXPLAIN ' + statement, parameters)]
+        return {match.group(1) for line in plan for match in [re.search(r'Seq Scan on (\w+)', line)] if match}
+    plan = [row[-1] for row in connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters)]
+    return {
+        line.split()[1] for line in plan
+        # "SCAN t USING INDEX" walks an index; derived tables and virtual tables aren't stored tables
+        if line.startswith('SCAN ') and 'USING' not in line and 'VIRTUAL TABLE' not in line
+        and not line.split()[1].startswith('anon_') and line != 'SCAN CONSTANT ROW'
+    }
+
+HOT_QUERIES = [
+    # routes/products.py
+    ('GET', '/api/products', None),
+    ('GET', '/api/products?category=Category 1&sort_by=price', None),
+    ('GET', '/api/products?brand=Brand 2&sort_by=created_at&sort_order=desc', None),
+    ('GET', '/api/products?fields=id,name,price,image_url&cursor=&sort_by=created_at', None),
+    ('GET', '/api/products/7', None),
+    ('GET', '/api/products/batch?ids=3,9,27', None),
+    ('GET', '/api/products/7/related', None),
+    # routes/reviews.py
+    ('GET', '/api/products/7/reviews?cursor=', None),
+    ('GET', '/api/products/7/reviews?cursor=&sort_by=helpful&rating=4,5', None),
+    # routes/orders.py
+    ('GET', '/api/orders', None),
+    ('GET', '/api/orders/3', None),
+    # routes/order_tracking.py
+    ('POST', '/api/orders/track', {'email': 'jane2@example.com', 'order_number': 'ORD-7'}),
+    ('POST', '/api/orders/by-email', {'email': 'jane1@example.com'}),
+    ('GET', '/api/orders/guest/guest-3', None),
+    ('POST', '/api/orders/search', {'email': 'jane4@example.com'}),
+]
+
+@pytest.mark.parametrize('method,url,body', HOT_QUERIES, ids=[f'{method} {url}' for method, url, _ in HOT_QUERIES])
+def test_hot_queries_use_indexes(client, method, url, body):
+    """Hot route queries never fall back to sequential scans of large tables"""
+    statements = captured_selects(client, method, url, body)
+    assert statements
+    for statement, parameters in statements:
+        scans = sequential_scans(statement, parameters) - SCANS_ALLOWED
+        assert not scans, f'Sequential scan of {", ".join(sorted(scans))} in:\n{statement}'
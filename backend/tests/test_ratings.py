@@ -0,0 +1,83 @@
+import pytest
+from app_factory import create_app
+from models import db
+from models.product import Product
+from models.review import Review
+from models.catalog_version import CatalogVersion
+from utils.ratings import recompute_rating_aggregates
+import json
+
+app = create_app('testing')
+
+@pytest.fixture
+def client():
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            db.session.add(Product(name='Frying Pan', price=1500))
+            db.session.commit()
+
+            yield client
+
+            db.session.remove()
+            db.drop_all()
+
+def post_review(client, rating):
+    response = client.post('/api/products/1/reviews', data=json.dumps({
+        'user': 'Jane', 'title': 'Review', 'comment': 'Good pan', 'rating': rating
+    }), content_type='application/json')
+    assert response.status_code == 201
+    return json.loads(response.data)['id']
+
+def get_detail(client):
+    return json.loads(client.get('/api/products/1').data)
+
+def test_review_writes_update_aggregates(client):
+    """Create, edit and delete keep rating, count and histogram in step"""
+    first = post_review(client, 5)
+    post_review(client, 4)
+    second_review = post_review(client, 4)
+    data = get_detail(client)
+    assert data['review_count'] == 3
+    assert data['rating'] == 4.33
+    assert data['rating_histogram'] == {'1': 0, '2': 0, '3': 0, '4': 2, '5': 1}
+
+    client.put(f'/api/products/1/reviews/{second_review}', data=json.dumps({
+        'user': 'Jane', 'title': 'Review', 'comment': 'Changed my mind', 'rating': 1
+    }), content_type='application/json')
+    data = get_detail(client)
+    assert data['rating'] == 3.33
+    assert data['rating_histogram'] == {'1': 1, '2': 0, '3': 0, '4': 1, '5': 1}
+
+    client.delete(f'/api/products/1/reviews/{first}')
+    data = get_detail(client)
+    assert data['review_count'] == 2
+    assert data['rating'] == 2.5
+    assert data['rating_histogram']['5'] == 0
+
+    for review in Review.query.all():
+        client.delete(f'/api/products/1/reviews/{review.id}')
+    data = get_detail(client)
+    assert data['review_count'] == 0
+    assert data['rating'] is None
+
+def test_recompute_matches_reviews(client):
+    """The batch recompute repairs drifted aggregates"""
+    product = db.session.get(Product, 1)
+    product.rating, product.review_count = 4.5, 120
+    db.session.add_all([
+        Review(product_id=1, user='A', title='T', comment='C', rating=3),
+        Review(product_id=1, user='B', title='T', comment='C', rating=5),
+    ])
+    db.session.add(Product(name='Sauce Pan', price=900, rating=4.0, review_count=10))
+    db.session.commit()
+    version = db.session.get(CatalogVersion, 'products').version
+
+    assert recompute_rating_aggregates(db.session, batch_size=1) == 2
+    # Bulk updates still move the catalog version, so ETags and cached listings change
+    assert db.session.get(CatalogVersion, 'products').version > version
+    product = db.session.get(Product, 1)
+    assert (float(product.rating), product.review_count, product.rating_sum) == (4.0, 2, 8)
+    assert product.rating_histogram() == {'1': 0, '2': 0, '3': 1, '4': 0, '5': 1}
+    empty = db.session.get(Product, 2)
+    assert (empty.rating, empty.review_count) == (None, 0)
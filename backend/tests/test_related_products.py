@@ -0,0 +1,148 @@
+import pytest
+from app_factory import create_app
+from models import db
+from models.category import Category
+from models.brand import Brand
+from models.product import Product
+from models.product_specification import ProductSpecification
+from models.related_product import RelatedProduct, StaleRelatedProduct
+from utils.related_products import REBUILD_THRESHOLD, queue_related_refresh, rebuild_related_products, refresh_stale_related_products
+from sqlalchemy import event
+import json
+
+app = create_app('testing')
+
+@pytest.fixture
+def client():
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            cookware, bakeware = Category(name='Cookware', slug='cookware'), Category(name='Bakeware', slug='bakeware')
+            wega, other = Brand(name='Wega', slug='wega'), Brand(name='Other', slug='other')
+            db.session.add_all([cookware, bakeware, wega, other])
+            db.session.flush()
+            products = [
+                Product(name='Frying Pan', price=1500, category_id=cookware.id, brand_id=wega.id),
+                Product(name='Grill Pan', price=1600, category_id=cookware.id, brand_id=wega.id),
+                Product(name='Stock Pot', price=6000, category_id=cookware.id, brand_id=other.id),
+                Product(name='Baking Tray', price=1500, category_id=bakeware.id, brand_id=wega.id),
+                Product(name='Cake Tin', price=800, category_id=bakeware.id, brand_id=other.id),
+            ]
+            db.session.add_all(products)
+            db.session.flush()
+            db.session.add_all([
+                ProductSpecification(product_id=products[0].id, name='Material', value='Steel', display_order=0),
+                ProductSpecification(product_id=products[2].id, name='Material', value='Steel', display_order=0),
+            ])
+            db.session.commit()
+            refresh_stale_related_products(db.session)
+
+            yield client
+
+            db.session.remove()
+            db.drop_all()
+
+@pytest.fixture
+def writes():
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith('SELECT'):
+            statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    yield statements
+    event.remove(db.engine, 'before_cursor_execute', record)
+
+def product_id(name):
+    return Product.query.filter_by(name=name).one().id
+
+def related_names(client, name, query=''):
+    response = client.get(f'/api/products/{product_id(name)}/related{query}')
+    assert response.status_code == 200
+    return [p['name'] for p in json.loads(response.data)['products']]
+
+def test_scores_rank_shared_category_brand_price_and_specs(client):
+    """Closest matches come first; products sharing no category or brand are never related"""
+    # The shared specification lifts Stock Pot over the closer-priced Baking Tray
+    assert related_names(client, 'Frying Pan') == ['Grill Pan', 'Stock Pot', 'Baking Tray']
+    assert related_names(client, 'Frying Pan', '?limit=1') == ['Grill Pan']
+    assert 'Frying Pan' not in related_names(client, 'Cake Tin')
+
+    stored = {(row.product_id, row.rank): row.related_id for row in RelatedProduct.query}
+    rebuild_related_products(db.session)
+    db.session.commit()
+    assert {(row.product_id, row.rank): row.related_id for row in RelatedProduct.query} == stored
+
+def test_commits_only_queue_refreshes(client, writes):
+    """A product write queues the product; its lists are refreshed by the background job"""
+    pan = db.session.get(Product, product_id('Frying Pan'))
+    pan.price = 6000
+    db.session.commit()
+    assert not any('related_products' in statement and 'stale_related_products' not in statement for statement in writes)
+    assert [row.product_id for row in StaleRelatedProduct.query] == [pan.id]
+    assert related_names(client, 'Frying Pan') == ['Grill Pan', 'Stock Pot', 'Baking Tray']
+
+    assert refresh_stale_related_products(db.session) == 1
+    assert related_names(client, 'Frying Pan') == ['Stock Pot', 'Grill Pan', 'Baking Tray']
+    assert StaleRelatedProduct.query.count() == 0
+
+def test_long_queues_are_rebuilt_at_once(client):
+    """A queue longer than REBUILD_THRESHOLD is cleared by one full rebuild"""
+    RelatedProduct.query.delete()
+    queue_related_refresh(db.session, range(1, REBUILD_THRESHOLD + 2))
+    db.session.commit()
+
+    assert refresh_stale_related_products(db.session) == 5
+    assert related_names(client, 'Frying Pan') == ['Grill Pan', 'Stock Pot', 'Baking Tray']
+    assert StaleRelatedProduct.query.count() == 0
+
+def test_lists_refresh_when_products_change(client):
+    """Edits, new products and deletions update the affected lists once refreshed"""
+    pan = db.session.get(Product, product_id('Frying Pan'))
+    pan.category_id = Category.query.filter_by(name='Bakeware').one().id
+    pan.brand_id = Brand.query.filter_by(name='Other').one().id
+    db.session.commit()
+    refresh_stale_related_products(db.session)
+    assert related_names(client, 'Frying Pan') == ['Cake Tin', 'Stock Pot', 'Baking Tray']
+    assert 'Frying Pan' not in related_names(client, 'Grill Pan')
+
+    db.session.add(Product(name='Grill Pan Lid', price=1600, category_id=db.session.get(Product, product_id('Grill Pan')).category_id,
+                           brand_id=Brand.query.filter_by(name='Wega').one().id))
+    db.session.commit()
+    refresh_stale_related_products(db.session)
+    assert related_names(client, 'Grill Pan')[0] == 'Grill Pan Lid'
+
+    lid = db.session.get(Product, product_id('Grill Pan Lid'))
+    db.session.delete(lid)
+    db.session.commit()
+    refresh_stale_related_products(db.session)
+    assert 'Grill Pan Lid' not in related_names(client, 'Grill Pan')
+    assert not RelatedProduct.query.filter((RelatedProduct.product_id == lid.id) | (RelatedProduct.related_id == lid.id)).count()
+
+def test_spec_changes_and_bulk_price_updates_refresh_lists(client):
+    """Specification edits and PATCH /api/products/bulk reach the index too"""
+    db.session.delete(ProductSpecification.query.filter_by(product_id=product_id('Stock Pot')).one())
+    db.session.commit()
+    refresh_stale_related_products(db.session)
+    assert related_names(client, 'Frying Pan') == ['Grill Pan', 'Baking Tray', 'Stock Pot']
+
+    response = client.patch('/api/products/bulk', json=[{'id': product_id('Stock Pot'), 'price': 1500}])
+    assert response.status_code == 200
+    refresh_stale_related_products(db.session)
+    assert related_names(client, 'Frying Pan') == ['Grill Pan', 'Stock Pot', 'Baking Tray']
+
+def test_served_with_one_lookup(client):
+    """The endpoint reads the list and its cards in a single query"""
+    pan_id = product_id('Frying Pan')
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if 'catalog_versions' not in statement:
+            statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = client.get(f'/api/products/{pan_id}/related')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    assert response.status_code == 200
+    assert len(statements) == 1 and 'related_products' in statements[0]
+
+    assert client.get('/api/products/999/related').status_code == 404
@@ -0,0 +1,116 @@
+import pytest
+from app_factory import create_app
+from models import db
+from models.category import Category
+from models.product import Product
+from utils.cache import response_cache, LocalCacheBackend, RedisCacheBackend, FakeRedis
+import json
+
+app = create_app('testing')
+
+@pytest.fixture(params=['local', 'redis'])
+def client(request):
+    backend = LocalCacheBackend(max_entries=16) if request.param == 'local' else RedisCacheBackend(FakeRedis())
+    response_cache.init_app(app, backend=backend)
+
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            category = Category(name='Cookware', slug='cookware')
+            db.session.add(category)
+            db.session.commit()
+            db.session.add(Product(name='Frying Pan', price=1500, category_id=category.id))
+            db.session.commit()
+
+            yield client
+
+            db.session.remove()
+            db.drop_all()
+
+    response_cache.init_app(app)
+
+def test_cached_until_invalidated(client):
+    """Reads are served from cache until a write endpoint invalidates them"""
+    first = client.get('/api/products?per_page=5&page=1')
+    assert first.headers['X-Cache'] == 'MISS'
+    # Argument order does not matter
+    second = client.get('/api/products?page=1&per_page=5')
+    assert second.headers['X-Cache'] == 'HIT'
+    assert second.data == first.data
+
+    response = client.put('/api/products/1', data=json.dumps({'name': 'Grill Pan', 'price': 1800}),
+                          content_type='application/json')
+    assert response.status_code == 200
+
+    third = client.get('/api/products?per_page=5&page=1')
+    assert third.headers['X-Cache'] == 'MISS'
+    assert json.loads(third.data)['products'][0]['name'] == 'Grill Pan'
+
+def test_tags_are_scoped(client):
+    """Category writes invalidate category listings but not product details"""
+    client.get('/api/categories')
+    client.get('/api/products/1')
+    assert client.get('/api/categories').headers['X-Cache'] == 'HIT'
+
+    client.post('/api/categories', data=json.dumps({'name': 'Bakeware', 'slug': 'bakeware'}),
+                content_type='application/json')
+    response = client.get('/api/categories')
+    assert response.headers['X-Cache'] == 'MISS'
+    assert len(json.loads(response.data)) == 2
+
+    client.post('/api/products/1/reviews', data=json.dumps({
+        'user': 'Jane', 'title': 'Great', 'comment': 'Works well', 'rating': 5
+    }), content_type='application/json')
+    assert client.get('/api/products/1').headers['X-Cache'] == 'MISS'
+
+def test_errors_not_cached_and_stats(client):
+    """Only successful responses are cached and counters are exposed"""
+    assert client.get('/api/products/999').status_code == 404
+    assert client.get('/api/products/999').status_code == 404
+    client.get('/api/brands')
+    client.get('/api/brands')
+
+    stats = json.loads(client.get('/api/cache/stats').data)
+    assert stats['endpoints']['brands.get_brands'] == {'hits': 1, 'misses': 1}
+    assert stats['endpoints']['products.get_product'] == {'hits': 0, 'misses': 2}
+
+def test_writes_outside_this_worker_invalidate(client):
+    """Entries are keyed by the database's catalog versions, so writes this worker's cache never
+    heard about (other workers, scripts) still take effect"""
+    first = client.get('/api/categories')
+    assert client.get('/api/categories').headers['X-Cache'] == 'HIT'
+    products = client.get('/api/products')
+
+    # As another worker or a script would: committed, but no response_cache.invalidate here
+    category = Category.query.get(1)
+    category.name = 'Pots'
+    db.session.commit()
+
+    response = client.get('/api/categories')
+    assert response.headers['X-Cache'] == 'MISS'
+    assert json.loads(response.data)[0]['name'] == 'Pots'
+    assert response.headers['ETag'] != first.headers['ETag']
+
+    # Product listings are validated against category versions too
+    response = client.get('/api/products', headers={'If-None-Match': products.headers['ETag']})
+    assert (response.status_code, response.headers['X-Cache']) == (200, 'MISS')
+
+def test_cached_bodies_keep_their_etag(client):
+    """A hit is served with the ETag its body was stored under"""
+    first = client.get('/api/products')
+    second = client.get('/api/products')
+    assert second.headers['X-Cache'] == 'HIT'
+    assert second.headers['ETag'] == first.headers['ETag']
+    assert client.get('/api/products', headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+
+def test_reviews_invalidate_product_listings(client):
+    """Review writes change ratings shown in listings, not only the product detail"""
+    etag = client.get('/api/products').headers['ETag']
+    client.post('/api/products/1/reviews', data=json.dumps({
+        'user': 'Jane', 'title': 'Great', 'comment': 'Works well', 'rating': 4
+    }), content_type='application/json')
+
+    response = client.get('/api/products', headers={'If-None-Match': etag})
+    assert (response.status_code, response.headers['X-Cache']) == (200, 'MISS')
+    product = json.loads(response.data)['products'][0]
+    assert (product['rating'], product['review_count']) == (4.0, 1)
@@ -0,0 +1,135 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from app_factory import create_app
+from models import db
+from models.product import Product
+from models.review import Review
+from utils.ratings import recompute_rating_aggregates
+import json
+
+app = create_app('testing')
+
+@pytest.fixture
+def client():
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            db.session.add_all([Product(name='Frying Pan', price=1500), Product(name='Kettle', price=2500)])
+            db.session.commit()
+
+            # Pairs of reviews share a date and helpful counts repeat, exercising the id tiebreaker
+            start = datetime(2026, 1, 1)
+            for i in range(23):
+                db.session.add(Review(product_id=1, user=f'User {i:02d}', title='Review', comment='Comment',
+                                      rating=1 + i % 5, helpful_count=i % 4, date=start + timedelta(days=i // 2)))
+            db.session.add(Review(product_id=2, user='Other', title='Review', comment='Comment', rating=5, date=start))
+            db.session.commit()
+            recompute_rating_aggregates(db.session)
+
+            yield client
+
+            db.session.remove()
+            db.drop_all()
+
+def walk(client, params):
+    """Follow next_cursor until exhausted and return all reviews"""
+    reviews, cursor, pages = [], '', 0
+    while cursor is not None:
+        response = client.get(f'/api/products/1/reviews?{params}&per_page=5&cursor={cursor}')
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        reviews.extend(data['reviews'])
+        cursor = data['next_cursor']
+        pages += 1
+        assert pages < 10
+    return reviews
+
+@pytest.mark.parametrize('sort_by', ['date', 'helpful', 'rating', 'user'])
+@pytest.mark.parametrize('sort_order', ['asc', 'desc'])
+def test_cursor_walk_matches_offset_order(client, sort_by, sort_order):
+    """Keyset pages visit every review once, in the same order as one large offset page"""
+    response = client.get(f'/api/products/1/reviews?sort_by={sort_by}&sort_order={sort_order}&per_page=50')
+    expected = [review['id'] for review in json.loads(response.data)['reviews']]
+    assert [review['id'] for review in walk(client, f'sort_by={sort_by}&sort_order={sort_order}')] == expected
+    assert len(set(expected)) == 23
+
+def test_newest_and_helpful_sorts(client):
+    """sort_by=newest is newest first; sort_by=helpful puts the most helpful first"""
+    newest = walk(client, 'sort_by=newest')
+    assert [review['date'] for review in newest] == sorted((review['date'] for review in newest), reverse=True)
+    helpful = walk(client, 'sort_by=helpful')
+    assert [review['helpful_count'] for review in helpful] == sorted((review['helpful_count'] for review in helpful), reverse=True)
+
+def test_rating_filter(client):
+    """rating= keeps only the listed star levels and rejects anything else"""
+    reviews = walk(client, 'rating=4,5')
+    assert len(reviews) == 8
+    assert {review['rating'] for review in reviews} == {4, 5}
+
+    assert client.get('/api/products/1/reviews?rating=6').status_code == 400
+    assert client.get('/api/products/1/reviews?rating=good').status_code == 400
+
+def test_cursor_is_tied_to_sort_and_filter(client):
+    """A cursor can't be replayed against a different sort or filter"""
+    data = json.loads(client.get('/api/products/1/reviews?per_page=5&cursor=').data)
+    assert client.get(f"/api/products/1/reviews?per_page=5&cursor={data['next_cursor']}&sort_by=helpful").status_code == 400
+    assert client.get(f"/api/products/1/reviews?per_page=5&cursor={data['next_cursor']}&rating=5").status_code == 400
+    assert client.get('/api/products/1/reviews?cursor=not-a-cursor').status_code == 400
+
+def test_product_detail_embeds_summary_and_first_reviews(client):
+    """Product detail carries the rating summary and a preview page that continues on /reviews"""
+    app.config['REVIEWS_PREVIEW_SIZE'] = 5
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        data = json.loads(client.get('/api/products/1').data)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+    assert data['rating_summary'] == {
+        'average': 2.87,
+        'count': 23,
+        'histogram': {'1': 5, '2': 5, '3': 5, '4': 4, '5': 4},
+    }
+    assert len(data['reviews']) == 5
+    review_reads = [s for s in statements if 'FROM reviews' in s]
+    assert len(review_reads) == 1 and 'LIMIT' in review_reads[0]
+
+    rest = json.loads(client.get(f"/api/products/1/reviews?sort_by=newest&per_page=50&cursor={data['reviews_next_cursor']}").data)
+    ids = [review['id'] for review in data['reviews'] + rest['reviews']]
+    assert ids == [review['id'] for review in walk(client, 'sort_by=newest')]
+
+def test_review_pages_walk_the_index(client):
+    """Newest and most-helpful pages are index range scans without a sort step"""
+    if db.engine.dialect.name != 'sqlite':
+        pytest.skip('Checks the SQLite query plan')
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM reviews' in statement:
+            statements.append((statement, parameters))
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        data = json.loads(client.get('/api/products/1/reviews?per_page=5&cursor=').data)
+        client.get(f"/api/products/1/reviews?per_page=5&cursor={data['next_cursor']}")
+        client.get('/api/products/1/reviews?sort_by=helpful&per_page=5&cursor=')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+    assert len(statements) == 3
+    for statement, parameters in statements:
+        plan = ' '.join(row[-1] for row in db.session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters))
+        assert 'ix_reviews_product_id_' in plan and 'TEMP B-TREE' not in plan, plan
+
+def test_helpful_vote(client):
+    """Helpful votes increment atomically and show up in the product detail"""
+    for _ in range(3):
+        response = client.post('/api/products/1/reviews/23/helpful')
+        assert response.status_code == 200
+    assert json.loads(response.data)['helpful_count'] == 22 % 4 + 3
+
+    assert client.post('/api/products/2/reviews/23/helpful').status_code == 404
+    detail = json.loads(client.get('/api/products/1').data)
+    assert next(review for review in detail['reviews'] if review['id'] == 23)['helpful_count'] == 5
@@ -0,0 +1,63 @@
+import pytest
+from app_factory import create_app
+from models import db
+from models.category import Category
+from models.brand import Brand
+from models.product import Product
+import json
+
+app = create_app('testing')
+
+@pytest.fixture
+def client():
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            category = Category(name='Cookware', slug='cookware')
+            brand = Brand(name='Wega', slug='wega')
+            db.session.add_all([category, brand])
+            db.session.commit()
+
+            db.session.add_all([
+                Product(name='Frying Pan', sku='FP-100', price=1500, category_id=category.id, brand_id=brand.id,
+                        description='Non-stick frying pan'),
+                Product(name='Pan Set Deluxe', sku='PS-200', price=5000, category_id=category.id, brand_id=brand.id,
+                        description='Three piece set'),
+                Product(name='Chef Knife', sku='PAN-KNIFE', price=2500, category_id=category.id, brand_id=brand.id,
+                        description='Sharp blade'),
+                Product(name='Cutting Board', sku='CB-300', price=800, category_id=category.id, brand_id=brand.id,
+                        description='Great next to any pan'),
+            ])
+            db.session.commit()
+
+            yield client
+
+            db.session.remove()
+            db.drop_all()
+
+def search_names(client, term):
+    response = client.get(f'/api/products?search={term}')
+    assert response.status_code == 200
+    return [p['name'] for p in json.loads(response.data)['products']]
+
+def test_search_ranks_name_over_sku_over_description(client):
+    """Name matches come first, then SKU, then description"""
+    assert search_names(client, 'pan') == ['Pan Set Deluxe', 'Frying Pan', 'Chef Knife', 'Cutting Board']
+
+def test_search_prefix_and_multiple_terms(client):
+    """Each term is matched as a word prefix and all terms must match"""
+    assert search_names(client, 'fry') == ['Frying Pan']
+    assert search_names(client, 'pan set') == ['Pan Set Deluxe']
+    assert search_names(client, 'blender') == []
+
+def test_search_index_follows_updates_and_deletes(client):
+    """The index is kept in sync on update and delete"""
+    product = Product.query.filter_by(name='Chef Knife').first()
+    product.name = 'Bread Knife'
+    db.session.commit()
+    assert search_names(client, 'bread') == ['Bread Knife']
+    assert search_names(client, 'chef') == []
+
+    db.session.delete(product)
+    db.session.commit()
+    assert search_names(client, 'bread') == []
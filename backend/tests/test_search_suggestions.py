@@ -0,0 +1,90 @@
+import pytest
+from app_factory import create_app
+from models import db
+from models.category import Category
+from models.brand import Brand
+from models.product import Product
+from utils.suggestions import suggestion_index
+import json
+
+app = create_app('testing')
+
+@pytest.fixture
+def client():
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            suggestion_index.invalidate()
+
+            cookware = Category(name='Cookware', slug='cookware')
+            panware = Category(name='Panware', slug='panware')
+            brand = Brand(name='Pantry Pro', slug='pantry-pro')
+            db.session.add_all([cookware, panware, brand])
+            db.session.commit()
+
+            db.session.add_all([
+                Product(name='Frying Pan', price=1500, category_id=cookware.id, brand_id=brand.id),
+                Product(name='Pan Set', price=5000, category_id=panware.id, brand_id=brand.id),
+                Product(name='Saucepan', price=2500, category_id=panware.id),
+                Product(name='Chef Knife', price=900, category_id=cookware.id),
+            ])
+            db.session.commit()
+
+            yield client
+
+            suggestion_index.invalidate()
+            db.session.remove()
+            db.drop_all()
+
+def get_suggestions(client, q):
+    response = client.get(f'/api/products/search-suggestions?q={q}')
+    assert response.status_code == 200
+    return json.loads(response.data)
+
+def test_suggestions_cover_products_categories_and_brands(client):
+    """Suggestions include products, categories and brands with counts"""
+    data = get_suggestions(client, 'pan')
+    detailed = {(s['text'], s['type']): s for s in data['detailed_suggestions']}
+
+    assert detailed[('Panware', 'category')]['count'] == 2
+    assert detailed[('Pantry Pro', 'brand')]['count'] == 2
+    assert detailed[('Pan Set', 'product')]['count'] == 1
+    # Inner word prefix and substring matches rank below leading prefixes
+    assert detailed[('Frying Pan', 'product')]['priority'] == 2
+    assert detailed[('Saucepan', 'product')]['priority'] == 3
+    assert data['suggestions'] == [s['text'] for s in data['detailed_suggestions']]
+    assert data['suggestions'][-1] == 'Saucepan'
+
+def test_suggestions_follow_catalog_changes(client):
+    """Committed writes are applied to the loaded index"""
+    get_suggestions(client, 'pan')
+    assert suggestion_index.loaded
+
+    category = Category.query.filter_by(slug='cookware').first()
+    category.name = 'Kitchen Pans'
+    knife = Product.query.filter_by(name='Chef Knife').first()
+    db.session.delete(knife)
+    db.session.add(Product(name='Grill Pan', price=3000, category_id=category.id))
+    db.session.commit()
+
+    detailed = {(s['text'], s['type']): s for s in get_suggestions(client, 'pan')['detailed_suggestions']}
+    assert detailed[('Kitchen Pans', 'category')]['count'] == 2
+    assert ('Grill Pan', 'product') in detailed
+    assert get_suggestions(client, 'chef')['suggestions'] == []
+    assert get_suggestions(client, 'cookware')['suggestions'] == []
+
+def test_expired_index_answers_while_reloading(client):
+    """A reload in progress doesn't hold up lookups on the expired index"""
+    get_suggestions(client, 'pan')
+    db.session.add(Product(name='Pancake Pan', price=800))
+    db.session.execute(Product.__table__.update().where(Product.name == 'Saucepan').values(name='Stockpot'))
+    db.session.commit()
+
+    # Another thread is reloading: serve what is loaded instead of waiting
+    with suggestion_index._load_lock:
+        suggestion_index.ensure_loaded(db.session, ttl=0)
+        assert 'Saucepan' in get_suggestions(client, 'pan')['suggestions']
+
+    suggestion_index.ensure_loaded(db.session, ttl=0)
+    suggestions = get_suggestions(client, 'pan')['suggestions']
+    assert 'Saucepan' not in suggestions and 'Pancake Pan' in suggestions
@@ -0,0 +1,80 @@
+import threading
+from flask import current_app
+from sqlalchemy import func
+from models.catalog_version import VERSION_SCOPES
+from utils.helpers import finite_float
+
+# Scopes whose writes change the bootstrap payload
+BOOTSTRAP_SCOPES = VERSION_SCOPES
+
+
+def build_bootstrap(session):
+    """Reference data the storefront needs on startup"""
+    from models import Product, Category, Brand, DeliveryLocation
+
+    # Product counts and price bounds for every category/brand pair in one grouped query
+    rows = session.query(
+        Product.category_id, Product.brand_id, func.count(Product.id), func.min(Product.price), func.max(Product.price)
+    ).group_by(Product.category_id, Product.brand_id).all()
+
+    category_counts, brand_counts = {}, {}
+    for category_id, brand_id, count, _, _ in rows:
+        category_counts[category_id] = category_counts.get(category_id, 0) + count
+        brand_counts[brand_id] = brand_counts.get(brand_id, 0) + count
+    low_prices = [low for _, _, _, low, _ in rows if low is not None]
+    high_prices = [high for _, _, _, _, high in rows if high is not None]
+
+    return {
+        'categories': [
+            {**category.to_dict(), 'product_count': category_counts.get(category.id, 0)}
+            for category in session.query(Category).order_by(Category.id)
+        ],
+        'brands': [
+            {**brand.to_dict(), 'product_count': brand_counts.get(brand.id, 0)}
+            for brand in session.query(Brand).order_by(Brand.id)
+        ],
+        'delivery_locations': [
+            location.to_dict()
+            for location in session.query(DeliveryLocation).filter_by(is_active=True).order_by(DeliveryLocation.name, DeliveryLocation.id)
+        ],
+        # Same fallback as /api/products/price-stats for an empty catalog
+        'price_range': {
+            'min_price': finite_float(min(low_prices)) if low_prices else 0,
+            'max_price': finite_float(max(high_prices)) if high_prices else 50000,
+            'total_products': sum(row[2] for row in rows)
+        }
+    }
+
+
+class BootstrapSnapshot:
+    """Per-worker bootstrap payload, built and serialized once per catalog version.
+
+    Keyed by the ETag of the version counters, so any write to products,
+    categories, brands or delivery locations (from any worker) makes the
+    next request rebuild it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entry = None
+
+    def get(self, session, version):
+        """Serialized payload for a version, building it if needed"""
+        entry = self._entry
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        with self._lock:
+            entry = self._entry
+            if entry is not None and entry[0] == version:
+                return entry[1]
+            payload = {'version': version, **build_bootstrap(session)}
+            body = current_app.json.response(payload).get_data()
+            self._entry = (version, body)
+            return body
+
+    def clear(self):
+        with self._lock:
+            self._entry = None
+
+
+bootstrap_snapshot = BootstrapSnapshot()
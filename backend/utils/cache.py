@@ -0,0 +1,363 @@
+import time
+import hashlib
+import threading
+from functools import wraps
+from collections import OrderedDict
+from flask import current_app, request, make_response
+from utils.conditional import CATALOG_ETAG_KEY, CATALOG_VERSIONS_KEY, request_catalog_versions
+
+
+class LocalCacheBackend:
+    """In-process LRU cache with per-entry expiry"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        with self._lock:
+            expires_at = time.monotonic() + timeout if timeout else None
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._counters.pop(key, None)
+
+    def get_counters(self, keys):
+        with self._lock:
+            return [self._counters.get(key, 0) for key in keys]
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._counters.clear()
+
+
+class RedisCacheBackend:
+    """Cache stored in any client speaking the Redis protocol (redis-py or FakeRedis)"""
+
+    def __init__(self, client, prefix='wega:cache:'):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value, timeout=None):
+        self.client.set(self.prefix + key, value, ex=timeout or None)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def get_counters(self, keys):
+        if not keys:
+            return []
+        return [int(value or 0) for value in self.client.mget([self.prefix + key for key in keys])]
+
+    def incr(self, key):
+        return self.client.incr(self.prefix + key)
+
+    def clear(self):
+        for key in list(self.client.scan_iter(self.prefix + '*')):
+            self.client.delete(key)
+
+
+class FakeRedis:
+    """Minimal in-process stand-in for a Redis client, for tests and local development"""
+
+    def __init__(self):
+        self._data = {}
+        self._expires = {}
+        self._lock = threading.Lock()
+
+    def _alive(self, key):
+        expires_at = self._expires.get(key)
+        if expires_at is not None and expires_at < time.monotonic():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return key in self._data
+
+    def get(self, key):
+        with self._lock:
+            return self._data.get(key) if self._alive(key) else None
+
+    def mget(self, keys):
+        with self._lock:
+            return [self._data.get(key) if self._alive(key) else None for key in keys]
+
+    def set(self, key, value, ex=None, nx=False):
+        with self._lock:
+            if nx and self._alive(key):
+                return None
+            if isinstance(value, str):
+                value = value.encode('utf-8')
+            elif isinstance(value, int):
+                value = str(value).encode('utf-8')
+            self._data[key] = value
+            if ex:
+                self._expires[key] = time.monotonic() + ex
+            else:
+                self._expires.pop(key, None)
+            return True
+
+    def delete(self, *keys):
+        with self._lock:
+            removed = 0
+            for key in keys:
+                if self._data.pop(key, None) is not None:
+                    removed += 1
+                self._expires.pop(key, None)
+            return removed
+
+    def incr(self, key, amount=1):
+        with self._lock:
+            value = int(self._data.get(key, 0) if self._alive(key) else 0) + amount
+            self._data[key] = str(value).encode('utf-8')
+            return value
+
+    def expire(self, key, seconds):
+        with self._lock:
+            if not self._alive(key):
+                return False
+            self._expires[key] = time.monotonic() + seconds
+            return True
+
+    def sadd(self, key, *members):
+        with self._lock:
+            if not self._alive(key):
+                self._data[key] = set()
+            members = {self._encode(member) for member in members}
+            added = len(members - self._data[key])
+            self._data[key].update(members)
+            return added
+
+    def srem(self, key, *members):
+        with self._lock:
+            if not self._alive(key):
+                return 0
+            members = {self._encode(member) for member in members}
+            removed = len(self._data[key] & members)
+            self._data[key] -= members
+            if not self._data[key]:
+                del self._data[key]
+            return removed
+
+    def smembers(self, key):
+        with self._lock:
+            return set(self._data[key]) if self._alive(key) else set()
+
+    @staticmethod
+    def _encode(value):
+        return value.encode('utf-8') if isinstance(value, str) else value
+
+    def exists(self, key):
+        with self._lock:
+            return int(self._alive(key))
+
+    def scan_iter(self, match='*'):
+        from fnmatch import fnmatchcase
+        with self._lock:
+            return [key for key in list(self._data) if self._alive(key) and fnmatchcase(key, match)]
+
+    def flushdb(self):
+        with self._lock:
+            self._data.clear()
+            self._expires.clear()
+
+
+def create_cache_backend(config):
+    """Build the cache backend described by the app config (None disables caching)"""
+    cache_type = config.get('CACHE_TYPE', 'simple')
+    if cache_type == 'simple':
+        return LocalCacheBackend(config.get('CACHE_MAX_ENTRIES', 1024))
+    if cache_type == 'fakeredis':
+        return RedisCacheBackend(FakeRedis())
+    if cache_type == 'redis':
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_TYPE 'redis' requires the redis package (pip install redis)")
+        return RedisCacheBackend(redis.Redis.from_url(config['CACHE_REDIS_URL']))
+    return None
+
+
+def _pack(response, etag=None):
+    header = f"{response.status_code}\n{response.mimetype}\n{etag or ''}\n".encode('utf-8')
+    return header + response.get_data()
+
+
+def _unpack(value):
+    status, mimetype, etag, body = value.split(b'\n', 3)
+    return int(status), mimetype.decode('utf-8'), etag.decode('utf-8') or None, body
+
+
+def catalog_scope(tag):
+    """The catalog_versions scope whose writes change a tag's responses (None if unversioned)"""
+    from models.catalog_version import VERSION_SCOPES
+
+    if tag.startswith('product:'):
+        return 'products'
+    return tag if tag in VERSION_SCOPES else None
+
+
+class ResponseCache:
+    """Response cache for read endpoints with tag-based invalidation.
+
+    Each cached response is stored under its route, its normalized query
+    args, the current version of every tag it depends on and the
+    catalog_versions counters of the catalog scopes behind those tags (and
+    any the request already read for its ETag). Invalidating a tag bumps
+    its version in the backend, which orphans every entry built on the
+    old one (they age out through their TTL or LRU eviction). The catalog
+    counters are bumped in the database by every catalog write, from any
+    worker or script, so even per-process backends never serve a response
+    built before a catalog write that reached the database.
+    """
+
+    GLOBAL_TAG = '*'
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app, backend=None):
+        app.extensions['response_cache'] = {
+            'backend': backend if backend is not None else create_cache_backend(app.config),
+            'stats': {},
+            'lock': threading.Lock()
+        }
+
+    def _state(self):
+        return current_app.extensions.get('response_cache')
+
+    @property
+    def backend(self):
+        state = self._state()
+        return state['backend'] if state else None
+
+    def _record(self, endpoint, outcome):
+        state = self._state()
+        with state['lock']:
+            counters = state['stats'].setdefault(endpoint, {'hits': 0, 'misses': 0})
+            counters[outcome] += 1
+
+    def stats(self):
+        """Hit/miss counters per endpoint for this worker"""
+        state = self._state()
+        if not state:
+            return {}
+        with state['lock']:
+            endpoints = {endpoint: dict(counters) for endpoint, counters in state['stats'].items()}
+        hits = sum(counters['hits'] for counters in endpoints.values())
+        misses = sum(counters['misses'] for counters in endpoints.values())
+        return {
+            'backend': type(state['backend']).__name__ if state['backend'] else None,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 4) if hits + misses else 0,
+            'endpoints': endpoints
+        }
+
+    def timeout_for(self, endpoint, timeout=None):
+        route_timeouts = current_app.config.get('CACHE_ROUTE_TIMEOUTS', {})
+        if endpoint in route_timeouts:
+            return route_timeouts[endpoint]
+        return timeout or current_app.config.get('CACHE_DEFAULT_TIMEOUT', 300)
+
+    def make_key(self, tags):
+        """Cache key for the current request under the current tag and catalog versions"""
+        from models import db
+
+        args = sorted(request.args.items(multi=True))
+        tag_keys = ['tag:' + tag for tag in (self.GLOBAL_TAG, *tags)]
+        versions = self.backend.get_counters(tag_keys)
+        request_catalog_versions(db.session, {catalog_scope(tag) for tag in tags} - {None})
+        # Every version the request has read, including those behind its ETag
+        catalog = sorted((scope, version) for scope, (version, _) in request.environ[CATALOG_VERSIONS_KEY].items())
+        raw = repr((request.path, args, list(zip(tags, versions[1:])), versions[0], catalog))
+        return 'entry:' + hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def cached(self, tags=(), timeout=None):
+        """Cache successful GET responses of a view.
+
+        tags may be a tuple of tag names or a callable taking the view
+        arguments and returning one (e.g. per-product tags).
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                backend = self.backend
+                if backend is None or request.method != 'GET':
+                    return view(*args, **kwargs)
+
+                endpoint = request.endpoint
+                view_tags = tuple(tags(**kwargs) if callable(tags) else tags)
+                try:
+                    key = self.make_key(view_tags)
+                    cached_value = backend.get(key)
+                except Exception as e:
+                    current_app.logger.warning(f"Response cache unavailable: {str(e)}")
+                    return view(*args, **kwargs)
+
+                if cached_value is not None:
+                    self._record(endpoint, 'hits')
+                    status, mimetype, etag, body = _unpack(cached_value)
+                    response = current_app.response_class(body, status=status, mimetype=mimetype)
+                    if etag:
+                        response.set_etag(etag)
+                    response.headers['X-Cache'] = 'HIT'
+                    return response
+
+                self._record(endpoint, 'misses')
+                response = make_response(view(*args, **kwargs))
+                if response.status_code == 200 and not response.direct_passthrough:
+                    try:
+                        backend.set(key, _pack(response, request.environ.get(CATALOG_ETAG_KEY)),
+                                    self.timeout_for(endpoint, timeout))
+                    except Exception as e:
+                        current_app.logger.warning(f"Failed to store cached response: {str(e)}")
+                response.headers['X-Cache'] = 'MISS'
+                return response
+            return wrapper
+        return decorator
+
+    def invalidate(self, *tags):
+        """Invalidate every cached response depending on any of the tags"""
+        backend = self.backend
+        if backend is None:
+            return
+        try:
+            for tag in tags:
+                backend.incr('tag:' + tag)
+        except Exception as e:
+            current_app.logger.error(f"Failed to invalidate cache tags {tags}: {str(e)}")
+
+    def invalidate_all(self):
+        """Invalidate every cached response"""
+        self.invalidate(self.GLOBAL_TAG)
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,369 @@
+import json
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import bindparam, delete, func, insert, literal, select, true, update
+from sqlalchemy.orm import joinedload, selectinload
+from utils.helpers import finite_float, get_base_url
+from utils.product_cards import BASE_URL_PLACEHOLDER, product_card_documents
+
+
+def cart_totals(lines):
+    """Item count and subtotal of a cart's (unit price, quantity) lines"""
+    item_count = sum(quantity or 0 for _, quantity in lines)
+    subtotal = sum((Decimal(price) * (quantity or 0) for price, quantity in lines if price is not None), Decimal(0))
+    return {'item_count': item_count, 'subtotal': finite_float(subtotal)}
+
+
+def _line_total(price, quantity):
+    return finite_float(Decimal(price) * (quantity or 0)) if price is not None else None
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+def _summarize(session, cart, lines):
+    """Cart fields plus (item fields, price, card document) lines as the summary response"""
+    missing = list(dict.fromkeys(item['product_id'] for item, price, document in lines if document is None and price is not None))
+    rendered = dict(zip(missing, product_card_documents(session, missing))) if missing else {}
+
+    base_url = get_base_url()
+    items = []
+    for item, price, document in lines:
+        document = document or rendered.get(item['product_id'])
+        items.append({
+            **item,
+            'unit_price': finite_float(price),
+            'line_total': _line_total(price, item['quantity']),
+            'product': json.loads(document.replace(BASE_URL_PLACEHOLDER, base_url)) if document else None
+        })
+    return {**cart, 'items': items, **cart_totals([(price, item['quantity']) for item, price, _ in lines])}
+
+
+def cart_summary(session, cart):
+    """A cart with each item's product card, line totals, item count and subtotal.
+
+    Items, prices and stored cards come from a single joined query; only
+    products without a stored card cost a second one.
+    """
+    from models import CartItem, Product, ProductCard
+
+    rows = session.query(CartItem, Product.price, ProductCard.document) \
+        .outerjoin(Product, Product.id == CartItem.product_id) \
+        .outerjoin(ProductCard, ProductCard.product_id == CartItem.product_id) \
+        .filter(CartItem.cart_id == cart.id) \
+        .order_by(CartItem.id).all()
+
+    return _summarize(session, {
+        'id': cart.id,
+        'session_id': cart.session_id,
+        'created_at': _isoformat(cart.created_at),
+        'updated_at': _isoformat(cart.updated_at)
+    }, [({
+        'id': item.id,
+        'cart_id': item.cart_id,
+        'product_id': item.product_id,
+        'quantity': item.quantity,
+        'created_at': _isoformat(item.created_at),
+        'updated_at': _isoformat(item.updated_at)
+    }, price, document) for item, price, document in rows])
+
+
+def _document_fields(document):
+    cart = {key: document[key] for key in ('id', 'session_id', 'created_at', 'updated_at')}
+    items = [{**item, 'cart_id': document['id']} for item in document['items']]
+    return cart, items
+
+
+def cart_document_summary(session, document):
+    """cart_summary for a cart held outside SQL as a document (see utils.cart_store)"""
+    from models import Product, ProductCard
+
+    cart, items = _document_fields(document)
+    product_ids = {item['product_id'] for item in items}
+    products = {
+        product_id: (price, card)
+        for product_id, price, card in session.query(Product.id, Product.price, ProductCard.document)
+        .outerjoin(ProductCard, ProductCard.product_id == Product.id)
+        .filter(Product.id.in_(product_ids))
+    } if product_ids else {}
+    return _summarize(session, cart, [(item, *products.get(item['product_id'], (None, None))) for item in items])
+
+
+def verbose_cart_document(session, document):
+    """verbose_cart for a cart held outside SQL as a document"""
+    from models import Product
+
+    cart, items = _document_fields(document)
+    product_ids = {item['product_id'] for item in items}
+    products = {
+        product.id: product for product in session.query(Product).options(
+            joinedload(Product.category), joinedload(Product.brand), selectinload(Product.images),
+            selectinload(Product.specifications), selectinload(Product.features)
+        ).filter(Product.id.in_(product_ids))
+    } if product_ids else {}
+    items = [{**item, 'product': products[item['product_id']].to_dict() if item['product_id'] in products else None}
+             for item in items]
+    return {**cart, 'items': items, **cart_totals([
+        (products[item['product_id']].price if item['product_id'] in products else None, item['quantity']) for item in items
+    ])}
+
+
+def verbose_cart_options():
+    """Loader options for serializing a cart with full product documents (Cart.to_dict)"""
+    from models import Cart, CartItem, Product
+
+    product = selectinload(Cart.items).joinedload(CartItem.product)
+    return [
+        product.joinedload(Product.category),
+        product.joinedload(Product.brand),
+        product.selectinload(Product.images),
+        product.selectinload(Product.specifications),
+        product.selectinload(Product.features),
+    ]
+
+
+def verbose_cart(cart):
+    """The full cart document (every item's whole product) with totals"""
+    data = cart.to_dict()
+    data.update(cart_totals([(item.product.price if item.product else None, item.quantity) for item in cart.items]))
+    return data
+
+
+def upsert_insert(session):
+    """insert() with ON CONFLICT support for the session's database (None if it has none)"""
+    dialect = session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    return dialect_insert
+
+
+def ensure_cart(session, session_id):
+    """Create a session's cart unless it exists, without racing concurrent creators"""
+    from models import Cart
+
+    dialect_insert = upsert_insert(session)
+    if dialect_insert is None:
+        if session.query(Cart.id).filter_by(session_id=session_id).first() is None:
+            session.add(Cart(session_id=session_id))
+            session.flush()
+        return
+    session.execute(dialect_insert(Cart.__table__).values(session_id=session_id)
+                    .on_conflict_do_nothing(index_elements=['session_id']))
+
+
+def add_cart_item(session, session_id, product_id, quantity):
+    """Add a quantity of a product to a session's cart; False if the product doesn't exist.
+
+    On PostgreSQL and SQLite this is two statements and no reads: the cart
+    is created if missing, then a single INSERT ... SELECT (which finds
+    nothing to insert for an unknown product) either adds the row or, on
+    conflict with the (cart_id, product_id) constraint, adds to the stored
+    quantity. Concurrent adds of the same product can't lose updates.
+    """
+    from models import Cart, CartItem, Product
+
+    ensure_cart(session, session_id)
+    dialect_insert = upsert_insert(session)
+    if dialect_insert is None:
+        if session.query(Product.id).filter_by(id=product_id).first() is None:
+            return False
+        cart_id = session.query(Cart.id).filter_by(session_id=session_id).scalar()
+        item = session.query(CartItem).filter_by(cart_id=cart_id, product_id=product_id).first()
+        if item:
+            item.quantity = (item.quantity or 0) + quantity
+        else:
+            session.add(CartItem(cart_id=cart_id, product_id=product_id, quantity=quantity))
+        return True
+
+    carts, products, items = Cart.__table__, Product.__table__, CartItem.__table__
+    now = datetime.utcnow()
+    # Both sides are filtered to at most one row, so the cross join is one row or none
+    source = select(carts.c.id, products.c.id, literal(quantity), literal(now), literal(now)) \
+        .select_from(carts.join(products, true())) \
+        .where(carts.c.session_id == session_id, products.c.id == product_id)
+    statement = dialect_insert(items).from_select(
+        ['cart_id', 'product_id', 'quantity', 'created_at', 'updated_at'], source, include_defaults=False
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=['cart_id', 'product_id'],
+        set_={'quantity': func.coalesce(items.c.quantity, 0) + statement.excluded.quantity,
+              'updated_at': statement.excluded.updated_at}
+    )
+    return session.execute(statement).rowcount > 0
+
+
+def _insert_cart_items(session, rows, accumulate):
+    """Insert cart item rows, adding to (or, unless accumulate, replacing) rows a concurrent request created"""
+    from models import CartItem
+
+    table = CartItem.__table__
+    dialect_insert = upsert_insert(session)
+    if dialect_insert is None:
+        session.execute(insert(table), rows)
+        return
+    statement = dialect_insert(table)
+    quantity = func.coalesce(table.c.quantity, 0) + statement.excluded.quantity if accumulate else statement.excluded.quantity
+    session.execute(statement.on_conflict_do_update(index_elements=['cart_id', 'product_id'],
+                                                    set_={'quantity': quantity}), rows)
+
+
+# Operations POST /api/cart/batch accepts
+CART_OPERATIONS = ('add', 'set', 'remove', 'merge')
+
+
+class CartOperationError(ValueError):
+    """Raised when a batch operation can't be applied; index is its position in the batch"""
+
+    def __init__(self, message, index):
+        super().__init__(message)
+        self.index = index
+
+
+def _positive_int(value, name, allow_zero=False):
+    if isinstance(value, bool) or not isinstance(value, int) or value < (0 if allow_zero else 1):
+        raise ValueError(f"{name} must be a {'non-negative' if allow_zero else 'positive'} integer")
+    return value
+
+
+def parse_cart_operation(item):
+    """Validate one batch operation, returning it normalised"""
+    if not isinstance(item, dict):
+        raise ValueError('Each operation must be an object')
+    op = item.get('op')
+    if op not in CART_OPERATIONS:
+        raise ValueError(f"op must be one of: {', '.join(CART_OPERATIONS)}")
+
+    if op == 'merge':
+        if not isinstance(item.get('session_id'), str) or not item['session_id']:
+            raise ValueError('merge requires the session_id of the cart to merge in')
+        return {'op': op, 'session_id': item['session_id']}
+
+    operation = {'op': op}
+    if op == 'add' or item.get('item_id') is None:
+        operation['product_id'] = _positive_int(item.get('product_id'), 'product_id')
+    else:
+        operation['item_id'] = _positive_int(item.get('item_id'), 'item_id')
+    if op == 'add':
+        operation['quantity'] = _positive_int(item.get('quantity', 1), 'quantity')
+    elif op == 'set':
+        # Setting a quantity of 0 removes the item
+        operation['quantity'] = _positive_int(item.get('quantity'), 'quantity', allow_zero=True)
+    return operation
+
+
+def fold_cart_operations(operations, product_by_item, merged):
+    """Fold batch operations, in order, into one final change per product.
+
+    product_by_item maps the cart's item ids to product ids and merged
+    maps merged carts' session ids to their (product id, quantity) lines.
+    Returns ({product id: (replaces the stored quantity?, quantity)},
+    {product id: index of the first operation naming it}); a quantity of
+    0 with replace set means remove.
+    """
+    changes, first_index = {}, {}
+    for index, operation in enumerate(operations):
+        if operation['op'] == 'merge':
+            additions = merged.get(operation['session_id'], ())
+        else:
+            product_id = operation.get('product_id') or product_by_item.get(operation.get('item_id'))
+            if product_id is None:
+                if operation['op'] == 'remove':
+                    continue  # already gone
+                raise CartOperationError('Item not found in cart', index)
+            if operation['op'] == 'add':
+                additions = [(product_id, operation['quantity'])]
+            else:
+                changes[product_id] = (True, operation.get('quantity', 0))
+                first_index.setdefault(product_id, index)
+                continue
+        for product_id, quantity in additions:
+            replace, current = changes.get(product_id, (False, 0))
+            changes[product_id] = (replace, current + quantity)
+            first_index.setdefault(product_id, index)
+    return changes, first_index
+
+
+def check_cart_products(session, changes, first_index):
+    """Raise CartOperationError for the first operation adding a product that doesn't exist"""
+    from models import Product
+
+    wanted = {product_id for product_id, (replace, quantity) in changes.items() if quantity > 0}
+    found = {row[0] for row in session.query(Product.id).filter(Product.id.in_(wanted))} if wanted else set()
+    missing = sorted(wanted - found, key=first_index.get)
+    if missing:
+        raise CartOperationError(f'Product {missing[0]} not found', first_index[missing[0]])
+
+
+def apply_cart_operations(session, cart, operations):
+    """Apply parsed batch operations to a cart with set-based statements.
+
+    Operations are folded in order into one final change per product
+    (adds accumulate, set and remove replace), then written as at most
+    one DELETE, two executemany UPDATEs and two upserting INSERTs.
+    Quantities added to existing rows are relative to the stored value,
+    so concurrent requests don't lose each other's adds. Merged carts are
+    deleted.
+    Runs on the session's connection; the caller commits.
+    """
+    from models import Cart, CartItem
+
+    items = session.query(CartItem.id, CartItem.product_id, CartItem.quantity).filter(CartItem.cart_id == cart.id).all()
+    product_by_item = {item_id: product_id for item_id, product_id, _ in items}
+    existing = {product_id for _, product_id, _ in items}
+
+    merged = {}
+    merge_sessions = {operation['session_id'] for operation in operations if operation['op'] == 'merge'}
+    if merge_sessions:
+        if cart.session_id in merge_sessions:
+            raise CartOperationError('A cart cannot be merged into itself',
+                                     next(index for index, operation in enumerate(operations)
+                                          if operation.get('session_id') == cart.session_id))
+        rows = session.query(Cart.session_id, CartItem.product_id, func.sum(CartItem.quantity)) \
+            .join(CartItem, CartItem.cart_id == Cart.id) \
+            .filter(Cart.session_id.in_(merge_sessions)) \
+            .group_by(Cart.session_id, CartItem.product_id).all()
+        for session_id, product_id, quantity in rows:
+            merged.setdefault(session_id, []).append((product_id, quantity or 0))
+
+    changes, first_index = fold_cart_operations(operations, product_by_item, merged)
+    check_cart_products(session, changes, first_index)
+
+    table = CartItem.__table__
+    removed = [product_id for product_id, (replace, quantity) in changes.items() if quantity == 0 and product_id in existing]
+    if removed:
+        session.execute(delete(table).where(table.c.cart_id == cart.id, table.c.product_id.in_(removed)))
+
+    replaced = [{'b_product': product_id, 'b_quantity': quantity} for product_id, (replace, quantity) in changes.items()
+                if replace and quantity > 0 and product_id in existing]
+    if replaced:
+        session.execute(
+            update(table).where(table.c.cart_id == cart.id, table.c.product_id == bindparam('b_product'))
+            .values(quantity=bindparam('b_quantity')), replaced
+        )
+    incremented = [{'b_product': product_id, 'b_quantity': quantity} for product_id, (replace, quantity) in changes.items()
+                   if not replace and quantity > 0 and product_id in existing]
+    if incremented:
+        session.execute(
+            update(table).where(table.c.cart_id == cart.id, table.c.product_id == bindparam('b_product'))
+            .values(quantity=func.coalesce(table.c.quantity, 0) + bindparam('b_quantity')), incremented
+        )
+
+    for accumulate in (True, False):
+        added = [{'cart_id': cart.id, 'product_id': product_id, 'quantity': quantity}
+                 for product_id, (replace, quantity) in changes.items()
+                 if replace != accumulate and quantity > 0 and product_id not in existing]
+        if added:
+            _insert_cart_items(session, added, accumulate)
+
+    if merge_sessions:
+        carts = Cart.__table__
+        merged_carts = select(carts.c.id).where(carts.c.session_id.in_(merge_sessions))
+        session.execute(delete(table).where(table.c.cart_id.in_(merged_carts)))
+        session.execute(delete(carts).where(carts.c.session_id.in_(merge_sessions)))
+
+    session.execute(update(Cart.__table__).where(Cart.__table__.c.id == cart.id).values(updated_at=datetime.utcnow()))
@@ -0,0 +1,517 @@
+import json
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import delete, func, insert, select, text, update
+from utils.cart import (CartOperationError, add_cart_item, apply_cart_operations, cart_document_summary, cart_summary,
+                        check_cart_products, ensure_cart, fold_cart_operations, verbose_cart, verbose_cart_document,
+                        verbose_cart_options)
+
+DEFAULT_CART_STORE_TTL = 7 * 24 * 3600
+
+
+class CartStoreError(Exception):
+    """Raised when a cart change can't be made; status is the HTTP status to answer with"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class CartStore(ABC):
+    """Where carts live while they're being shopped.
+
+    Methods take the SQLAlchemy session to read products (and, for the SQL
+    store, carts) through, and return carts as response dicts: product
+    cards with totals, or full product documents when verbose.
+    """
+
+    @abstractmethod
+    def get(self, session, session_id, verbose=False):
+        """A session's cart, or None if it has none"""
+
+    @abstractmethod
+    def add_item(self, session, session_id, product_id, quantity, verbose=False):
+        """Add a quantity of a product, creating the cart if needed"""
+
+    @abstractmethod
+    def update_item(self, session, item_id, quantity, verbose=False):
+        """Set an item's quantity, returning its cart"""
+
+    @abstractmethod
+    def remove_item(self, session, item_id, verbose=False):
+        """Remove an item, returning its cart (None if there was no such item)"""
+
+    @abstractmethod
+    def apply_operations(self, session, session_id, operations, verbose=False):
+        """Apply parsed batch operations all or nothing (CartOperationError names the one that failed)"""
+
+    @abstractmethod
+    def clear(self, session, session_id):
+        """Delete a session's cart; False if it had none"""
+
+    def persist(self, session, session_id):
+        """Make the carts tables hold a session's current cart (before checkout reads them)"""
+
+    def discard(self, session_id):
+        """Forget a session's cart once SQL has taken it over (after checkout)"""
+
+    def flush(self, session):
+        """Persist every cart changed since the last flush, returning how many were written"""
+        return 0
+
+
+class SQLCartStore(CartStore):
+    """Carts read and written straight through to the carts tables, one transaction per change"""
+
+    def _load(self, session, session_id, verbose):
+        from models import Cart
+
+        query = session.query(Cart).filter_by(session_id=session_id)
+        if verbose:
+            query = query.options(*verbose_cart_options())
+        return query.first()
+
+    def _render(self, session, cart, verbose):
+        return verbose_cart(cart) if verbose else cart_summary(session, cart)
+
+    def get(self, session, session_id, verbose=False):
+        cart = self._load(session, session_id, verbose)
+        return self._render(session, cart, verbose) if cart else None
+
+    def add_item(self, session, session_id, product_id, quantity, verbose=False):
+        # Upsert the cart and the item; an unknown product inserts nothing
+        if not add_cart_item(session, session_id, product_id, quantity):
+            session.rollback()
+            raise CartStoreError('Product not found', 404)
+        session.commit()
+        return self.get(session, session_id, verbose)
+
+    def update_item(self, session, item_id, quantity, verbose=False):
+        from models import CartItem
+
+        item = session.get(CartItem, item_id)
+        if item is None:
+            raise CartStoreError('Cart item not found', 404)
+        item.quantity = quantity
+        session.commit()
+        return self._render(session, item.cart, verbose)
+
+    def remove_item(self, session, item_id, verbose=False):
+        from models import CartItem
+
+        item = session.get(CartItem, item_id)
+        if item is None:
+            return None
+        cart = item.cart
+        session.delete(item)
+        session.commit()
+        return self._render(session, cart, verbose)
+
+    def apply_operations(self, session, session_id, operations, verbose=False):
+        from models import Cart
+
+        ensure_cart(session, session_id)
+        cart = session.query(Cart).filter_by(session_id=session_id).one()
+        apply_cart_operations(session, cart, operations)
+        session.commit()
+        return self._render(session, cart, verbose)
+
+    def clear(self, session, session_id):
+        from models import Cart
+
+        cart = session.query(Cart).filter_by(session_id=session_id).first()
+        if cart is None:
+            return False
+        session.delete(cart)
+        session.commit()
+        return True
+
+
+def _now():
+    return datetime.utcnow().isoformat()
+
+
+def _parse_time(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+class KeyValueCartStore(CartStore):
+    """Hot carts held in a Redis-protocol store and written behind to SQL.
+
+    Each cart is one JSON document under {prefix}{session_id}, expiring
+    ttl seconds after its last change; {prefix}item:{id} points an item id
+    back at its cart. Browsing and editing a cart only reads products from
+    SQL: changed carts are listed in the {prefix}dirty set and written to
+    the carts tables by flush() (see CartStoreFlusher) or by persist() at
+    checkout. A cart missing from the store is loaded from SQL, keeping its
+    ids. New items take ids from a counter seeded from cart_items, so they
+    keep them once persisted. Changes to a cart are serialized by a short
+    lock key per cart.
+    """
+
+    LOCK_TIMEOUT = 5
+
+    def __init__(self, client, ttl=DEFAULT_CART_STORE_TTL, prefix='wega:cart:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _key(self, session_id):
+        return f'{self.prefix}{session_id}'
+
+    def _item_key(self, item_id):
+        return f'{self.prefix}item:{item_id}'
+
+    @property
+    def _dirty_key(self):
+        return f'{self.prefix}dirty'
+
+    @contextmanager
+    def _locked(self, *session_ids):
+        """Hold the lock keys of some carts (taken in a fixed order, so batches can't deadlock)"""
+        token = uuid.uuid4().hex
+        keys = [f'{self.prefix}lock:{session_id}' for session_id in sorted(set(session_ids))]
+        held = []
+        try:
+            for key in keys:
+                deadline = time.monotonic() + self.LOCK_TIMEOUT
+                while not self.client.set(key, token, ex=self.LOCK_TIMEOUT, nx=True):
+                    if time.monotonic() > deadline:
+                        raise CartStoreError('Cart is busy, please retry', 409)
+                    time.sleep(0.01)
+                held.append(key)
+            yield
+        finally:
+            for key in held:
+                if self.client.get(key) == token.encode('utf-8'):
+                    self.client.delete(key)
+
+    def _stored(self, session_id):
+        value = self.client.get(self._key(session_id))
+        return json.loads(value) if value is not None else None
+
+    def _load_from_sql(self, session, session_id):
+        from models import Cart, CartItem
+
+        carts, items = Cart.__table__, CartItem.__table__
+        cart = session.execute(select(carts.c.id, carts.c.created_at, carts.c.updated_at)
+                               .where(carts.c.session_id == session_id)).first()
+        if cart is None:
+            return None
+        rows = session.execute(select(items.c.id, items.c.product_id, items.c.quantity, items.c.created_at, items.c.updated_at)
+                               .where(items.c.cart_id == cart.id).order_by(items.c.id))
+        document = {
+            'id': cart.id,
+            'session_id': session_id,
+            'created_at': cart.created_at.isoformat() if cart.created_at else None,
+            'updated_at': cart.updated_at.isoformat() if cart.updated_at else None,
+            'items': [{
+                'id': row.id,
+                'product_id': row.product_id,
+                'quantity': row.quantity,
+                'created_at': row.created_at.isoformat() if row.created_at else None,
+                'updated_at': row.updated_at.isoformat() if row.updated_at else None
+            } for row in rows]
+        }
+        # Don't overwrite a document a concurrent request stored meanwhile
+        if not self.client.set(self._key(session_id), json.dumps(document), ex=self.ttl, nx=True):
+            return self._stored(session_id)
+        self._index_items(document)
+        return document
+
+    def _document(self, session, session_id, create=False):
+        """A session's cart document from the store, else SQL; a new one (or None) if it has none"""
+        document = self._stored(session_id)
+        if document is None:
+            document = self._load_from_sql(session, session_id)
+        if document is not None and document.get('cleared'):
+            if not create:
+                return None
+            document = {**document, 'cleared': False, 'items': []}
+        if document is None and create:
+            now = _now()
+            document = {'id': None, 'session_id': session_id, 'created_at': now, 'updated_at': now, 'items': []}
+        return document
+
+    def _index_items(self, document):
+        for item in document['items']:
+            self.client.set(self._item_key(item['id']), document['session_id'], ex=self.ttl)
+
+    def _save(self, document):
+        """Store a changed document and mark it for the next flush"""
+        document['updated_at'] = _now()
+        self.client.set(self._key(document['session_id']), json.dumps(document), ex=self.ttl)
+        self._index_items(document)
+        self.client.sadd(self._dirty_key, document['session_id'])
+
+    def _clear(self, document):
+        # Kept as a tombstone, so the cart isn't reloaded from SQL before the deletion is persisted
+        self._save({**document, 'items': [], 'cleared': True})
+
+    def _next_item_id(self, session):
+        from models import CartItem
+
+        key = f'{self.prefix}item_seq'
+        if not self.client.exists(key):
+            self.client.set(key, session.query(func.coalesce(func.max(CartItem.id), 0)).scalar(), nx=True)
+        return self.client.incr(key)
+
+    def _new_item(self, session, product_id, quantity):
+        now = _now()
+        return {'id': self._next_item_id(session), 'product_id': product_id, 'quantity': quantity,
+                'created_at': now, 'updated_at': now}
+
+    def _item_session(self, session, item_id):
+        """The session id of the cart holding an item, or None"""
+        from models import Cart, CartItem
+
+        value = self.client.get(self._item_key(item_id))
+        if value is not None:
+            return value.decode('utf-8') if isinstance(value, bytes) else value
+        return session.query(Cart.session_id).join(CartItem, CartItem.cart_id == Cart.id) \
+            .filter(CartItem.id == item_id).scalar()
+
+    def _render(self, session, document, verbose):
+        return verbose_cart_document(session, document) if verbose else cart_document_summary(session, document)
+
+    def get(self, session, session_id, verbose=False):
+        document = self._document(session, session_id)
+        return self._render(session, document, verbose) if document else None
+
+    def add_item(self, session, session_id, product_id, quantity, verbose=False):
+        from models import Product
+
+        if session.query(Product.id).filter_by(id=product_id).first() is None:
+            raise CartStoreError('Product not found', 404)
+        with self._locked(session_id):
+            document = self._document(session, session_id, create=True)
+            item = next((item for item in document['items'] if item['product_id'] == product_id), None)
+            if item:
+                item['quantity'] = (item['quantity'] or 0) + quantity
+                item['updated_at'] = _now()
+            else:
+                document['items'].append(self._new_item(session, product_id, quantity))
+            self._save(document)
+        return self._render(session, document, verbose)
+
+    def _change_item(self, session, item_id, change):
+        """Apply change(document, item) to an item's cart, returning the document (None if no such item)"""
+        session_id = self._item_session(session, item_id)
+        if session_id is None:
+            return None
+        with self._locked(session_id):
+            document = self._document(session, session_id)
+            item = next((item for item in document['items'] if item['id'] == item_id), None) if document else None
+            if item is None:
+                return None
+            change(document, item)
+            self._save(document)
+        return document
+
+    def update_item(self, session, item_id, quantity, verbose=False):
+        def set_quantity(document, item):
+            item.update(quantity=quantity, updated_at=_now())
+
+        document = self._change_item(session, item_id, set_quantity)
+        if document is None:
+            raise CartStoreError('Cart item not found', 404)
+        return self._render(session, document, verbose)
+
+    def remove_item(self, session, item_id, verbose=False):
+        document = self._change_item(session, item_id, lambda document, item: document['items'].remove(item))
+        return self._render(session, document, verbose) if document else None
+
+    def apply_operations(self, session, session_id, operations, verbose=False):
+        merge_sessions = {operation['session_id'] for operation in operations if operation['op'] == 'merge'}
+        if session_id in merge_sessions:
+            raise CartOperationError('A cart cannot be merged into itself',
+                                     next(index for index, operation in enumerate(operations)
+                                          if operation.get('session_id') == session_id))
+        with self._locked(session_id, *merge_sessions):
+            document = self._document(session, session_id, create=True)
+            merged_documents = [merged for merged in (self._document(session, merge_session)
+                                                      for merge_session in merge_sessions) if merged]
+            merged = {merged['session_id']: [(item['product_id'], item['quantity'] or 0) for item in merged['items']]
+                      for merged in merged_documents}
+            changes, first_index = fold_cart_operations(
+                operations, {item['id']: item['product_id'] for item in document['items']}, merged
+            )
+            check_cart_products(session, changes, first_index)
+
+            items = {item['product_id']: item for item in document['items']}
+            for product_id, (replace, quantity) in changes.items():
+                item = items.get(product_id)
+                if quantity == 0:
+                    if item:
+                        document['items'].remove(item)
+                elif item:
+                    item['quantity'] = quantity if replace else (item['quantity'] or 0) + quantity
+                    item['updated_at'] = _now()
+                else:
+                    document['items'].append(self._new_item(session, product_id, quantity))
+            self._save(document)
+            for merged_document in merged_documents:
+                self._clear(merged_document)
+        return self._render(session, document, verbose)
+
+    def clear(self, session, session_id):
+        with self._locked(session_id):
+            document = self._document(session, session_id)
+            if document is None:
+                return False
+            self._clear(document)
+        return True
+
+    def persist(self, session, session_id):
+        from models import Cart, CartItem, Product
+
+        # Unmarked first: a change made while this runs marks the cart again
+        self.client.srem(self._dirty_key, session_id)
+        document = self._stored(session_id)
+        if document is None:
+            return
+        carts, items = Cart.__table__, CartItem.__table__
+        try:
+            if document.get('cleared'):
+                cart_ids = select(carts.c.id).where(carts.c.session_id == session_id)
+                session.execute(delete(items).where(items.c.cart_id.in_(cart_ids)))
+                session.execute(delete(carts).where(carts.c.session_id == session_id))
+                session.commit()
+                with self._locked(session_id):
+                    current = self._stored(session_id)
+                    if current is not None and current.get('cleared'):
+                        self.client.delete(self._key(session_id))
+                return
+
+            ensure_cart(session, session_id)
+            cart_id = session.execute(select(carts.c.id).where(carts.c.session_id == session_id)).scalar()
+            product_ids = {item['product_id'] for item in document['items']}
+            # Products deleted since they were added are dropped, as the foreign key requires
+            existing = {row[0] for row in session.execute(select(Product.__table__.c.id)
+                                                          .where(Product.__table__.c.id.in_(product_ids)))} \
+                if product_ids else set()
+            rows = [{
+                'id': item['id'],
+                'cart_id': cart_id,
+                'product_id': item['product_id'],
+                'quantity': item['quantity'],
+                'created_at': _parse_time(item['created_at']),
+                'updated_at': _parse_time(item['updated_at'])
+            } for item in document['items'] if item['product_id'] in existing]
+            session.execute(delete(items).where(items.c.cart_id == cart_id))
+            if rows:
+                session.execute(insert(items), rows)
+                if session.get_bind().dialect.name == 'postgresql':
+                    # Keep the id sequence ahead of ids handed out by the store
+                    session.execute(text("SELECT setval(pg_get_serial_sequence('cart_items', 'id'), :value)"),
+                                    {'value': max(int(self.client.get(f'{self.prefix}item_seq') or 0),
+                                                  max(row['id'] for row in rows))})
+            session.execute(update(carts).where(carts.c.id == cart_id)
+                            .values(updated_at=_parse_time(document['updated_at'])))
+            session.commit()
+        except Exception:
+            session.rollback()
+            self.client.sadd(self._dirty_key, session_id)
+            raise
+
+        if document['id'] != cart_id:
+            with self._locked(session_id):
+                current = self._stored(session_id)
+                if current is not None:
+                    current['id'] = cart_id
+                    self.client.set(self._key(session_id), json.dumps(current), ex=self.ttl)
+
+    def discard(self, session_id):
+        document = self._stored(session_id)
+        keys = [self._item_key(item['id']) for item in document['items']] if document else []
+        self.client.delete(self._key(session_id), *keys)
+        self.client.srem(self._dirty_key, session_id)
+
+    def flush(self, session):
+        persisted = 0
+        for session_id in self.client.smembers(self._dirty_key):
+            session_id = session_id.decode('utf-8') if isinstance(session_id, bytes) else session_id
+            try:
+                self.persist(session, session_id)
+                persisted += 1
+            except Exception as e:
+                current_app.logger.error(f"Error persisting cart {session_id}: {str(e)}")
+        return persisted
+
+
+def create_cart_store(config):
+    """Build the cart store described by the app config"""
+    store_type = config.get('CART_STORE_TYPE', 'sql')
+    ttl = config.get('CART_STORE_TTL', DEFAULT_CART_STORE_TTL)
+    if store_type == 'sql':
+        return SQLCartStore()
+    if store_type == 'fakeredis':
+        # Each worker process would hold its own carts
+        if not config.get('TESTING'):
+            raise RuntimeError("CART_STORE_TYPE 'fakeredis' is only for tests; use 'redis' to share carts between workers")
+        from utils.cache import FakeRedis
+        return KeyValueCartStore(FakeRedis(), ttl)
+    if store_type == 'redis':
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CART_STORE_TYPE 'redis' requires the redis package (pip install redis)")
+        return KeyValueCartStore(redis.Redis.from_url(config['CART_STORE_REDIS_URL']), ttl)
+    raise RuntimeError(f"Unknown CART_STORE_TYPE '{store_type}'")
+
+
+def cart_store():
+    """The current app's cart store"""
+    return current_app.extensions['cart_store']
+
+
+class CartStoreFlusher:
+    """Daemon thread writing changed carts behind to SQL every interval seconds"""
+
+    def __init__(self, app, interval):
+        self.app = app
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='cart-store-flusher', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+    def run_once(self):
+        from models import db
+
+        with self.app.app_context():
+            try:
+                return self.app.extensions['cart_store'].flush(db.session)
+            except Exception as e:
+                db.session.rollback()
+                self.app.logger.error(f"Error flushing carts: {str(e)}")
+            finally:
+                db.session.remove()
+
+
+def init_cart_store(app, store=None):
+    """Set up the app's cart store, and its write-behind flusher for key-value stores (never under tests)"""
+    store = store if store is not None else create_cart_store(app.config)
+    app.extensions['cart_store'] = store
+    interval = app.config.get('CART_STORE_FLUSH_INTERVAL') or 0
+    if isinstance(store, KeyValueCartStore) and interval > 0 and not app.testing:
+        flusher = CartStoreFlusher(app, interval)
+        flusher.start()
+        app.extensions['cart_store_flusher'] = flusher
+    return store
@@ -0,0 +1,152 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import and_, delete, exists, func, or_, select
+
+DEFAULT_CART_TTL_DAYS = 30
+DEFAULT_SWEEP_BATCH_SIZE = 500
+
+
+def idle_carts_condition(cutoff):
+    """Carts untouched since cutoff, counting changes to their items"""
+    from models import Cart, CartItem
+
+    carts, items = Cart.__table__, CartItem.__table__
+    return and_(
+        or_(carts.c.updated_at < cutoff,
+            and_(carts.c.updated_at.is_(None), or_(carts.c.created_at.is_(None), carts.c.created_at < cutoff))),
+        ~exists().where(items.c.cart_id == carts.c.id, items.c.updated_at >= cutoff)
+    )
+
+
+def count_idle_carts(session, ttl, now=None):
+    from models import Cart
+
+    cutoff = (now or datetime.utcnow()) - ttl
+    return session.execute(select(func.count()).select_from(Cart.__table__).where(idle_carts_condition(cutoff))).scalar()
+
+
+def sweep_abandoned_carts(session, ttl, batch_size=DEFAULT_SWEEP_BATCH_SIZE, max_batches=None, pause=0, now=None):
+    """Delete carts idle for longer than ttl, returning the run's metrics.
+
+    Works through batch_size carts at a time, each batch (its items, then
+    the carts) in its own short transaction, so no lock is held for
+    longer than one batch. On PostgreSQL carts locked by an in-flight
+    request are skipped rather than waited on; they're picked up by a
+    later sweep if they stay idle.
+    """
+    from models import Cart, CartItem
+
+    carts, items = Cart.__table__, CartItem.__table__
+    started = time.monotonic()
+    cutoff = (now or datetime.utcnow()) - ttl
+    carts_deleted = items_deleted = batches = 0
+
+    while max_batches is None or batches < max_batches:
+        query = select(carts.c.id).where(idle_carts_condition(cutoff)).limit(batch_size)
+        if session.get_bind().dialect.name == 'postgresql':
+            query = query.with_for_update(skip_locked=True)
+        cart_ids = [row[0] for row in session.execute(query)]
+        if not cart_ids:
+            session.rollback()
+            break
+        items_deleted += session.execute(delete(items).where(items.c.cart_id.in_(cart_ids))).rowcount
+        carts_deleted += session.execute(delete(carts).where(carts.c.id.in_(cart_ids))).rowcount
+        session.commit()
+        batches += 1
+        if pause:
+            time.sleep(pause)
+
+    run = {
+        'cutoff': cutoff.isoformat(),
+        'batches': batches,
+        'carts_deleted': carts_deleted,
+        'items_deleted': items_deleted,
+        'seconds': round(time.monotonic() - started, 3),
+    }
+    sweep_metrics.record(run)
+    return run
+
+
+class SweepMetrics:
+    """Totals and the last run of the cart sweeps run by this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._totals = {'runs': 0, 'carts_deleted': 0, 'items_deleted': 0, 'seconds': 0.0}
+            self._last_run = None
+
+    def record(self, run):
+        with self._lock:
+            self._totals['runs'] += 1
+            for key in ('carts_deleted', 'items_deleted', 'seconds'):
+                self._totals[key] += run[key]
+            self._last_run = {**run, 'finished_at': datetime.utcnow().isoformat()}
+
+    def snapshot(self):
+        with self._lock:
+            return {**self._totals, 'seconds': round(self._totals['seconds'], 3), 'last_run': self._last_run}
+
+
+sweep_metrics = SweepMetrics()
+
+
+def sweep_settings(config):
+    """sweep_abandoned_carts arguments from the app config"""
+    return {
+        'ttl': timedelta(days=config.get('CART_TTL_DAYS', DEFAULT_CART_TTL_DAYS)),
+        'batch_size': config.get('CART_SWEEP_BATCH_SIZE', DEFAULT_SWEEP_BATCH_SIZE),
+    }
+
+
+class CartSweeper:
+    """Daemon thread sweeping abandoned carts every interval seconds"""
+
+    def __init__(self, app, interval):
+        self.app = app
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='cart-sweeper', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+    def run_once(self):
+        from models import db
+
+        with self.app.app_context():
+            try:
+                run = sweep_abandoned_carts(db.session, **sweep_settings(self.app.config))
+                if run['carts_deleted']:
+                    self.app.logger.info(f"Swept {run['carts_deleted']} abandoned carts in {run['seconds']}s")
+                return run
+            except Exception as e:
+                db.session.rollback()
+                self.app.logger.error(f"Error sweeping abandoned carts: {str(e)}")
+            finally:
+                db.session.remove()
+
+
+def init_cart_sweeper(app):
+    """Start the in-process sweeper when CART_SWEEP_INTERVAL is set (never under tests)"""
+    interval = app.config.get('CART_SWEEP_INTERVAL') or 0
+    if interval <= 0 or app.testing:
+        return None
+    sweeper = CartSweeper(app, interval)
+    sweeper.start()
+    app.extensions['cart_sweeper'] = sweeper
+    return sweeper
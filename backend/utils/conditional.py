@@ -0,0 +1,111 @@
+import hashlib
+from datetime import timezone
+from functools import wraps
+from flask import current_app, has_request_context, request, make_response
+
+
+def get_catalog_versions(session, scopes):
+    """Read (version, updated_at) for each scope in one primary-key lookup"""
+    from models import CatalogVersion
+
+    rows = session.query(CatalogVersion.name, CatalogVersion.version, CatalogVersion.updated_at) \
+        .filter(CatalogVersion.name.in_(scopes)).all()
+    return {name: (version, updated_at) for name, version, updated_at in rows}
+
+
+# WSGI environ keys for the catalog state a request has read and the validators it answers with
+CATALOG_VERSIONS_KEY = 'wega.catalog_versions'
+CATALOG_ETAG_KEY = 'wega.catalog_etag'
+
+
+def request_catalog_versions(session, scopes):
+    """Catalog versions of scopes as seen by the current request.
+
+    Each scope is read at most once per request (and recorded under
+    CATALOG_VERSIONS_KEY), so the ETag and the response cache key of a
+    request describe the same catalog state.
+    """
+    from models.catalog_version import has_catalog_versions
+
+    known = request.environ.setdefault(CATALOG_VERSIONS_KEY, {})
+    missing = [scope for scope in scopes if scope not in known]
+    if missing:
+        # Reads must keep working on databases that haven't been migrated yet
+        versions = get_catalog_versions(session, missing) if has_catalog_versions(session.connection()) else {}
+        for scope in missing:
+            known[scope] = versions.get(scope, (0, None))
+    return {scope: known[scope] for scope in scopes}
+
+
+def catalog_validators(session, scopes):
+    """ETag value and Last-Modified time for a set of catalog scopes"""
+    versions = request_catalog_versions(session, scopes) if has_request_context() else get_catalog_versions(session, scopes)
+    raw = ';'.join(f'{scope}={versions.get(scope, (0, None))[0]}' for scope in sorted(scopes))
+    etag = hashlib.sha1(raw.encode('utf-8')).hexdigest()[:20]
+    timestamps = [updated_at for _, updated_at in versions.values() if updated_at]
+    last_modified = max(timestamps).replace(microsecond=0, tzinfo=timezone.utc) if timestamps else None
+    return etag, last_modified
+
+
+def not_modified(etag, last_modified):
+    """Whether the request's validators match the current representation"""
+    if request.if_none_match:
+        return etag in request.if_none_match
+    if request.if_modified_since and last_modified:
+        since = request.if_modified_since
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return last_modified <= since
+    return False
+
+
+def conditional_get(scopes, content_coding=None):
+    """Answer GETs with 304 Not Modified when the catalog hasn't changed.
+
+    Validators come from the catalog version counters, so a matching
+    If-None-Match / If-Modified-Since skips the view (and its queries and
+    serialization) entirely. Apply it outside the response cache, which
+    keys entries by the versions read here and stores each entry with the
+    ETag it was built under.
+
+    Views that choose a content coding per request pass content_coding, a
+    callable returning the coding the request will get ('' for identity);
+    each coding then has its own strong ETag and responses vary on
+    Accept-Encoding.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET':
+                return view(*args, **kwargs)
+
+            from models import db
+            try:
+                etag, last_modified = catalog_validators(db.session, scopes)
+            except Exception as e:
+                current_app.logger.warning(f"Catalog versions unavailable: {str(e)}")
+                return view(*args, **kwargs)
+            coding = content_coding() if content_coding else ''
+            if coding:
+                etag = f'{etag}-{coding}'
+
+            if not_modified(etag, last_modified):
+                response = current_app.response_class(status=304)
+            else:
+                request.environ[CATALOG_ETAG_KEY] = etag
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            # A cached body keeps the ETag it was stored with
+            if response.get_etag()[0] is None:
+                response.set_etag(etag)
+            if last_modified:
+                response.last_modified = last_modified
+            if content_coding:
+                response.vary.add('Accept-Encoding')
+            # Let clients and CDNs store the response but always revalidate
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
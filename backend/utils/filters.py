@@ -0,0 +1,68 @@
+from sqlalchemy import select
+from utils.search import apply_search
+
+# Boolean flag filters supported by product listings
+PRODUCT_FLAGS = ('is_featured', 'is_new', 'is_sale')
+
+
+def parse_product_filters(args):
+    """Read the product listing filters from request args"""
+    return {
+        'search': args.get('search', ''),
+        # Handle both single and multiple category/brand parameters
+        'categories': args.getlist('categories[]') or args.getlist('category'),
+        'brands': args.getlist('brands[]') or args.getlist('brand'),
+        'min_price': args.get('min_price', type=float),
+        'max_price': args.get('max_price', type=float),
+        'flags': [flag for flag in PRODUCT_FLAGS if args.get(flag, '').lower() == 'true'],
+    }
+
+
+def price_range_condition(product, filters):
+    """SQL condition for the min/max price filter (None if unbounded)"""
+    conditions = []
+    if filters['min_price'] is not None:
+        conditions.append(product.price >= filters['min_price'])
+    if filters['max_price'] is not None:
+        conditions.append(product.price <= filters['max_price'])
+    if not conditions:
+        return None
+    if len(conditions) == 1:
+        return conditions[0]
+    return conditions[0] & conditions[1]
+
+
+def apply_product_filters(query, session, filters, exclude=(), rank=True):
+    """Apply listing filters to a product query.
+
+    exclude lists filter names to skip ('search', 'categories', 'brands',
+    'price', 'flags'). Category and brand filters use id subqueries rather
+    than joins so callers are free to join those tables themselves.
+    """
+    from models import Product, Category, Brand
+
+    if filters['search'] and 'search' not in exclude:
+        query = apply_search(query, session, Product, filters['search'])
+        if not rank:
+            query = query.order_by(None)
+
+    if filters['categories'] and 'categories' not in exclude:
+        query = query.filter(Product.category_id.in_(
+            select(Category.id).where(Category.name.in_(filters['categories']))
+        ))
+
+    if filters['brands'] and 'brands' not in exclude:
+        query = query.filter(Product.brand_id.in_(
+            select(Brand.id).where(Brand.name.in_(filters['brands']))
+        ))
+
+    if 'price' not in exclude:
+        condition = price_range_condition(Product, filters)
+        if condition is not None:
+            query = query.filter(condition)
+
+    if 'flags' not in exclude:
+        for flag in filters['flags']:
+            query = query.filter(getattr(Product, flag) == True)
+
+    return query
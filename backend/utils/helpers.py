@@ -1,5 +1,6 @@
 import os
 import uuid
+import math
 import datetime
 from decimal import Decimal
 from flask import current_app
@@ -47,6 +48,17 @@ def generate_unique_filename(original_filename):
     else:
         return f"{timestamp}_{unique_id}"
 
+def finite_float(value):
+    """Float of a stored number for a JSON response, None for NaN and Infinity.
+
+    Numeric columns can hold NaN (and Infinity on PostgreSQL), which JSON has
+    no literal for; responses report them like a missing value instead.
+    """
+    if value is None:
+        return None
+    value = float(value)
+    return value if math.isfinite(value) else None
+
 def validate_product_data(data):
     """Validate product data"""
     if not data.get('name'):
@@ -99,9 +111,9 @@ def validate_feature_data(data):
         return False, "Feature description is required"
     return True, None
 
-def paginate(query, page=1, per_page=10):
-    """Paginate a query"""
-    return query.paginate(page=page, per_page=per_page, error_out=False)
+def paginate(query, page=1, per_page=10, count=True):
+    """Paginate a query (pass count=False to skip the total count query)"""
+    return query.paginate(page=page, per_page=per_page, error_out=False, count=count)
 
 def get_base_url():
     """Get the base URL for the application"""
@@ -116,14 +128,17 @@ def get_base_url():
             # No request context, use default
             return 'http://localhost:5000'
 
-def format_image_url(image_url):
+def format_image_url(image_url, base_url=None):
     """Format image URL with proper base URL"""
     if not image_url:
         return None
     
+    if base_url is None and not image_url.startswith('http'):
+        base_url = get_base_url()
+    
     if image_url.startswith('http'):
         return image_url
     elif image_url.startswith('/static/'):
-        return f"{get_base_url()}{image_url}"
+        return f"{base_url}{image_url}"
     else:
-        return f"{get_base_url()}/static/uploads/{image_url}" 
\ No newline at end of file
+        return f"{base_url}/static/uploads/{image_url}" 
\ No newline at end of file
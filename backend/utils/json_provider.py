@@ -0,0 +1,78 @@
+import re
+import json
+import codecs
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+# Exponent marker of an orjson float (1e16 where the stdlib writes 1e+16)
+_EXPONENT = re.compile(rb'e[-0-9]')
+
+
+def _escape_char(char):
+    code = ord(char)
+    if code < 0x10000:
+        return f'\\u{code:04x}'
+    code -= 0x10000
+    return f'\\u{0xd800 | (code >> 10):04x}\\u{0xdc00 | (code & 0x3ff):04x}'
+
+
+def _json_escape(error):
+    """Codec error handler writing non-ASCII characters as json.dumps does"""
+    return ''.join(_escape_char(char) for char in error.object[error.start:error.end]), error.end
+
+
+codecs.register_error('wega_json_escape', _json_escape)
+
+
+def _has_exponent(data):
+    for match in _EXPONENT.finditer(data):
+        if data[match.start() - 1:match.start()].isdigit():
+            return True
+    return False
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON provider that encodes responses with orjson when it is installed.
+
+    Output is byte-for-byte what the default provider produces for the same
+    data (sorted keys, ASCII only, compact separators). Payloads orjson can't
+    reproduce exactly (exponent floats, big integers, non-string keys) and
+    pretty-printed debug output go through the stdlib encoder instead. Other
+    types are converted by the default provider's hook on both paths (dates
+    as HTTP dates, Decimals as strings).
+
+    NaN and Infinity are written as null, which is valid JSON where the
+    stdlib's NaN is not. Responses don't depend on it: stored numbers are
+    converted with utils.helpers.finite_float, which already reports them
+    as None.
+    """
+
+    def dumps(self, obj, **kwargs):
+        if (orjson is not None and self.sort_keys and self.ensure_ascii
+                and kwargs.get('separators') == (',', ':') and set(kwargs) == {'separators'}):
+            encoded = self._orjson_dumps(obj)
+            if encoded is not None:
+                return encoded
+        kwargs.setdefault('default', self.default)
+        kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        return json.dumps(obj, **kwargs)
+
+    def _orjson_dumps(self, obj):
+        try:
+            data = orjson.dumps(obj, default=self.default,
+                                option=orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME)
+        except (TypeError, orjson.JSONEncodeError):
+            return None
+        if _has_exponent(data):
+            return None
+        text = data.decode('utf-8')
+        if not text.isascii():
+            text = text.encode('ascii', 'wega_json_escape').decode('ascii')
+        if '\x7f' in text:
+            text = text.replace('\x7f', '\\u007f')
+        return text
@@ -0,0 +1,94 @@
+import json
+import base64
+import binascii
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from sqlalchemy import and_, or_
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded or does not fit the query"""
+
+
+def encode_cursor(payload):
+    """Encode a cursor payload as an opaque URL-safe string"""
+    raw = json.dumps(payload, separators=(',', ':'), default=str).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, binascii.Error, UnicodeError):
+        raise InvalidCursor('Invalid cursor')
+    if not isinstance(payload, dict):
+        raise InvalidCursor('Invalid cursor')
+    return payload
+
+
+def cursor_value(value):
+    """Convert a sort key value into something JSON can carry"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def parse_cursor_value(value, kind):
+    """Convert a value from a cursor back into the sort column's type"""
+    if value is None:
+        return None
+    try:
+        if kind == 'datetime':
+            return datetime.fromisoformat(value)
+        if kind == 'decimal':
+            return Decimal(str(value))
+        if kind == 'int':
+            return int(value)
+        return str(value)
+    except (ValueError, TypeError, InvalidOperation):
+        raise InvalidCursor('Invalid cursor')
+
+
+def keyset_order(column, id_column, descending=False, nullable=True):
+    """ORDER BY clauses for keyset pagination.
+
+    NULLs always sort as the smallest value so the seek predicate below is
+    the same on every database. Pass nullable=False for NOT NULL columns to
+    get a plain ORDER BY that a (column, id) index can walk in either direction.
+    """
+    if not nullable:
+        return [column.desc(), id_column.desc()] if descending else [column.asc(), id_column.asc()]
+    if descending:
+        return [column.desc().nullslast(), id_column.desc()]
+    return [column.asc().nullsfirst(), id_column.asc()]
+
+
+def keyset_filter(column, id_column, last_value, last_id, descending=False, nullable=True):
+    """Predicate selecting rows strictly after (last_value, last_id)"""
+    if not nullable:
+        if descending:
+            return or_(column < last_value, and_(column == last_value, id_column < last_id))
+        return or_(column > last_value, and_(column == last_value, id_column > last_id))
+
+    if descending:
+        if last_value is None:
+            return and_(column.is_(None), id_column < last_id)
+        return or_(
+            column < last_value,
+            and_(column == last_value, id_column < last_id),
+            column.is_(None)
+        )
+
+    if last_value is None:
+        return or_(
+            column.isnot(None),
+            and_(column.is_(None), id_column > last_id)
+        )
+    return or_(
+        column > last_value,
+        and_(column == last_value, id_column > last_id)
+    )
@@ -0,0 +1,168 @@
+import time
+import threading
+from sqlalchemy import case, event, func, inspect
+from sqlalchemy.orm import Session
+from utils.helpers import finite_float
+
+# Bucket lower edges in KES; the last bucket is open-ended
+DEFAULT_PRICE_EDGES = (0, 1000, 5000, 15000, 30000)
+# max_price reported for the open-ended top bucket of the default edges, as
+# the API always has (custom edges report None)
+DEFAULT_TOP_BUCKET_MAX = 50000
+
+
+def parse_price_edges(value, default=DEFAULT_PRICE_EDGES):
+    """Parse a comma separated list of increasing bucket edges (None if invalid)"""
+    if not value:
+        return tuple(default)
+    try:
+        edges = tuple(int(edge) for edge in value.split(',') if edge.strip())
+    except ValueError:
+        return None
+    if not edges or len(edges) > 20 or any(b <= a for a, b in zip(edges, edges[1:])):
+        return None
+    return edges
+
+
+def bucket_label(lower, upper, currency='KES'):
+    if upper is None:
+        return f'Over {currency} {lower:,}'
+    if lower <= 0:
+        return f'Under {currency} {upper:,}'
+    return f'{currency} {lower:,} - {upper:,}'
+
+
+def price_bucket(price, edges):
+    """CASE expression giving the bucket index of a price (-1 below the first edge)"""
+    return case(
+        (price < edges[0], -1),
+        *[(price < upper, index) for index, upper in enumerate(edges[1:])],
+        else_=len(edges) - 1
+    )
+
+
+def bucket_distribution(edges, counts):
+    """Describe every bucket with its count, given counts by bucket index"""
+    top = DEFAULT_TOP_BUCKET_MAX if tuple(edges) == DEFAULT_PRICE_EDGES else None
+    distribution = []
+    for index, lower in enumerate(edges):
+        upper = edges[index + 1] if index + 1 < len(edges) else None
+        distribution.append({
+            'range': bucket_label(lower, upper),
+            'count': counts.get(index, 0),
+            'min_price': lower,
+            'max_price': upper if upper is not None else top
+        })
+    return distribution
+
+
+def compute_price_stats(session, edges, categories=None, brands=None):
+    """Price summary and histogram in a single grouped query"""
+    from models import Product, Category, Brand
+
+    bucket = price_bucket(Product.price, edges).label('bucket')
+
+    query = session.query(
+        bucket,
+        func.count(Product.id),
+        func.min(Product.price),
+        func.max(Product.price),
+        func.sum(Product.price)
+    ).filter(Product.price.isnot(None))
+
+    if categories:
+        query = query.join(Category, Product.category_id == Category.id).filter(Category.name.in_(categories))
+    if brands:
+        query = query.join(Brand, Product.brand_id == Brand.id).filter(Brand.name.in_(brands))
+
+    rows = query.group_by(bucket).all()
+
+    total = sum(row[1] for row in rows)
+    if not total:
+        return None
+
+    distribution = bucket_distribution(edges, {row[0]: row[1] for row in rows})
+
+    return {
+        'min_price': finite_float(min(row[2] for row in rows)),
+        'max_price': finite_float(max(row[3] for row in rows)),
+        'avg_price': finite_float(float(sum(row[4] for row in rows)) / total),
+        'total_products': total,
+        'distribution': distribution
+    }
+
+
+class PriceStatsCache:
+    """Per-worker memo of computed price stats, keyed by edges and scope.
+
+    Entries belong to one catalog version: a lookup or store under a newer
+    version drops everything memoized before it, so writes made by any
+    process are seen as soon as they bump catalog_versions. Local commits
+    touching a product's price, category or brand also clear it, and
+    entries expire after a TTL.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._version = None
+
+    def _use_version(self, version):
+        if version is not None and version != self._version:
+            self._entries.clear()
+            self._version = version
+
+    def get(self, key, ttl=None, version=None):
+        with self._lock:
+            self._use_version(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            computed_at, value = entry
+            if ttl is not None and time.monotonic() - computed_at > ttl:
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key, value, version=None):
+        with self._lock:
+            self._use_version(version)
+            self._entries[key] = (time.monotonic(), value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+price_stats_cache = PriceStatsCache()
+
+_PRICE_ATTRIBUTES = ('price', 'category_id', 'brand_id')
+
+
+def _collect_price_changes(session, flush_context):
+    from models import Product
+
+    for obj in session.new | session.deleted:
+        if isinstance(obj, Product):
+            session.info['price_stats_stale'] = True
+            return
+    for obj in session.dirty:
+        if isinstance(obj, Product):
+            state = inspect(obj)
+            if any(state.attrs[attr].history.has_changes() for attr in _PRICE_ATTRIBUTES):
+                session.info['price_stats_stale'] = True
+                return
+
+
+def _apply_price_changes(session):
+    if session.info.pop('price_stats_stale', False):
+        price_stats_cache.clear()
+
+
+def _discard_price_changes(session):
+    session.info.pop('price_stats_stale', None)
+
+
+event.listen(Session, 'after_flush', _collect_price_changes)
+event.listen(Session, 'after_commit', _apply_price_changes)
+event.listen(Session, 'after_rollback', _discard_price_changes)
@@ -0,0 +1,242 @@
+import json
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import delete, event, inspect, insert
+from sqlalchemy.orm import Session, joinedload, selectinload, load_only
+from utils.helpers import finite_float, format_image_url, get_base_url
+
+# Stands in for the request-dependent base URL of relative image paths in
+# stored cards; swapped for the real base URL when a response is assembled
+BASE_URL_PLACEHOLDER = '@@WEGA_BASE_URL@@'
+
+
+def _primary_image_url(product, base_url=None):
+    return format_image_url(next((img.image_url for img in product.images if img.is_primary),
+                            product.images[0].image_url if product.images else None), base_url)
+
+
+def _list_images(product, base_url=None):
+    return [{
+        'id': img.id,
+        'product_id': img.product_id,
+        'image_url': format_image_url(img.image_url, base_url),
+        'is_primary': img.is_primary,
+        'display_order': img.display_order
+    } for img in product.images]
+
+
+# Fields of a product list entry: (columns, relationships, serializer)
+PRODUCT_LIST_FIELDS = {
+    'id': ((), (), lambda p, base: p.id),
+    'name': (('name',), (), lambda p, base: p.name),
+    'description': (('description',), (), lambda p, base: p.description),
+    'price': (('price',), (), lambda p, base: finite_float(p.price) if p.price else None),
+    'original_price': (('original_price',), (), lambda p, base: finite_float(p.original_price) if p.original_price else None),
+    'image_url': ((), ('images',), _primary_image_url),
+    'images': ((), ('images',), _list_images),
+    'is_new': (('is_new',), (), lambda p, base: p.is_new),
+    'is_sale': (('is_sale',), (), lambda p, base: p.is_sale),
+    'is_featured': (('is_featured',), (), lambda p, base: p.is_featured),
+    'category': (('category_id',), ('category',), lambda p, base: p.category.name if p.category else None),
+    'brand': (('brand_id',), ('brand',), lambda p, base: p.brand.name if p.brand else None),
+    'rating': (('rating',), (), lambda p, base: finite_float(p.rating) if p.rating else None),
+    'review_count': (('review_count',), (), lambda p, base: p.review_count),
+    'stock': (('stock',), (), lambda p, base: p.stock),
+    'sku': (('sku',), (), lambda p, base: p.sku),
+}
+
+
+def parse_product_fields(value):
+    """Parse a comma separated fields= value (None if it names an unknown field)"""
+    if not value:
+        return list(PRODUCT_LIST_FIELDS)
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    if not fields or any(field not in PRODUCT_LIST_FIELDS for field in fields):
+        return None
+    if 'id' not in fields:
+        fields.insert(0, 'id')
+    return fields
+
+
+def is_full_card(fields):
+    """Whether a field list asks for the whole list entry (and can use stored cards)"""
+    return set(fields) == set(PRODUCT_LIST_FIELDS)
+
+
+def product_list_options(fields, extra_columns=()):
+    """Loader plan for product list entries: only the columns and relationships the fields need.
+
+    Many-to-one lookups are joined; collections use selectinload so a page
+    never multiplies rows. Specifications, features and reviews are never
+    part of a list entry and are not loaded.
+    """
+    from models import Product
+
+    columns = {'id', *extra_columns}
+    relationships = set()
+    for field in fields:
+        field_columns, field_relationships, _ = PRODUCT_LIST_FIELDS[field]
+        columns.update(field_columns)
+        relationships.update(field_relationships)
+
+    options = [load_only(*[getattr(Product, column) for column in sorted(columns)])]
+    if 'category' in relationships:
+        options.append(joinedload(Product.category))
+    if 'brand' in relationships:
+        options.append(joinedload(Product.brand))
+    if 'images' in relationships:
+        options.append(selectinload(Product.images))
+    return options
+
+
+def product_list_dict(product, fields=None, base_url=None):
+    """Serialize a product for list responses"""
+    return {field: PRODUCT_LIST_FIELDS[field][2](product, base_url) for field in (fields or PRODUCT_LIST_FIELDS)}
+
+
+def render_card(product):
+    """Serialize a full list entry the way the JSON provider would"""
+    return json.dumps(product_list_dict(product, base_url=BASE_URL_PLACEHOLDER),
+                      sort_keys=True, ensure_ascii=True, separators=(',', ':'))
+
+
+# Databases known to have the product_cards table, keyed by URL
+_cards_table_present = set()
+
+
+def has_product_cards(connection):
+    """Whether the product_cards table exists (positive answers are cached)"""
+    key = str(connection.engine.url)
+    if key not in _cards_table_present:
+        if not inspect(connection).has_table('product_cards'):
+            return False
+        _cards_table_present.add(key)
+    return True
+
+
+def refresh_product_cards(session, product_ids, batch_size=500):
+    """Regenerate the stored cards for the given products"""
+    from models import Product, ProductCard
+
+    table = ProductCard.__table__
+    product_ids = sorted(set(product_ids))
+    for start in range(0, len(product_ids), batch_size):
+        batch = product_ids[start:start + batch_size]
+        # populate_existing so collections changed earlier in the session are reloaded
+        products = session.query(Product).options(*product_list_options(PRODUCT_LIST_FIELDS)) \
+            .filter(Product.id.in_(batch)).populate_existing().all()
+        now = datetime.utcnow()
+        session.execute(delete(table).where(table.c.product_id.in_(batch)))
+        if products:
+            session.execute(insert(table), [
+                {'product_id': product.id, 'document': render_card(product), 'updated_at': now}
+                for product in products
+            ])
+
+
+def product_card_documents(session, product_ids):
+    """Stored card documents for products, in the given order.
+
+    Products without a stored card (e.g. before a backfill) are rendered
+    on the fly.
+    """
+    from models import Product, ProductCard
+
+    if not product_ids:
+        return []
+    documents = dict(session.query(ProductCard.product_id, ProductCard.document)
+                     .filter(ProductCard.product_id.in_(product_ids)))
+    missing = [product_id for product_id in product_ids if product_id not in documents]
+    if missing:
+        products = session.query(Product).options(*product_list_options(PRODUCT_LIST_FIELDS)) \
+            .filter(Product.id.in_(missing)).all()
+        documents.update({product.id: render_card(product) for product in products})
+    return [documents[product_id] for product_id in product_ids if product_id in documents]
+
+
+def card_list_response(envelope, documents, key='products'):
+    """jsonify an envelope whose list of products is spliced in from stored cards"""
+    from flask import jsonify
+
+    slot = '\x00cards\x00'
+    response = jsonify({**envelope, key: slot})
+    body = response.get_data(as_text=True)
+    body = body.replace(current_app.json.dumps(slot), '[' + ','.join(documents) + ']', 1)
+    if BASE_URL_PLACEHOLDER in body:
+        body = body.replace(BASE_URL_PLACEHOLDER, get_base_url())
+    response.set_data(body)
+    return response
+
+
+def mark_cards_stale(session, product_ids):
+    """Queue products whose cards must be regenerated when the session commits"""
+    session.info.setdefault('stale_product_cards', set()).update(product_ids)
+
+
+# Product columns that appear in a card
+_CARD_ATTRIBUTES = ('name', 'description', 'price', 'original_price', 'is_new', 'is_sale', 'is_featured',
+                    'category_id', 'brand_id', 'rating', 'review_count', 'stock', 'sku')
+
+
+def _collect_card_changes(session, flush_context):
+    from models import Product, ProductImage, Category, Brand
+
+    stale = set()
+    for obj in session.new | session.dirty | session.deleted:
+        if isinstance(obj, Product):
+            if obj in session.deleted:
+                session.info.setdefault('deleted_product_cards', set()).add(obj.id)
+            elif obj in session.new or any(inspect(obj).attrs[attr].history.has_changes() for attr in _CARD_ATTRIBUTES):
+                stale.add(obj.id)
+        elif isinstance(obj, ProductImage):
+            if obj.product_id is not None:
+                stale.add(obj.product_id)
+            # An image moved between products changes both cards
+            stale.update(old for old in inspect(obj).attrs.product_id.history.deleted if old is not None)
+        elif isinstance(obj, (Category, Brand)) and obj in session.dirty:
+            if inspect(obj).attrs.name.history.has_changes():
+                key = 'stale_category_cards' if isinstance(obj, Category) else 'stale_brand_cards'
+                session.info.setdefault(key, set()).add(obj.id)
+    if stale:
+        mark_cards_stale(session, stale)
+
+
+def _refresh_cards_before_commit(session):
+    from models import Product, ProductCard
+
+    keys = ('stale_product_cards', 'stale_category_cards', 'stale_brand_cards', 'deleted_product_cards')
+    # before_commit runs ahead of the final flush; flush now so its changes are seen
+    if session.new or session.dirty or session.deleted:
+        session.flush()
+    if not any(session.info.get(key) for key in keys):
+        return
+    if not has_product_cards(session.connection()):
+        for key in keys:
+            session.info.pop(key, None)
+        return
+
+    # Regenerating can autoflush and queue more work, so drain until stable
+    while any(session.info.get(key) for key in keys):
+        stale = session.info.pop('stale_product_cards', set())
+        categories = session.info.pop('stale_category_cards', set())
+        brands = session.info.pop('stale_brand_cards', set())
+        deleted = session.info.pop('deleted_product_cards', set())
+        if categories:
+            stale.update(row[0] for row in session.query(Product.id).filter(Product.category_id.in_(categories)))
+        if brands:
+            stale.update(row[0] for row in session.query(Product.id).filter(Product.brand_id.in_(brands)))
+        if deleted:
+            table = ProductCard.__table__
+            session.execute(delete(table).where(table.c.product_id.in_(deleted)))
+        if stale - deleted:
+            refresh_product_cards(session, stale - deleted)
+
+
+def _discard_card_changes(session):
+    for key in ('stale_product_cards', 'stale_category_cards', 'stale_brand_cards', 'deleted_product_cards'):
+        session.info.pop(key, None)
+
+
+event.listen(Session, 'after_flush', _collect_card_changes)
+event.listen(Session, 'before_commit', _refresh_cards_before_commit)
+event.listen(Session, 'after_rollback', _discard_card_changes)
@@ -0,0 +1,147 @@
+import csv
+import io
+import zlib
+from flask import current_app, request
+from sqlalchemy.orm import load_only, selectinload
+from utils.filters import apply_product_filters
+from utils.helpers import format_image_url, get_base_url
+from utils.product_import import CSV_LIST_SEPARATOR, CSV_SPEC_SEPARATOR
+
+EXPORT_FORMATS = ('ndjson', 'csv')
+EXPORT_MIMETYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv; charset=utf-8'}
+
+# CSV columns; the layout scripts/import_products.py reads back
+CSV_EXPORT_COLUMNS = ('id', 'sku', 'name', 'description', 'price', 'original_price', 'stock',
+                      'is_new', 'is_sale', 'is_featured', 'category', 'brand', 'rating', 'review_count',
+                      'images', 'specifications', 'features', 'updated_at')
+
+# Bytes of encoded rows gathered before a chunk is written out
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+_EXPORT_COLUMNS = ('id', 'sku', 'name', 'description', 'price', 'original_price', 'stock', 'is_new', 'is_sale',
+                   'is_featured', 'category_id', 'brand_id', 'rating', 'review_count', 'updated_at')
+
+
+def _number(value):
+    return float(value) if value is not None else None
+
+
+def export_row(product, categories, brands, base_url):
+    """A product as one export record"""
+    return {
+        'id': product.id,
+        'sku': product.sku,
+        'name': product.name,
+        'description': product.description,
+        'price': _number(product.price),
+        'original_price': _number(product.original_price),
+        'stock': product.stock,
+        'is_new': product.is_new,
+        'is_sale': product.is_sale,
+        'is_featured': product.is_featured,
+        'category': categories.get(product.category_id),
+        'brand': brands.get(product.brand_id),
+        'rating': _number(product.rating),
+        'review_count': product.review_count,
+        'images': [{
+            'image_url': format_image_url(img.image_url, base_url),
+            'is_primary': img.is_primary,
+            'display_order': img.display_order
+        } for img in product.images],
+        'specifications': [{
+            'name': spec.name,
+            'value': spec.value,
+            'display_order': spec.display_order
+        } for spec in product.specifications],
+        'features': [feature.feature for feature in product.features],
+        'updated_at': product.updated_at.isoformat() if product.updated_at else None,
+    }
+
+
+def iter_export_rows(session, filters=None, batch_size=1000):
+    """Yield export records for every product (matching filters), in id order.
+
+    Products are read through a server-side cursor batch_size rows at a
+    time, with one selectin query per child collection per batch, so
+    memory use doesn't grow with the size of the catalog.
+    """
+    from models import Product, Category, Brand
+
+    categories = dict(session.query(Category.id, Category.name))
+    brands = dict(session.query(Brand.id, Brand.name))
+    base_url = get_base_url()
+
+    query = session.query(Product).options(
+        load_only(*[getattr(Product, column) for column in _EXPORT_COLUMNS]),
+        selectinload(Product.images),
+        selectinload(Product.specifications),
+        selectinload(Product.features)
+    )
+    if filters:
+        query = apply_product_filters(query, session, filters, rank=False)
+    for product in query.order_by(Product.id).yield_per(batch_size):
+        yield export_row(product, categories, brands, base_url)
+
+
+def _csv_cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return value
+
+
+def csv_record(row):
+    """Flatten an export record into CSV cells, joining the multi-valued columns"""
+    record = {column: _csv_cell(row[column]) for column in CSV_EXPORT_COLUMNS}
+    record['images'] = CSV_LIST_SEPARATOR.join(image['image_url'] for image in row['images'])
+    record['specifications'] = CSV_LIST_SEPARATOR.join(
+        f"{spec['name']}{CSV_SPEC_SEPARATOR} {spec['value']}" for spec in row['specifications'])
+    record['features'] = CSV_LIST_SEPARATOR.join(row['features'])
+    return record
+
+
+def encode_ndjson(rows):
+    dumps = current_app.json.dumps
+    for row in rows:
+        yield dumps(row, separators=(',', ':')) + '\n'
+
+
+def encode_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, CSV_EXPORT_COLUMNS)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(csv_record(row))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def export_chunks(rows, fmt, chunk_size=EXPORT_CHUNK_SIZE):
+    """Encode export records as UTF-8 byte chunks of roughly chunk_size bytes"""
+    encoded = encode_csv(rows) if fmt == 'csv' else encode_ndjson(rows)
+    parts, size = [], 0
+    for text in encoded:
+        parts.append(text)
+        size += len(text)
+        if size >= chunk_size:
+            yield ''.join(parts).encode('utf-8')
+            parts, size = [], 0
+    if parts:
+        yield ''.join(parts).encode('utf-8')
+
+
+def export_coding():
+    """Content coding of the current export request: 'gzip' when accepted, else identity ('')"""
+    return 'gzip' if request.accept_encodings['gzip'] else ''
+
+
+def gzip_chunks(chunks, level=6):
+    """Compress a stream of byte chunks into a single gzip member"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
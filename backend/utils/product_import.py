@@ -0,0 +1,338 @@
+import csv
+import codecs
+import json
+from decimal import Decimal
+from flask import current_app
+from sqlalchemy import delete, insert
+from utils.product_cards import mark_cards_stale
+from utils.related_products import has_related_products, queue_related_refresh
+from utils.helpers import validate_product_data, validate_image_data, validate_specification_data, validate_feature_data
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+
+# Separators for the multi-valued CSV columns (images, features, specifications)
+CSV_LIST_SEPARATOR = '|'
+CSV_SPEC_SEPARATOR = ':'
+
+# Product columns an import row may set, and the defaults create_product uses
+PRODUCT_IMPORT_COLUMNS = ('name', 'description', 'price', 'original_price', 'sku', 'stock',
+                          'is_new', 'is_sale', 'is_featured', 'category_id', 'brand_id')
+PRODUCT_IMPORT_DEFAULTS = {'is_new': False, 'is_sale': False, 'is_featured': False}
+
+
+class ImportRowError(ValueError):
+    """A row that can't be imported"""
+
+
+def import_format_for(filename, mimetype=None):
+    """Guess the import format from a file name or content type"""
+    name = (filename or '').lower()
+    if name.endswith('.csv') or mimetype == 'text/csv':
+        return 'csv'
+    if name.endswith(('.jsonl', '.ndjson')) or mimetype in ('application/x-ndjson', 'application/jsonl'):
+        return 'jsonl'
+    return None
+
+
+def csv_row_data(row):
+    """Turn a CSV record into an import row, splitting the multi-valued columns"""
+    data = {}
+    for key, value in row.items():
+        # Extra cells without a header come through under None
+        if key is None or value is None:
+            continue
+        key, value = key.strip(), value.strip()
+        if not value:
+            continue
+        if key in ('images', 'features'):
+            value = [item.strip() for item in value.split(CSV_LIST_SEPARATOR) if item.strip()]
+        elif key == 'specifications':
+            specs = []
+            for item in value.split(CSV_LIST_SEPARATOR):
+                name, _, spec_value = item.partition(CSV_SPEC_SEPARATOR)
+                specs.append({'name': name.strip(), 'value': spec_value.strip()})
+            value = specs
+        data[key] = value
+    return data
+
+
+def iter_import_rows(stream, fmt):
+    """Yield (line number, row, error) from a binary stream, one record at a time"""
+    lines = codecs.iterdecode(stream, 'utf-8-sig')
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, csv_row_data(row), None
+        return
+
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line), None
+        except ValueError as e:
+            yield line_number, None, f'Invalid JSON: {e}'
+
+
+def parse_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'y')
+    return bool(value)
+
+
+def _lookup_id(data, key, names):
+    """Resolve a category/brand given as <key>_id or by name"""
+    if data.get(f'{key}_id') not in (None, ''):
+        return int(data[f'{key}_id'])
+    name = data.get(key)
+    if name in (None, ''):
+        return None
+    if name not in names:
+        raise ImportRowError(f"Unknown {key} '{name}'")
+    return names[name]
+
+
+def normalize_import_row(data, categories, brands):
+    """Validate an import row and split it into product values and child rows.
+
+    Child lists are None when the row doesn't mention them, so an upsert
+    leaves the existing images/specifications/features alone.
+    """
+    if not isinstance(data, dict):
+        raise ImportRowError('Row must be an object')
+
+    is_valid, error_message = validate_product_data(data)
+    if not is_valid:
+        raise ImportRowError(error_message)
+
+    values = {'name': str(data['name']).strip(), 'price': Decimal(str(data['price']))}
+    if data.get('description') is not None:
+        values['description'] = data['description']
+    if data.get('original_price') not in (None, ''):
+        values['original_price'] = Decimal(str(data['original_price']))
+    if data.get('sku') is not None:
+        # Blank SKUs are stored as NULL to avoid UNIQUE constraint issues
+        values['sku'] = str(data['sku']).strip() or None
+    if data.get('stock') not in (None, ''):
+        values['stock'] = int(data['stock'])
+    for flag in ('is_new', 'is_sale', 'is_featured'):
+        if flag in data:
+            values[flag] = parse_bool(data[flag])
+    if 'category_id' in data or 'category' in data:
+        values['category_id'] = _lookup_id(data, 'category', categories)
+    if 'brand_id' in data or 'brand' in data:
+        values['brand_id'] = _lookup_id(data, 'brand', brands)
+
+    images = None
+    if data.get('images') is not None:
+        images = []
+        for i, image_data in enumerate(data['images']):
+            if isinstance(image_data, str):
+                image_data = {'image_url': image_data}
+            is_valid, error_message = validate_image_data(image_data)
+            if not is_valid:
+                raise ImportRowError(error_message)
+            # Enforce Cloudinary URL
+            if not image_data['image_url'].startswith('https://res.cloudinary.com/'):
+                raise ImportRowError('All product images must be uploaded to Cloudinary.')
+            images.append({
+                'image_url': image_data['image_url'],
+                'is_primary': parse_bool(image_data.get('is_primary', i == 0)),
+                'display_order': int(image_data.get('display_order', i))
+            })
+
+    specifications = None
+    if data.get('specifications') is not None:
+        specifications = []
+        for i, spec_data in enumerate(data['specifications']):
+            is_valid, error_message = validate_specification_data(spec_data)
+            if not is_valid:
+                raise ImportRowError(error_message)
+            specifications.append({
+                'name': spec_data['name'],
+                'value': spec_data['value'],
+                'display_order': int(spec_data.get('display_order', i))
+            })
+
+    features = None
+    if data.get('features') is not None:
+        features = []
+        for i, feature_data in enumerate(data['features']):
+            if isinstance(feature_data, str):
+                feature_data = {'feature': feature_data}
+            is_valid, error_message = validate_feature_data(feature_data)
+            if not is_valid:
+                raise ImportRowError(error_message)
+            features.append({
+                'feature': feature_data['feature'],
+                'display_order': int(feature_data.get('display_order', i))
+            })
+
+    return {'values': values, 'images': images, 'specifications': specifications, 'features': features}
+
+
+class ProductImporter:
+    """Batched product import that upserts by SKU.
+
+    Rows are validated one at a time and written per batch: one query to
+    find existing SKUs, one bulk INSERT and one bulk UPDATE for products,
+    and a DELETE plus multi-row INSERT for each child table. Each batch
+    commits on its own; a batch that fails is rolled back and its rows
+    reported as errors while the import carries on.
+    """
+
+    def __init__(self, session, upsert=True, batch_size=1000, max_errors=1000):
+        self.session = session
+        self.upsert = upsert
+        self.batch_size = max(1, batch_size)
+        self.max_errors = max_errors
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+        self._batch = []
+        self._batch_skus = set()
+        self._categories = None
+        self._brands = None
+        self._written = set()
+
+    def run(self, rows):
+        """Import (line number, row, error) tuples and return the summary"""
+        from models import Category, Brand
+
+        self._categories = {name: id for id, name in self.session.query(Category.id, Category.name)}
+        self._brands = {name: id for id, name in self.session.query(Brand.id, Brand.name)}
+
+        for line_number, data, error in rows:
+            self.add(line_number, data, error)
+        self.flush()
+
+        if self._written:
+            self._update_related()
+            self._invalidate_caches()
+        return self.summary()
+
+    def add(self, line_number, data, error=None):
+        row = None
+        if error is None:
+            try:
+                row = normalize_import_row(data, self._categories, self._brands)
+            except (ValueError, TypeError, ArithmeticError) as e:
+                error = str(e) or 'Invalid value'
+        if error:
+            self.record_error(line_number, data, error)
+            return
+
+        # A SKU repeated within a batch would collide; write what we have first
+        sku = row['values'].get('sku')
+        if sku and sku in self._batch_skus:
+            self.flush()
+        if sku:
+            self._batch_skus.add(sku)
+        self._batch.append((line_number, row))
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def record_error(self, line_number, data, message):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            sku = data.get('sku') if isinstance(data, dict) else None
+            self.errors.append({'line': line_number, 'sku': sku, 'error': message})
+
+    def flush(self):
+        """Write the pending batch"""
+        from models import Product
+        from models.catalog_version import touch_catalog
+
+        batch, self._batch, self._batch_skus = self._batch, [], set()
+        if not batch:
+            return
+
+        skus = [row['values']['sku'] for _, row in batch if row['values'].get('sku')]
+        existing = dict(self.session.query(Product.sku, Product.id).filter(Product.sku.in_(skus))) if skus else {}
+
+        inserts, updates = [], []
+        for line_number, row in batch:
+            product_id = existing.get(row['values'].get('sku'))
+            if product_id is None:
+                inserts.append((line_number, row))
+            elif self.upsert:
+                row['id'] = product_id
+                updates.append((line_number, row))
+            else:
+                self.record_error(line_number, row['values'], 'SKU already exists')
+
+        try:
+            if inserts:
+                # Uniform keys let the whole batch go out as one executemany
+                mappings = [
+                    {**dict.fromkeys(PRODUCT_IMPORT_COLUMNS), **PRODUCT_IMPORT_DEFAULTS, **row['values']}
+                    for _, row in inserts
+                ]
+                self.session.bulk_insert_mappings(Product, mappings, return_defaults=True)
+                for (_, row), mapping in zip(inserts, mappings):
+                    row['id'] = mapping['id']
+            if updates:
+                self.session.bulk_update_mappings(Product, [{'id': row['id'], **row['values']} for _, row in updates])
+
+            self._write_children([row for _, row in inserts], [row for _, row in updates])
+            mark_cards_stale(self.session, [row['id'] for _, row in inserts + updates])
+
+            touch_catalog(self.session, 'products')
+            self.session.commit()
+        except Exception as e:
+            self.session.rollback()
+            for line_number, row in inserts + updates:
+                self.record_error(line_number, row['values'], f'Batch failed: {e}')
+            return
+
+        self.created += len(inserts)
+        self.updated += len(updates)
+        self._written.update(row['id'] for _, row in inserts + updates)
+
+    def _write_children(self, inserted, updated):
+        from models import ProductImage, ProductSpecification, ProductFeature
+
+        for key, model in (('images', ProductImage), ('specifications', ProductSpecification), ('features', ProductFeature)):
+            # Updated products get their children replaced only when the row lists them
+            replaced = [row['id'] for row in updated if row[key] is not None]
+            if replaced:
+                self.session.execute(delete(model.__table__).where(model.__table__.c.product_id.in_(replaced)))
+            children = [
+                {'product_id': row['id'], **child}
+                for row in inserted + updated if row[key]
+                for child in row[key]
+            ]
+            if children:
+                self.session.execute(insert(model.__table__), children)
+
+    def _update_related(self):
+        # Queued once for the whole import; large imports are picked up by one full rebuild
+        if not has_related_products(self.session.connection()):
+            return
+        try:
+            queue_related_refresh(self.session, self._written)
+            self.session.commit()
+        except Exception as e:
+            # The products are already committed; scripts/rebuild_related_products.py can catch up
+            self.session.rollback()
+            current_app.logger.warning(f"Failed to queue related products after import: {str(e)}")
+
+    def _invalidate_caches(self):
+        # Bulk writes bypass the session events that normally keep these current
+        from utils.cache import response_cache
+        from utils.suggestions import suggestion_index
+        from utils.price_stats import price_stats_cache
+
+        response_cache.invalidate('products')
+        suggestion_index.invalidate()
+        price_stats_cache.clear()
+
+    def summary(self):
+        return {
+            'created': self.created,
+            'updated': self.updated,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors)
+        }
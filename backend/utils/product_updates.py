@@ -0,0 +1,178 @@
+from decimal import Decimal, InvalidOperation
+from sqlalchemy import Boolean, Integer, Numeric, bindparam, cast, column, update, values
+from utils.product_cards import mark_cards_stale
+from utils.related_products import mark_related_stale
+
+# Fields a bulk patch may set, and the SQL type used to read them from VALUES
+BULK_PATCH_FIELDS = {
+    'price': Numeric(10, 2),
+    'original_price': Numeric(10, 2),
+    'stock': Integer(),
+    'is_sale': Boolean(),
+}
+
+
+def parse_product_patch(item):
+    """Validate one bulk patch entry, returning the field values it sets"""
+    if not isinstance(item, dict):
+        raise ValueError('Each entry must be an object')
+    if item.get('id') is None and not item.get('sku'):
+        raise ValueError('id or sku is required')
+    if item.get('id') is not None and (isinstance(item['id'], bool) or not isinstance(item['id'], int)):
+        raise ValueError('id must be an integer')
+    unknown = set(item) - set(BULK_PATCH_FIELDS) - {'id', 'sku'}
+    if unknown:
+        raise ValueError(f"Unsupported fields: {', '.join(sorted(unknown))}")
+
+    changes = {}
+    try:
+        if 'price' in item:
+            if item['price'] in (None, ''):
+                raise ValueError('Product price is required')
+            changes['price'] = Decimal(str(item['price']))
+            if changes['price'] < 0:
+                raise ValueError('Price cannot be negative')
+        if 'original_price' in item:
+            changes['original_price'] = Decimal(str(item['original_price'])) if item['original_price'] not in (None, '') else None
+            if changes['original_price'] is not None and changes['original_price'] < 0:
+                raise ValueError('Original price cannot be negative')
+    except (InvalidOperation, TypeError):
+        raise ValueError('Invalid price format')
+    if 'stock' in item:
+        if isinstance(item['stock'], bool) or not isinstance(item['stock'], int) or item['stock'] < 0:
+            raise ValueError('Stock must be a non-negative integer')
+        changes['stock'] = item['stock']
+    if 'is_sale' in item:
+        if not isinstance(item['is_sale'], bool):
+            raise ValueError('is_sale must be a boolean')
+        changes['is_sale'] = item['is_sale']
+
+    if not changes:
+        raise ValueError(f"Nothing to update. Allowed fields: {', '.join(BULK_PATCH_FIELDS)}")
+    return changes
+
+
+def apply_product_patches(session, patches):
+    """Apply {product_id: changes} with one UPDATE per distinct set of fields.
+
+    On PostgreSQL each group is a single UPDATE ... FROM (VALUES ...);
+    other databases get one executemany UPDATE per group. Runs on the
+    session's connection, so the caller's commit covers every group.
+    Product cards are regenerated at commit; related lists of repriced
+    products are only queued, for the background refresh.
+    """
+    from models import Product
+
+    table = Product.__table__
+    groups = {}
+    for product_id, changes in patches.items():
+        groups.setdefault(tuple(sorted(changes)), []).append((product_id, changes))
+
+    for fields, rows in groups.items():
+        if session.get_bind().dialect.name == 'postgresql':
+            patch = values(
+                column('id', Integer()), *[column(field, BULK_PATCH_FIELDS[field]) for field in fields],
+                name='patch'
+            ).data([(product_id, *[changes[field] for field in fields]) for product_id, changes in rows])
+            # Casts keep NULLs in VALUES from being typed as text
+            session.execute(
+                update(table).where(table.c.id == patch.c.id)
+                .values({field: cast(patch.c[field], BULK_PATCH_FIELDS[field]) for field in fields})
+            )
+        else:
+            session.execute(
+                update(table).where(table.c.id == bindparam('patch_id'))
+                .values({field: bindparam(f'patch_{field}') for field in fields}),
+                [{'patch_id': product_id, **{f'patch_{field}': changes[field] for field in fields}}
+                 for product_id, changes in rows]
+            )
+    mark_cards_stale(session, patches)
+    # Queued at commit, not refreshed here: a large repricing is left to the background refresh
+    mark_related_stale(session, [product_id for product_id, changes in patches.items() if 'price' in changes])
+
+
+def parse_product_children(data):
+    """Validate the images/specifications/features lists in a product payload.
+
+    Returns {key: [values, ...]} for each list present in the payload.
+    Entries may carry the id of an existing row so edits can be matched
+    to it; raises ValueError with the first validation message.
+    """
+    from utils.helpers import validate_image_data, validate_specification_data, validate_feature_data
+
+    children = {}
+    if isinstance(data.get('images'), list):
+        children['images'] = []
+        for i, image_data in enumerate(data['images']):
+            is_valid, error_message = validate_image_data(image_data)
+            if not is_valid:
+                raise ValueError(error_message)
+            # Enforce Cloudinary URL
+            if not image_data['image_url'].startswith('https://res.cloudinary.com/'):
+                raise ValueError('All product images must be uploaded to Cloudinary.')
+            children['images'].append({
+                'id': image_data.get('id'),
+                'image_url': image_data['image_url'],
+                'is_primary': image_data.get('is_primary', i == 0),
+                'display_order': image_data.get('display_order', i)
+            })
+
+    if isinstance(data.get('specifications'), list):
+        children['specifications'] = []
+        for i, spec_data in enumerate(data['specifications']):
+            is_valid, error_message = validate_specification_data(spec_data)
+            if not is_valid:
+                raise ValueError(error_message)
+            children['specifications'].append({
+                'id': spec_data.get('id'),
+                'name': spec_data['name'],
+                'value': spec_data['value'],
+                'display_order': spec_data.get('display_order', i)
+            })
+
+    if isinstance(data.get('features'), list):
+        children['features'] = []
+        for i, feature_data in enumerate(data['features']):
+            is_valid, error_message = validate_feature_data(feature_data)
+            if not is_valid:
+                raise ValueError(error_message)
+            children['features'].append({
+                'id': feature_data.get('id'),
+                'feature': feature_data['feature'],
+                'display_order': feature_data.get('display_order', i)
+            })
+
+    return children
+
+
+def sync_children(session, model, existing, incoming, key, product_id):
+    """Make a product's child rows match incoming values with the fewest writes.
+
+    Incoming entries are matched to existing rows by id, then by their
+    natural key (image URL, spec name, feature text). Matched rows are
+    updated in place and only when a value differs; the rest are inserted
+    or deleted. Returns (inserted, updated, deleted) counts.
+    """
+    remaining = {row.id: row for row in existing}
+    matched = [remaining.pop(item['id'], None) if item.get('id') is not None else None for item in incoming]
+    for index, item in enumerate(incoming):
+        if matched[index] is None:
+            row = next((row for row in remaining.values() if getattr(row, key) == item[key]), None)
+            if row is not None:
+                matched[index] = remaining.pop(row.id)
+
+    inserted = updated = 0
+    for row, item in zip(matched, incoming):
+        fields = {name: value for name, value in item.items() if name != 'id'}
+        if row is None:
+            session.add(model(product_id=product_id, **fields))
+            inserted += 1
+            continue
+        changed = {name: value for name, value in fields.items() if getattr(row, name) != value}
+        for name, value in changed.items():
+            setattr(row, name, value)
+        updated += bool(changed)
+
+    for row in remaining.values():
+        session.delete(row)
+    return inserted, updated, len(remaining)
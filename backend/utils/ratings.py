@@ -0,0 +1,93 @@
+from sqlalchemy import case, func, update
+from utils.product_cards import mark_cards_stale
+
+# Star levels tracked in the per-product histogram
+RATING_LEVELS = (1, 2, 3, 4, 5)
+
+
+def rating_level_column(product, level):
+    return getattr(product, f'rating_{level}')
+
+
+def apply_rating_change(session, product_id, added=None, removed=None):
+    """Fold one review write into a product's rating aggregates.
+
+    added/removed are the star ratings entering and leaving the product
+    (an edited review passes both). The change is a single UPDATE of
+    counters relative to their current values, issued on the session's
+    connection so it commits or rolls back with the review itself and
+    concurrent writers can't lose each other's updates.
+    """
+    from models import Product
+
+    sum_delta = (added or 0) - (removed or 0)
+    count_delta = (added is not None) - (removed is not None)
+    new_sum = func.coalesce(Product.rating_sum, 0) + sum_delta
+    new_count = func.coalesce(Product.review_count, 0) + count_delta
+
+    values = {
+        'rating_sum': new_sum,
+        'review_count': new_count,
+        'rating': case((new_count > 0, func.round(new_sum * 1.0 / new_count, 2)), else_=None),
+    }
+    for level in RATING_LEVELS:
+        delta = (added == level) - (removed == level)
+        if delta:
+            column = rating_level_column(Product, level)
+            values[column.key] = func.coalesce(column, 0) + delta
+
+    session.execute(
+        update(Product).where(Product.id == product_id).values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    mark_cards_stale(session, [product_id])
+
+
+def aggregate_values(counts):
+    """Column values for a product given its review counts by star rating"""
+    total = sum(counts.values())
+    rating_sum = sum(level * count for level, count in counts.items())
+    values = {
+        'rating_sum': rating_sum,
+        'review_count': total,
+        'rating': round(rating_sum / total, 2) if total else None,
+    }
+    for level in RATING_LEVELS:
+        values[f'rating_{level}'] = counts.get(level, 0)
+    return values
+
+
+def recompute_rating_aggregates(session, product_ids=None, batch_size=500):
+    """Rebuild rating aggregates from the reviews table, one batch of products at a time.
+
+    Returns the number of products updated. Used for backfills and to
+    repair drift; request handlers maintain the aggregates incrementally.
+    """
+    from models import Product, Review
+    from models.catalog_version import touch_catalog
+
+    if product_ids is None:
+        product_ids = [row[0] for row in session.query(Product.id).order_by(Product.id)]
+    else:
+        product_ids = sorted(set(product_ids))
+
+    updated = 0
+    for start in range(0, len(product_ids), batch_size):
+        batch = product_ids[start:start + batch_size]
+        counts = {product_id: {} for product_id in batch}
+        rows = session.query(Review.product_id, Review.rating, func.count(Review.id)) \
+            .filter(Review.product_id.in_(batch)) \
+            .group_by(Review.product_id, Review.rating).all()
+        for product_id, rating, count in rows:
+            counts[product_id][rating] = count
+
+        session.bulk_update_mappings(Product, [
+            {'id': product_id, **aggregate_values(product_counts)}
+            for product_id, product_counts in counts.items()
+        ])
+        mark_cards_stale(session, batch)
+        # Bulk updates bypass the session events, so bump the catalog version here
+        touch_catalog(session, 'products')
+        session.commit()
+        updated += len(batch)
+    return updated
@@ -0,0 +1,363 @@
+import bisect
+import heapq
+import threading
+from collections import namedtuple
+from datetime import datetime
+from flask import current_app, has_app_context
+from sqlalchemy import bindparam, delete, event, func, inspect, insert, or_, select
+from sqlalchemy.orm import Session
+
+# How much each kind of similarity adds to a related product's score
+RELATED_WEIGHTS = {
+    'category': 3.0,     # same category
+    'brand': 2.0,        # same brand
+    'price': 2.0,        # scaled by how close the prices are
+    'spec_names': 1.0,   # scaled by the overlap of specification names
+    'spec_values': 2.0,  # scaled by the overlap of specification name/value pairs
+}
+
+DEFAULT_RELATED_LIMIT = 12
+
+# Candidates scored per bucket on each side of a product's price, as a multiple of the limit
+CANDIDATE_WINDOW = 2
+
+# A refresh queue longer than this is cleared with one full rebuild instead
+REBUILD_THRESHOLD = 500
+
+# Queued products refreshed per transaction by the background refresh
+REFRESH_BATCH_SIZE = 100
+
+# Product columns whose changes can reorder related lists
+_RELATED_ATTRIBUTES = ('category_id', 'brand_id', 'price')
+
+ProductProfile = namedtuple('ProductProfile', 'id category_id brand_id price spec_names spec_pairs')
+
+
+def _spec_key(text):
+    return (text or '').strip().lower()
+
+
+def load_profiles(session, product_ids=None):
+    """Similarity inputs for products (all of them when product_ids is None)"""
+    from models import Product, ProductSpecification
+
+    products = session.query(Product.id, Product.category_id, Product.brand_id, Product.price)
+    specs = session.query(ProductSpecification.product_id, ProductSpecification.name, ProductSpecification.value)
+    if product_ids is not None:
+        if not product_ids:
+            return {}
+        products = products.filter(Product.id.in_(product_ids))
+        specs = specs.filter(ProductSpecification.product_id.in_(product_ids))
+
+    pairs = {}
+    for product_id, name, value in specs:
+        pairs.setdefault(product_id, set()).add((_spec_key(name), _spec_key(value)))
+    return {
+        product_id: ProductProfile(
+            product_id, category_id, brand_id, float(price) if price is not None else None,
+            frozenset(name for name, _ in pairs.get(product_id, ())), frozenset(pairs.get(product_id, ()))
+        )
+        for product_id, category_id, brand_id, price in products
+    }
+
+
+def _overlap(a, b):
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared) if shared else 0.0
+
+
+def similarity(a, b):
+    """Score how alike two products are"""
+    score = 0.0
+    if a.category_id is not None and a.category_id == b.category_id:
+        score += RELATED_WEIGHTS['category']
+    if a.brand_id is not None and a.brand_id == b.brand_id:
+        score += RELATED_WEIGHTS['brand']
+    if a.price and b.price:
+        # 1 - |a - b| / max(a, b), i.e. the ratio of the lower price to the higher
+        score += RELATED_WEIGHTS['price'] * (a.price / b.price if a.price < b.price else b.price / a.price)
+    if a.spec_pairs and b.spec_pairs:
+        score += RELATED_WEIGHTS['spec_names'] * _overlap(a.spec_names, b.spec_names)
+        score += RELATED_WEIGHTS['spec_values'] * _overlap(a.spec_pairs, b.spec_pairs)
+    return score
+
+
+class _ProfileIndex:
+    """Profiles bucketed by category, brand and both, each bucket sorted by price"""
+
+    def __init__(self, profiles, window):
+        self.profiles = profiles
+        self.window = window
+        buckets = {}
+        for profile in profiles.values():
+            for key in self._keys(profile):
+                buckets.setdefault(key, []).append((profile.price or 0.0, profile.id))
+        self.buckets = {}
+        for key, entries in buckets.items():
+            entries.sort()
+            self.buckets[key] = ([price for price, _ in entries], [product_id for _, product_id in entries])
+
+    @staticmethod
+    def _keys(profile):
+        if profile.category_id is not None:
+            yield ('category', profile.category_id)
+        if profile.brand_id is not None:
+            yield ('brand', profile.brand_id)
+        if profile.category_id is not None and profile.brand_id is not None:
+            yield ('category_brand', profile.category_id, profile.brand_id)
+
+    def related(self, profile, limit):
+        """Top (related id, score) pairs for a product.
+
+        Only products sharing its category or brand qualify, and of those
+        only the ones nearest in price within each bucket are scored.
+        """
+        candidates = set()
+        price = profile.price or 0.0
+        for key in self._keys(profile):
+            prices, product_ids = self.buckets.get(key, ((), ()))
+            at = bisect.bisect_left(prices, price)
+            candidates.update(product_ids[max(0, at - self.window):at + self.window])
+        candidates.discard(profile.id)
+        # Ties go to the older (lower id) product so lists are stable
+        best = heapq.nlargest(limit, [(similarity(profile, self.profiles[candidate]), -candidate) for candidate in candidates])
+        return [(-candidate, round(score, 4)) for score, candidate in best]
+
+
+def _candidate_profiles(session, targets):
+    """Profiles of the targets and of every product sharing a category or brand with them"""
+    from models import Product
+
+    categories = {profile.category_id for profile in targets.values() if profile.category_id is not None}
+    brands = {profile.brand_id for profile in targets.values() if profile.brand_id is not None}
+    conditions = []
+    if categories:
+        conditions.append(Product.category_id.in_(categories))
+    if brands:
+        conditions.append(Product.brand_id.in_(brands))
+    if not conditions:
+        return dict(targets)
+    candidate_ids = {row[0] for row in session.query(Product.id).filter(or_(*conditions))} - set(targets)
+    return {**load_profiles(session, candidate_ids), **targets}
+
+
+def _write_related(session, lists):
+    from models import RelatedProduct
+
+    table = RelatedProduct.__table__
+    product_ids = list(lists)
+    for start in range(0, len(product_ids), 500):
+        session.execute(delete(table).where(table.c.product_id.in_(product_ids[start:start + 500])))
+    rows = [
+        {'product_id': product_id, 'rank': rank, 'related_id': related_id, 'score': score}
+        for product_id, related in lists.items()
+        for rank, (related_id, score) in enumerate(related, 1)
+    ]
+    if rows:
+        session.execute(insert(table), rows)
+
+
+def rebuild_related_products(session, limit=DEFAULT_RELATED_LIMIT):
+    """Recompute every product's related list; returns the number of products"""
+    from models import RelatedProduct
+
+    index = _ProfileIndex(load_profiles(session), limit * CANDIDATE_WINDOW)
+    session.execute(delete(RelatedProduct.__table__))
+    _write_related(session, {product_id: index.related(profile, limit) for product_id, profile in index.profiles.items()})
+    return len(index.profiles)
+
+
+def refresh_related_products(session, product_ids, limit=DEFAULT_RELATED_LIMIT):
+    """Recompute the related lists touched by changes to the given products.
+
+    That is the changed products' own lists, the lists that showed them,
+    and the lists of the products they are now related to. Lists further
+    away are left for the next full rebuild.
+    """
+    from models import RelatedProduct
+
+    product_ids = set(product_ids)
+    if not product_ids:
+        return
+    table = RelatedProduct.__table__
+    previous = {row[0] for row in session.query(RelatedProduct.product_id).filter(RelatedProduct.related_id.in_(product_ids))}
+
+    targets = load_profiles(session, product_ids)
+    # Deleted products drop out of every list (databases without cascading deletes keep their rows otherwise)
+    gone = product_ids - set(targets)
+    if gone:
+        session.execute(delete(table).where(or_(table.c.product_id.in_(gone), table.c.related_id.in_(gone))))
+
+    index = _ProfileIndex(_candidate_profiles(session, targets), limit * CANDIDATE_WINDOW)
+    lists = {product_id: index.related(profile, limit) for product_id, profile in targets.items()}
+    neighbours = (previous | {related_id for related in lists.values() for related_id, _ in related}) - product_ids
+    if neighbours:
+        neighbour_profiles = load_profiles(session, neighbours)
+        index = _ProfileIndex(_candidate_profiles(session, neighbour_profiles), limit * CANDIDATE_WINDOW)
+        lists.update({product_id: index.related(profile, limit) for product_id, profile in neighbour_profiles.items()})
+    _write_related(session, lists)
+
+
+def related_limit():
+    """Related products stored per product"""
+    if has_app_context():
+        return current_app.config.get('RELATED_PRODUCTS_LIMIT', DEFAULT_RELATED_LIMIT)
+    return DEFAULT_RELATED_LIMIT
+
+
+def mark_related_stale(session, product_ids):
+    """Queue products whose related lists must be refreshed once the session commits"""
+    session.info.setdefault('stale_related_products', set()).update(product_ids)
+
+
+def queue_related_refresh(session, product_ids):
+    """Add products to the refresh queue (re-marking ones already queued)"""
+    from models import StaleRelatedProduct
+
+    table = StaleRelatedProduct.__table__
+    product_ids = sorted(product_ids)
+    now = datetime.utcnow()
+    for start in range(0, len(product_ids), 500):
+        batch = product_ids[start:start + 500]
+        session.execute(delete(table).where(table.c.product_id.in_(batch)))
+        session.execute(insert(table), [{'product_id': product_id, 'marked_at': now} for product_id in batch])
+
+
+def refresh_stale_related_products(session, limit=DEFAULT_RELATED_LIMIT, batch_size=REFRESH_BATCH_SIZE, max_batches=None):
+    """Refresh the lists around queued products; returns the number of products refreshed.
+
+    Works through batch_size queued products per transaction. A queue
+    longer than REBUILD_THRESHOLD is cleared with one full rebuild
+    instead. Products queued again while they were being refreshed stay
+    queued for the next batch. Each transaction bumps the products catalog
+    version, so cached related lists and their ETags move on with it.
+    """
+    from models import StaleRelatedProduct
+    from models.catalog_version import touch_catalog
+
+    table = StaleRelatedProduct.__table__
+    started = datetime.utcnow()
+    if session.execute(select(func.count()).select_from(table)).scalar() > REBUILD_THRESHOLD:
+        count = rebuild_related_products(session, limit)
+        session.execute(delete(table).where(table.c.marked_at <= started))
+        touch_catalog(session, 'products')
+        session.commit()
+        return count
+
+    refreshed = batches = 0
+    while max_batches is None or batches < max_batches:
+        rows = session.execute(
+            select(table.c.product_id, table.c.marked_at).order_by(table.c.marked_at, table.c.product_id).limit(batch_size)
+        ).all()
+        if not rows:
+            session.rollback()
+            break
+        refresh_related_products(session, [product_id for product_id, _ in rows], limit)
+        session.execute(
+            delete(table).where(table.c.product_id == bindparam('stale_id'), table.c.marked_at == bindparam('stale_marked_at')),
+            [{'stale_id': product_id, 'stale_marked_at': marked_at} for product_id, marked_at in rows]
+        )
+        touch_catalog(session, 'products')
+        session.commit()
+        refreshed += len(rows)
+        batches += 1
+    return refreshed
+
+
+# Databases known to have the related-products tables, keyed by URL
+_related_table_present = set()
+
+
+def has_related_products(connection):
+    """Whether the related_products table and its refresh queue exist (positive answers are cached)"""
+    key = str(connection.engine.url)
+    if key not in _related_table_present:
+        tables = inspect(connection)
+        if not (tables.has_table('related_products') and tables.has_table('stale_related_products')):
+            return False
+        _related_table_present.add(key)
+    return True
+
+
+def _collect_related_changes(session, flush_context):
+    from models import Product, ProductSpecification
+
+    stale = set()
+    for obj in session.new | session.dirty | session.deleted:
+        if isinstance(obj, Product):
+            if obj in session.new or obj in session.deleted or \
+                    any(inspect(obj).attrs[attr].history.has_changes() for attr in _RELATED_ATTRIBUTES):
+                stale.add(obj.id)
+        elif isinstance(obj, ProductSpecification):
+            if obj.product_id is not None:
+                stale.add(obj.product_id)
+            stale.update(old for old in inspect(obj).attrs.product_id.history.deleted if old is not None)
+    if stale:
+        mark_related_stale(session, stale)
+
+
+def _queue_related_before_commit(session):
+    # before_commit runs ahead of the final flush; flush now so its changes are seen
+    if session.new or session.dirty or session.deleted:
+        session.flush()
+    stale = session.info.pop('stale_related_products', None)
+    if not stale or not has_related_products(session.connection()):
+        return
+    # Only queue here: the lists are refreshed outside the request (RelatedProductsRefresher)
+    queue_related_refresh(session, stale)
+
+
+def _discard_related_changes(session):
+    session.info.pop('stale_related_products', None)
+
+
+event.listen(Session, 'after_flush', _collect_related_changes)
+event.listen(Session, 'before_commit', _queue_related_before_commit)
+event.listen(Session, 'after_rollback', _discard_related_changes)
+
+
+class RelatedProductsRefresher:
+    """Daemon thread refreshing queued related-product lists every interval seconds"""
+
+    def __init__(self, app, interval):
+        self.app = app
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='related-products-refresher', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+    def run_once(self):
+        from models import db
+
+        with self.app.app_context():
+            try:
+                if has_related_products(db.session.connection()):
+                    return refresh_stale_related_products(db.session, limit=related_limit())
+            except Exception as e:
+                db.session.rollback()
+                self.app.logger.error(f"Error refreshing related products: {str(e)}")
+            finally:
+                db.session.remove()
+
+
+def init_related_refresher(app):
+    """Start the in-process refresh when RELATED_REFRESH_INTERVAL is set (never under tests)"""
+    interval = app.config.get('RELATED_REFRESH_INTERVAL') or 0
+    if interval <= 0 or app.testing:
+        return None
+    refresher = RelatedProductsRefresher(app, interval)
+    refresher.start()
+    app.extensions['related_refresher'] = refresher
+    return refresher
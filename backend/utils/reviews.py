@@ -0,0 +1,109 @@
+from flask import current_app, has_app_context
+from utils.helpers import finite_float
+from utils.pagination import InvalidCursor, encode_cursor, decode_cursor, cursor_value, parse_cursor_value, keyset_order, keyset_filter
+from utils.ratings import RATING_LEVELS
+
+# Sortable review columns and how their cursor values are typed
+REVIEW_SORTS = {
+    'date': ('date', 'datetime'),
+    'helpful': ('helpful_count', 'int'),
+    'rating': ('rating', 'int'),
+    'user': ('user', 'str'),
+}
+
+# Shorthand sorts: sort_by=newest is the newest reviews first
+REVIEW_SORT_ALIASES = {
+    'newest': ('date', 'desc'),
+}
+
+DEFAULT_REVIEWS_PREVIEW_SIZE = 5
+
+
+def resolve_review_sort(sort_by, sort_order):
+    """Normalise sort_by/sort_order to a (REVIEW_SORTS key, 'asc' or 'desc') pair"""
+    if sort_by in REVIEW_SORT_ALIASES:
+        return REVIEW_SORT_ALIASES[sort_by]
+    if sort_by not in REVIEW_SORTS:
+        sort_by = 'date'
+    return sort_by, 'asc' if sort_order == 'asc' else 'desc'
+
+
+def parse_rating_filter(value):
+    """Parse a comma separated rating= value into star levels (raises ValueError)"""
+    if not value:
+        return ()
+    try:
+        levels = {int(part) for part in value.split(',') if part.strip()}
+    except ValueError:
+        raise ValueError('rating must be a comma separated list of integers from 1 to 5')
+    if not levels or not levels <= set(RATING_LEVELS):
+        raise ValueError('rating must be a comma separated list of integers from 1 to 5')
+    return tuple(sorted(levels))
+
+
+def review_signature(sort_by, sort_order, ratings):
+    """Ties a cursor to the sort and filter it was issued for"""
+    return f"{sort_by}:{sort_order}:{','.join(map(str, ratings))}"
+
+
+def product_reviews_query(session, product_id, ratings=()):
+    from models import Review
+
+    query = session.query(Review).filter(Review.product_id == product_id)
+    if ratings:
+        query = query.filter(Review.rating.in_(ratings))
+    return query
+
+
+def paginate_reviews(query, cursor, page_size, sort_by, sort_order, signature):
+    """Fetch one page of reviews after a cursor, returning (reviews, next_cursor).
+
+    Every sort column is NOT NULL, so each page is a range scan of the
+    matching (product_id, column, id) index however deep the client pages.
+    """
+    from models import Review
+
+    column_name, kind = REVIEW_SORTS[sort_by]
+    column = getattr(Review, column_name)
+    descending = sort_order == 'desc'
+
+    state = decode_cursor(cursor) if cursor else {}
+    if state:
+        if state.get('s') != signature:
+            raise InvalidCursor('Cursor does not match the current sort or filter')
+        last_value, last_id = (state.get('k') or [None, None])[:2]
+        if last_value is None or not isinstance(last_id, int):
+            raise InvalidCursor('Invalid cursor')
+        last_value = parse_cursor_value(last_value, kind)
+        query = query.filter(keyset_filter(column, Review.id, last_value, last_id, descending, nullable=False))
+
+    rows = query.order_by(*keyset_order(column, Review.id, descending, nullable=False)).limit(page_size + 1).all()
+    if len(rows) <= page_size:
+        return rows, None
+    last = rows[page_size - 1]
+    return rows[:page_size], encode_cursor({'s': signature, 'k': [cursor_value(getattr(last, column_name)), last.id]})
+
+
+def reviews_preview_size():
+    """Reviews embedded in a product's detail"""
+    if has_app_context():
+        return current_app.config.get('REVIEWS_PREVIEW_SIZE', DEFAULT_REVIEWS_PREVIEW_SIZE)
+    return DEFAULT_REVIEWS_PREVIEW_SIZE
+
+
+def review_preview(session, product_id, size=None):
+    """The newest reviews of a product and the cursor continuing them on /reviews"""
+    sort_by, sort_order = REVIEW_SORT_ALIASES['newest']
+    return paginate_reviews(
+        product_reviews_query(session, product_id), None, size or reviews_preview_size(),
+        sort_by, sort_order, review_signature(sort_by, sort_order, ())
+    )
+
+
+def rating_summary(product):
+    """Average rating, review count and star histogram from a product's aggregates"""
+    return {
+        'average': finite_float(product.rating) if product.rating else None,
+        'count': product.review_count or 0,
+        'histogram': product.rating_histogram(),
+    }
@@ -0,0 +1,137 @@
+import re
+from sqlalchemy import case, false, func, or_, text, Integer, Float
+
+# Field weights used for ranking: name > sku > description
+SEARCH_WEIGHTS = {'name': 10.0, 'sku': 5.0, 'description': 1.0}
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Cache of whether the full-text structures exist, keyed by database URL
+_fulltext_available = {}
+
+
+def tokenize_search(search):
+    """Split a raw search string into lowercase word tokens"""
+    return [token.lower() for token in _TOKEN_RE.findall(search or '')]
+
+
+def has_fulltext_index(session):
+    """Check (once per database) whether the full-text index has been created"""
+    bind = session.get_bind()
+    key = str(bind.url)
+    if key not in _fulltext_available:
+        dialect = bind.dialect.name
+        # Catalog lookups can't fail on a database without the index, so
+        # the probe never aborts the request's transaction
+        if dialect == 'sqlite':
+            found = session.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products_fts'"
+            )).first()
+        elif dialect == 'postgresql':
+            found = session.execute(text(
+                "SELECT 1 FROM pg_indexes WHERE tablename = 'products' AND indexname = 'ix_products_search_vector'"
+            )).first()
+        else:
+            found = None
+        # Only remember positive answers so a later migration is picked up
+        if not found:
+            return False
+        _fulltext_available[key] = True
+    return _fulltext_available[key]
+
+
+def fulltext_match_subquery(session, search):
+    """Build a (product_id, score) subquery of products matching the search.
+
+    Every token is treated as a prefix and all tokens must match. A higher
+    score means a better match. Returns None if the search has no tokens.
+    """
+    tokens = tokenize_search(search)
+    if not tokens:
+        return None
+
+    dialect = session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        tsquery = ' & '.join(f'{token}:*' for token in tokens)
+        # ts_rank weights are ordered {D, C, B, A}
+        weights = '{0.0, %s, %s, %s}' % (
+            SEARCH_WEIGHTS['description'] / 10,
+            SEARCH_WEIGHTS['sku'] / 10,
+            SEARCH_WEIGHTS['name'] / 10,
+        )
+        statement = text(
+            "SELECT products.id AS product_id, "
+            "ts_rank(CAST(:weights AS float4[]), products.search_vector, query) AS score "
+            "FROM products, to_tsquery('simple', :tsquery) AS query "
+            "WHERE products.search_vector @@ query"
+        ).bindparams(tsquery=tsquery, weights=weights)
+    else:
+        match = ' AND '.join('"%s"*' % token.replace('"', '') for token in tokens)
+        # bm25() is lower-is-better, so negate it to get a score
+        statement = text(
+            "SELECT rowid AS product_id, "
+            "-bm25(products_fts, :name_weight, :sku_weight, :description_weight) AS score "
+            "FROM products_fts WHERE products_fts MATCH :match"
+        ).bindparams(
+            match=match,
+            name_weight=SEARCH_WEIGHTS['name'],
+            sku_weight=SEARCH_WEIGHTS['sku'],
+            description_weight=SEARCH_WEIGHTS['description'],
+        )
+
+    return statement.columns(product_id=Integer, score=Float).subquery('search_matches')
+
+
+def legacy_search_filter(product, search):
+    """Substring filter used when no full-text index is available"""
+    search_term = f"%{search}%"
+    return or_(
+        product.name.ilike(search_term),
+        product.sku.ilike(search_term),
+        product.description.ilike(search_term)
+    )
+
+
+def search_relevance(product, search):
+    """Relevance tier for a match (1 is best).
+
+    Only evaluated on already-matched rows, so it does not drive the scan.
+    """
+    search_lower = search.lower()
+    return case(
+        # Exact name match (highest priority)
+        (func.lower(product.name) == search_lower, 1),
+        # Name starts with search term
+        (func.lower(product.name).startswith(search_lower), 2),
+        # Name ends with search term
+        (func.lower(product.name).endswith(search_lower), 3),
+        # Name contains search term as a complete word
+        (func.lower(product.name).contains(f" {search_lower} "), 4),
+        (func.lower(product.name).contains(f"{search_lower} "), 5),
+        (func.lower(product.name).contains(f" {search_lower}"), 6),
+        # Name contains search term anywhere
+        (func.lower(product.name).contains(search_lower), 7),
+        # SKU exact match
+        (func.lower(product.sku) == search_lower, 8),
+        # SKU contains search term
+        (func.lower(product.sku).contains(search_lower), 9),
+        # Description contains search term (lowest priority)
+        (func.lower(product.description).contains(search_lower), 10),
+        else_=11
+    )
+
+
+def apply_search(query, session, product, search):
+    """Restrict and rank a product query by a free-text search"""
+    if has_fulltext_index(session):
+        matches = fulltext_match_subquery(session, search)
+        if matches is None:
+            return query.filter(false())
+        return query.join(matches, product.id == matches.c.product_id).order_by(
+            search_relevance(product, search),
+            matches.c.score.desc()
+        )
+
+    return query.filter(legacy_search_filter(product, search)).order_by(
+        search_relevance(product, search)
+    )
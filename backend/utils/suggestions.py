@@ -0,0 +1,317 @@
+import time
+import threading
+from bisect import bisect_left, insort
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session
+
+
+def normalize(value):
+    """Normalize text for suggestion matching"""
+    return ' '.join((value or '').lower().split())
+
+
+def trigrams(value):
+    """Return the set of character trigrams in a normalized string"""
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+class SuggestionIndex:
+    """Per-worker in-memory index of search suggestions.
+
+    Holds product names, category names and brand names together with the
+    number of products behind each of them. Lookups use a sorted list of
+    word prefixes plus a trigram map for substring matches, so answering a
+    keystroke never touches the database.
+
+    The index is loaded lazily on first use, patched incrementally from
+    committed ORM changes, and fully reloaded after ``ttl`` seconds so other
+    workers' writes are eventually picked up. Full loads sort the prefix
+    list once; only incremental updates insert into it.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._load_lock = threading.Lock()
+        self._loaded_at = None
+        self._generation = 0
+        self._entries = {}      # entry key -> {'text', 'type', 'count', 'norm'}
+        self._prefixes = []     # sorted (word-start suffix, entry key)
+        self._grams = {}        # trigram -> set of entry keys
+
+    @property
+    def loaded(self):
+        return self._loaded_at is not None
+
+    def _fresh(self, ttl):
+        loaded_at = self._loaded_at
+        return loaded_at is not None and (ttl is None or time.monotonic() - loaded_at <= ttl)
+
+    def invalidate(self):
+        """Drop the index so the next lookup reloads it"""
+        with self._lock:
+            self._generation += 1
+            self._loaded_at = None
+            self._entries = {}
+            self._prefixes = []
+            self._grams = {}
+
+    def ensure_loaded(self, session, ttl=None):
+        """Load the index if it is empty or older than ttl seconds.
+
+        Only one thread reloads at a time. While an expired index is being
+        reloaded, other threads keep answering from it instead of waiting.
+        """
+        if self._fresh(ttl):
+            return
+        if not self._load_lock.acquire(blocking=not self.loaded):
+            return
+        try:
+            if not self._fresh(ttl):
+                self.load(session)
+        finally:
+            self._load_lock.release()
+
+    def load(self, session):
+        """(Re)build the index from the database.
+
+        The new index is built without holding the lock and swapped in at
+        the end, so lookups are not blocked by the reload.
+        """
+        from models import Product, Category, Brand
+
+        generation = self._generation
+        entries = {}
+
+        for name, count in session.query(Product.name, func.count(Product.id)).group_by(Product.name):
+            # Names differing only in case share one entry, as adjust_product does
+            norm = normalize(name)
+            key = ('product', norm)
+            if key in entries:
+                entries[key]['count'] += count
+            elif count > 0:
+                entries[key] = {'text': name, 'type': 'product', 'count': count, 'norm': norm}
+
+        for category_id, name, count in session.query(
+            Category.id, Category.name, func.count(Product.id)
+        ).outerjoin(Product, Product.category_id == Category.id).group_by(Category.id, Category.name):
+            entries[('category', category_id)] = {'text': name, 'type': 'category', 'count': count or 0, 'norm': normalize(name)}
+
+        for brand_id, name, count in session.query(
+            Brand.id, Brand.name, func.count(Product.id)
+        ).outerjoin(Product, Product.brand_id == Brand.id).group_by(Brand.id, Brand.name):
+            entries[('brand', brand_id)] = {'text': name, 'type': 'brand', 'count': count or 0, 'norm': normalize(name)}
+
+        prefixes = []
+        grams = {}
+        for key, entry in entries.items():
+            if entry['norm']:
+                prefixes.extend(self._prefix_items(key, entry['norm']))
+                for gram in trigrams(entry['norm']):
+                    grams.setdefault(gram, set()).add(key)
+        prefixes.sort()
+
+        with self._lock:
+            if self._generation != generation:
+                # Invalidated while loading: what was read may already be stale
+                return
+            self._entries = entries
+            self._prefixes = prefixes
+            self._grams = grams
+            self._loaded_at = time.monotonic()
+
+    @staticmethod
+    def _prefix_items(key, norm):
+        """(word-start suffix, key) for every word of a normalized text"""
+        items = []
+        offset = 0
+        for word in norm.split(' '):
+            items.append((norm[offset:], key))
+            offset += len(word) + 1
+        return items
+
+    def _add_lookup(self, key, norm):
+        for item in self._prefix_items(key, norm):
+            insort(self._prefixes, item)
+        for gram in trigrams(norm):
+            self._grams.setdefault(gram, set()).add(key)
+
+    def _remove_lookup(self, key, norm):
+        for item in self._prefix_items(key, norm):
+            position = bisect_left(self._prefixes, item)
+            if position < len(self._prefixes) and self._prefixes[position] == item:
+                del self._prefixes[position]
+        for gram in trigrams(norm):
+            keys = self._grams.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._grams[gram]
+
+    def set_entry(self, key, entry_type, text, count=None):
+        """Insert or rename an entry, keeping its count unless one is given"""
+        with self._lock:
+            norm = normalize(text)
+            existing = self._entries.get(key)
+            if existing is not None:
+                if count is None:
+                    count = existing['count']
+                if existing['norm'] != norm:
+                    self._remove_lookup(key, existing['norm'])
+                    existing['norm'] = norm
+                    if norm:
+                        self._add_lookup(key, norm)
+                existing['text'] = text
+                existing['count'] = count
+                return
+            self._entries[key] = {'text': text, 'type': entry_type, 'count': count or 0, 'norm': norm}
+            if norm:
+                self._add_lookup(key, norm)
+
+    def remove_entry(self, key):
+        with self._lock:
+            existing = self._entries.pop(key, None)
+            if existing is not None and existing['norm']:
+                self._remove_lookup(key, existing['norm'])
+
+    def adjust_count(self, key, delta):
+        with self._lock:
+            existing = self._entries.get(key)
+            if existing is not None:
+                existing['count'] += delta
+
+    def adjust_product(self, name, delta):
+        """Add delta to the number of products sharing a (case-insensitive) name"""
+        with self._lock:
+            key = ('product', normalize(name))
+            existing = self._entries.get(key)
+            if existing is None:
+                if delta > 0:
+                    self.set_entry(key, 'product', name, delta)
+                return
+            existing['count'] += delta
+            if existing['count'] <= 0:
+                self.remove_entry(key)
+
+    def lookup(self, query, limit=10):
+        """Return suggestions for a query, best matches first"""
+        q = normalize(query)
+        if not q:
+            return []
+
+        with self._lock:
+            priorities = {}
+
+            # Word-prefix matches: whole-text prefix ranks above inner words
+            position = bisect_left(self._prefixes, (q,))
+            while position < len(self._prefixes) and self._prefixes[position][0].startswith(q):
+                key = self._prefixes[position][1]
+                priority = 1 if self._entries[key]['norm'].startswith(q) else 2
+                priorities[key] = min(priority, priorities.get(key, priority))
+                position += 1
+
+            # Substring matches through the trigram map
+            if len(q) >= 3:
+                grams = sorted(trigrams(q), key=lambda gram: len(self._grams.get(gram, ())))
+                candidates = set(self._grams.get(grams[0], ()))
+                for gram in grams[1:]:
+                    if not candidates:
+                        break
+                    candidates &= self._grams.get(gram, set())
+                for key in candidates:
+                    if key not in priorities and q in self._entries[key]['norm']:
+                        priorities[key] = 3
+
+            results = []
+            for key, priority in priorities.items():
+                entry = self._entries[key]
+                if entry['count'] <= 0:
+                    continue
+                results.append({
+                    'text': entry['text'],
+                    'type': entry['type'],
+                    'count': entry['count'],
+                    'priority': priority
+                })
+
+        results.sort(key=lambda s: (s['priority'], -s['count'], s['text'].lower()))
+        return results[:limit]
+
+
+suggestion_index = SuggestionIndex()
+
+
+def _previous_value(state, attribute):
+    """Value of an attribute before the pending flush"""
+    history = state.attrs[attribute].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return None
+
+
+def _collect_changes(session, flush_context):
+    """Record suggestion index changes made by a flush (applied on commit)"""
+    from models import Product, Category, Brand
+
+    if not suggestion_index.loaded:
+        return
+
+    changes = session.info.setdefault('suggestion_changes', [])
+
+    for obj in session.new:
+        if isinstance(obj, Product):
+            changes.append(('product', obj.name, 1))
+            changes.append(('count', ('category', obj.category_id), 1))
+            changes.append(('count', ('brand', obj.brand_id), 1))
+        elif isinstance(obj, (Category, Brand)):
+            entry_type = 'category' if isinstance(obj, Category) else 'brand'
+            changes.append(('entry', (entry_type, obj.id), entry_type, obj.name))
+
+    for obj in session.dirty:
+        state = inspect(obj)
+        if isinstance(obj, Product):
+            for attribute, entry_type in (('category_id', 'category'), ('brand_id', 'brand')):
+                if state.attrs[attribute].history.has_changes():
+                    changes.append(('count', (entry_type, _previous_value(state, attribute)), -1))
+                    changes.append(('count', (entry_type, getattr(obj, attribute)), 1))
+            if state.attrs.name.history.has_changes():
+                changes.append(('product', _previous_value(state, 'name'), -1))
+                changes.append(('product', obj.name, 1))
+        elif isinstance(obj, (Category, Brand)):
+            if state.attrs.name.history.has_changes():
+                entry_type = 'category' if isinstance(obj, Category) else 'brand'
+                changes.append(('entry', (entry_type, obj.id), entry_type, obj.name))
+
+    for obj in session.deleted:
+        if isinstance(obj, Product):
+            changes.append(('product', obj.name, -1))
+            changes.append(('count', ('category', obj.category_id), -1))
+            changes.append(('count', ('brand', obj.brand_id), -1))
+        elif isinstance(obj, (Category, Brand)):
+            entry_type = 'category' if isinstance(obj, Category) else 'brand'
+            changes.append(('remove', (entry_type, obj.id)))
+
+
+def _apply_changes(session):
+    changes = session.info.pop('suggestion_changes', None)
+    if not changes or not suggestion_index.loaded:
+        return
+    for change in changes:
+        if change[0] == 'product':
+            suggestion_index.adjust_product(change[1], change[2])
+        elif change[0] == 'count':
+            suggestion_index.adjust_count(change[1], change[2])
+        elif change[0] == 'entry':
+            suggestion_index.set_entry(change[1], change[2], change[3])
+        elif change[0] == 'remove':
+            suggestion_index.remove_entry(change[1])
+
+
+def _discard_changes(session):
+    session.info.pop('suggestion_changes', None)
+
+
+event.listen(Session, 'after_flush', _collect_changes)
+event.listen(Session, 'after_commit', _apply_changes)
+event.listen(Session, 'after_rollback', _discard_changes)